@@ -1,23 +1,31 @@
 @echo off
-REM Lancer les nœuds fog en parallèle
-start /b python src/fog_nodes/fog_node1.py
-start /b python src/fog_nodes/fog_node2.py
-start /b python src/fog_nodes/fog_node3.py
-
-REM Choix de l'algorithme pour le load balancer
+REM Choix de l'algorithme de départ (modifiable à chaud via POST /admin/strategy)
 echo Choisir l'algorithme pour le load balancer :
 echo 1) Random 
 echo 2) Round Robin
 echo 3) Hybrid
+echo 4) Least connections
+echo 5) Peak EWMA
 set /p choice=Votre choix : 
 
 if "%choice%"=="1" (
-    start /b python src/load_balancer/load_balancer_random.py
+    set strategy=random
 ) else if "%choice%"=="2" (
-    start /b python src/load_balancer/load_balancer_robin.py
+    set strategy=round_robin
+) else if "%choice%"=="4" (
+    set strategy=least_connections
+) else if "%choice%"=="5" (
+    set strategy=peak_ewma
 ) else (
-    start /b python src/load_balancer/load_balancer_hybrid.py
+    set strategy=hybrid
 )
 
+REM Nombre de fog nodes locaux (chacun s'enregistre auprès du LB)
+set /p nodes=Nombre de fog nodes [3] : 
+if "%nodes%"=="" set nodes=3
+
+start /b python src/load_balancer/load_balancer.py --strategy %strategy%
+start /b python src/fog_nodes/launcher.py --nodes %nodes%
+
 REM Lancer le client
 start /b python src/client.py
@@ -0,0 +1,452 @@
+# benchmark.py — Banc d'essai reproductible des stratégies du LB
+#
+#   python src/benchmark.py                                     # charge par défaut, toutes les stratégies
+#   python src/benchmark.py --strategies round_robin,hybrid --concurrency 1,8 -o bench.json
+#   python src/benchmark.py --workload charge.json              # charge décrite en JSON (cf. DEFAULT_WORKLOAD)
+#
+# Pour chaque stratégie, un cluster local neuf est démarré (LB + fog nodes,
+# dossier de travail temporaire), puis la charge est rejouée via les sessions
+# d'upload du LB (POST /uploads, PUT des chunks, commit), comme le client :
+#   - nœuds hétérogènes : workers par nœud, pannes et lenteurs injectées
+#     (latence, débit plafonné, CPU ralenti, erreurs 5xx, blocages : cf. fog_nodes/faults.py) ;
+#   - charge : distribution des tailles de fichiers, niveaux de concurrence,
+#     arrivées en boucle fermée (C uploads en continu) ou de Poisson (taux λ) ;
+#   - graine fixe : mêmes tailles, même contenu, mêmes instants d'arrivée
+#     d'une stratégie et d'une version à l'autre.
+# Résultat JSON, une entrée par stratégie × concurrence : débit (Mo/s),
+# latences p50/p95/p99 des fichiers et des chunks, taux d'erreur, répartition
+# des chunks et des octets par nœud.
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SRC, "load_balancer"))
+from fog_nodes.launcher import start_nodes, stop_nodes
+from http_pool import HttpPool
+from strategies import STRATEGIES
+
+LOAD_BALANCER = os.path.join(SRC, "load_balancer", "load_balancer.py")
+
+MiB = 1024 * 1024
+STARTUP_TIMEOUT = 20
+DEFAULT_WINDOW = 3
+
+DEFAULT_WORKLOAD = {
+    "seed": 1,
+    "strategies": list(STRATEGIES),
+    # Un profil par nœud : workers, faults (configuration de fog_nodes/faults.py ;
+    # bandwidth accepte aussi "40MiB", seed par défaut dérivée de la graine de la charge)
+    "nodes": [
+        {"name": "fast-1"},
+        {"name": "fast-2"},
+        {"name": "slow", "workers": 1, "faults": {"latency": 0.02, "bandwidth": "40MiB", "cpu_factor": 2}},
+    ],
+    # dist : fixed (size), uniform (min, max), lognormal (median, sigma, min, max),
+    # choice (values, weights)
+    "sizes": {"dist": "lognormal", "median": "4MiB", "sigma": 1.0, "min": "64KiB", "max": "48MiB"},
+    "files": 20,
+    "warmup": 3,
+    "concurrency": [1, 4],
+    # process : closed (C uploads en continu) ou poisson (rate fichiers/s, au plus C en cours)
+    "arrival": {"process": "closed"},
+    # Chunks en vol par fichier (défaut : fenêtre recommandée par le LB)
+    "window": None,
+    "lb_async": False,
+}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def parse_size(value):
+    # 4194304, "4MiB", "64KiB", "1.5GiB"
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip()
+    for suffix, factor in (("GiB", 1024 * MiB), ("MiB", MiB), ("KiB", 1024), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[: -len(suffix)]) * factor)
+    return int(float(text))
+
+
+def git_version():
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=SRC, capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ==========================================================
+# Charge : tailles, contenu et instants d'arrivée (graine fixe)
+# ==========================================================
+def draw_size(rng, sizes):
+    dist = sizes.get("dist", "fixed")
+    if dist == "fixed":
+        return parse_size(sizes["size"])
+    if dist == "uniform":
+        return rng.randint(parse_size(sizes["min"]), parse_size(sizes["max"]))
+    if dist == "lognormal":
+        size = rng.lognormvariate(math.log(parse_size(sizes["median"])), float(sizes.get("sigma", 1.0)))
+        return int(min(max(size, parse_size(sizes.get("min", 1))), parse_size(sizes.get("max", 1024 * MiB))))
+    if dist == "choice":
+        values = [parse_size(v) for v in sizes["values"]]
+        return rng.choices(values, weights=sizes.get("weights"))[0]
+    raise BenchmarkError(f"Distribution de tailles inconnue : {dist}")
+
+
+def make_files(workload, count, rng):
+    # Fichiers = tranches d'un même tampon aléatoire : [{size, offset, at}]
+    arrival = workload["arrival"]
+    files = []
+    at = 0.0
+    for _ in range(count):
+        size = max(1, draw_size(rng, workload["sizes"]))
+        if arrival.get("process", "closed") == "poisson":
+            at += rng.expovariate(float(arrival["rate"]))
+        files.append({"size": size, "at": at})
+    return files
+
+
+def make_payload(files, rng):
+    largest = max(f["size"] for f in files)
+    payload = rng.randbytes(largest + MiB)
+    for f in files:
+        f["offset"] = rng.randrange(len(payload) - f["size"] + 1)
+    return memoryview(payload)
+
+
+# ==========================================================
+# Cluster local : fog nodes (pannes injectées) et LB
+# ==========================================================
+class Cluster:
+    def __init__(self, workload, strategy, workdir, base_port):
+        self.workload = workload
+        self.strategy = strategy
+        self.workdir = workdir
+        self.lb_url = f"http://127.0.0.1:{base_port}"
+        self.base_port = base_port
+        self.nodes = []  # (url, processus)
+        self.lb = None
+        self.names = {}  # URL annoncée au LB -> nom du profil
+
+    def start(self):
+        self.log = open(os.path.join(self.workdir, "cluster.log"), "ab")
+        profiles = self.workload["nodes"]
+        default_workers = max(1, (os.cpu_count() or 1) // len(profiles))
+        advertised = []
+        for i, profile in enumerate(profiles):
+            faults = dict(profile.get("faults") or {})
+            if faults:
+                faults.setdefault("seed", self.workload["seed"] * 1000 + i)
+                if "bandwidth" in faults:
+                    faults["bandwidth"] = parse_size(faults["bandwidth"])
+            self.nodes += start_nodes(
+                1,
+                self.base_port + 1 + i,
+                lb_url="",
+                workers=profile.get("workers") or default_workers,
+                env={"FOG_FAULTS": json.dumps(faults)},
+                stdout=self.log,
+            )
+            url = self.nodes[-1][0]
+            advertised.append(url)
+            self.names[url] = profile.get("name", f"node{i}")
+
+        cmd = [sys.executable, LOAD_BALANCER, "--port", str(self.base_port), "--strategy", self.strategy]
+        if self.workload.get("lb_async"):
+            cmd.append("--async")
+        env = {**os.environ, "FOG_NODES": ",".join(advertised), "LB_CACHE_MEMORY": "0", "LB_METRICS_PORT": "0"}
+        self.lb = subprocess.Popen(cmd, cwd=self.workdir, env=env, stdout=self.log, stderr=self.log)
+
+        http = HttpPool()
+        for url in [u for u, _ in self.nodes] + [self.lb_url]:
+            wait_ready(http, url + ("/nodes" if url == self.lb_url else "/health"))
+
+    def stop(self):
+        if self.lb:
+            self.lb.terminate()
+            try:
+                self.lb.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.lb.kill()
+        stop_nodes(self.nodes)
+        self.log.close()
+
+    def clear_outputs(self):
+        # Fichiers chiffrés d'un run : inutiles ensuite, ne pas remplir le disque
+        folder = os.path.join(self.workdir, "processed_files")
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+
+
+def wait_ready(http, url):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            if http.get(url, timeout=1).ok:
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise BenchmarkError(f"{url} ne répond pas après {STARTUP_TIMEOUT} s")
+
+
+# ==========================================================
+# Rejeu : un upload = session, chunks en parallèle, commit
+# ==========================================================
+def upload_file(http, lb_url, name, data, window_cap, since):
+    record = {"size": len(data), "ok": False, "error": None, "chunks": []}
+    try:
+        r = http.post(
+            f"{lb_url}/uploads",
+            json={"filename": name, "file_size": len(data), "aes_nonce": os.urandom(12).hex()},
+        )
+        if r.status_code != 201:
+            raise BenchmarkError(f"POST /uploads : {r.status_code} {r.text.strip()}")
+        session = r.json()
+        url = f"{lb_url}/uploads/{session['upload_id']}"
+        size = session["chunk_size"]
+        window = session.get("window") or DEFAULT_WINDOW
+        if window_cap:
+            window = min(window, window_cap)
+        headers = {"X-AES-Key": os.urandom(16).hex(), "Content-Type": "application/octet-stream"}
+
+        def put(index):
+            body = bytes(data[index * size:(index + 1) * size])
+            start = time.monotonic()
+            chunk = {"node": None, "bytes": len(body), "ok": False, "error": None}
+            try:
+                r = http.put(f"{url}/chunks/{index}", data=body, headers=headers)
+                if r.ok:
+                    chunk.update(ok=True, node=r.json().get("node_used"))
+                else:
+                    chunk["error"] = f"PUT chunk : {r.status_code} {r.text.strip()}"
+            except Exception as e:
+                chunk["error"] = f"PUT chunk : {e}"
+            chunk["latency"] = time.monotonic() - start
+            return chunk
+
+        with ThreadPoolExecutor(window) as pool:
+            record["chunks"] = list(pool.map(put, range(session["total_chunks"])))
+
+        r = http.post(f"{url}/commit")
+        if not r.ok:
+            raise BenchmarkError(f"commit : {r.status_code} {r.text.strip()}")
+        record["ok"] = True
+    except Exception as e:
+        record["error"] = str(e)
+    # Arrivées ouvertes : latence comptée depuis l'arrivée prévue (attente comprise)
+    record["latency"] = time.monotonic() - since
+    return record
+
+
+def run_load(http, lb_url, label, files, payload, concurrency, window_cap):
+    start = time.monotonic()
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = []
+        for i, f in enumerate(files):
+            delay = start + f["at"] - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            data = payload[f["offset"]:f["offset"] + f["size"]]
+            since = start + f["at"] if f["at"] else None
+            futures.append(pool.submit(
+                lambda data=data, name=f"{label}-{i:04d}.bin", since=since: upload_file(
+                    http, lb_url, name, data, window_cap, since or time.monotonic()
+                )
+            ))
+        records = [future.result() for future in futures]
+    return records, time.monotonic() - start
+
+
+# ==========================================================
+# Statistiques
+# ==========================================================
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def quantile(q):
+        pos = q * (len(values) - 1)
+        low = int(pos)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (pos - low)
+
+    return {
+        "p50": round(quantile(0.50), 4),
+        "p95": round(quantile(0.95), 4),
+        "p99": round(quantile(0.99), 4),
+        "mean": round(sum(values) / len(values), 4),
+        "max": round(values[-1], 4),
+    }
+
+
+def summarize(records, wall, names):
+    chunks = [c for r in records for c in r["chunks"]]
+    failed = [r for r in records if not r["ok"]]
+    sent = sum(r["size"] for r in records if r["ok"])
+
+    nodes = {name: {"chunks": 0, "bytes": 0} for name in names.values()}
+    for c in chunks:
+        if c["ok"]:
+            node = nodes.setdefault(names.get(c["node"], c["node"]), {"chunks": 0, "bytes": 0})
+            node["chunks"] += 1
+            node["bytes"] += c["bytes"]
+    total = sum(n["bytes"] for n in nodes.values())
+    for node in nodes.values():
+        node["share"] = round(node["bytes"] / total, 4) if total else 0.0
+
+    # Équilibre des octets par nœud : indice de Jain (1 = parfaitement égal,
+    # 1/n = tout sur un nœud) ; sur un parc hétérogène, un bon algorithme s'en écarte
+    loads = [n["bytes"] for n in nodes.values()]
+    squares = sum(x * x for x in loads)
+    mean = total / len(loads) if loads else 0
+
+    return {
+        "files": len(records),
+        "failed_files": len(failed),
+        "error_rate": round(len(failed) / len(records), 4) if records else 0.0,
+        "chunks": len(chunks),
+        "failed_chunks": sum(1 for c in chunks if not c["ok"]),
+        "chunk_error_rate": round(sum(1 for c in chunks if not c["ok"]) / len(chunks), 4) if chunks else 0.0,
+        "bytes": sent,
+        "wall_time": round(wall, 4),
+        "throughput_mb_s": round(sent / MiB / wall, 3) if wall > 0 else 0.0,
+        "latency": {
+            "file": percentiles([r["latency"] for r in records if r["ok"]]),
+            "chunk": percentiles([c["latency"] for c in chunks if c["ok"]]),
+        },
+        "nodes": nodes,
+        "balance": {
+            "jain": round(total * total / (len(loads) * squares), 4) if squares else None,
+            "max_over_mean": round(max(loads) / mean, 4) if mean else None,
+        },
+        "errors": sorted({r["error"] for r in failed} | {c["error"] for c in chunks if c["error"]})[:10],
+    }
+
+
+# ==========================================================
+# Campagne : stratégies × niveaux de concurrence
+# ==========================================================
+def run_benchmark(workload, base_port=5100):
+    rng = random.Random(workload["seed"])
+    warmup = make_files({**workload, "arrival": {"process": "closed"}}, workload["warmup"], rng)
+    files = make_files(workload, workload["files"], rng)
+    payload = make_payload(warmup + files, rng)
+    total = sum(f["size"] for f in files)
+    print(f"[BENCH] {len(files)} fichiers ({total / MiB:.1f} Mo), {len(workload['nodes'])} nœuds, "
+          f"arrivées {workload['arrival'].get('process', 'closed')}")
+
+    results = []
+    for strategy in workload["strategies"]:
+        workdir = tempfile.mkdtemp(prefix="fog-bench-")
+        cluster = Cluster(workload, strategy, workdir, base_port)
+        try:
+            cluster.start()
+            for concurrency in workload["concurrency"]:
+                http = HttpPool(max_connections=max(16, concurrency * 4 * len(workload["nodes"])))
+                label = f"{strategy}-c{concurrency}"
+                if warmup:
+                    # Échauffement (non mesuré) : connexions ouvertes, modèles appris
+                    run_load(http, cluster.lb_url, label + "-warmup", warmup, payload, concurrency, workload["window"])
+                records, wall = run_load(
+                    http, cluster.lb_url, label, files, payload, concurrency, workload["window"]
+                )
+                cluster.clear_outputs()
+                result = {"strategy": strategy, "concurrency": concurrency, **summarize(records, wall, cluster.names)}
+                results.append(result)
+                file_latency = result["latency"]["file"] or {}
+                print(
+                    f"[BENCH] ✓ {strategy:<18} c={concurrency:<3} {result['throughput_mb_s']:8.1f} Mo/s  "
+                    f"p50 {file_latency.get('p50', 0):.3f} s  p99 {file_latency.get('p99', 0):.3f} s  "
+                    f"erreurs {100 * result['error_rate']:.1f} %  Jain {result['balance']['jain']}"
+                )
+        except BenchmarkError as e:
+            print(f"[BENCH] ✗ {strategy} : {e}")
+            results.append({"strategy": strategy, "error": str(e)})
+        finally:
+            cluster.stop()
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def load_workload(args):
+    workload = json.loads(json.dumps(DEFAULT_WORKLOAD))
+    if args.workload:
+        with open(args.workload) as f:
+            workload.update(json.load(f))
+    if args.strategies:
+        workload["strategies"] = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    if args.concurrency:
+        workload["concurrency"] = [int(c) for c in args.concurrency.split(",")]
+    if args.files is not None:
+        workload["files"] = args.files
+    if args.nodes is not None:
+        workload["nodes"] = [{"name": f"node{i}"} for i in range(args.nodes)]
+    if args.seed is not None:
+        workload["seed"] = args.seed
+    if args.rate is not None:
+        workload["arrival"] = {"process": "poisson", "rate": args.rate}
+    if args.use_async:
+        workload["lb_async"] = True
+    if not workload["nodes"] or not workload["strategies"]:
+        raise BenchmarkError("Au moins un nœud et une stratégie sont nécessaires")
+    return workload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai des stratégies du LB sur un cluster local")
+    parser.add_argument("--workload", help="charge en JSON (clés de DEFAULT_WORKLOAD, les autres gardent leur défaut)")
+    parser.add_argument("--strategies", help="stratégies séparées par des virgules (défaut : toutes)")
+    parser.add_argument("--concurrency", help="niveaux de concurrence, ex. 1,4,16")
+    parser.add_argument("--files", type=int, default=None, help="fichiers mesurés par run")
+    parser.add_argument("--nodes", type=int, default=None, help="N nœuds identiques (remplace les profils)")
+    parser.add_argument("--rate", type=float, default=None, help="arrivées de Poisson, fichiers/s")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--async", dest="use_async", action="store_true", help="LB en plan de données asyncio")
+    parser.add_argument("--base-port", type=int, default=5100, help="port du LB (fog nodes sur les ports suivants)")
+    parser.add_argument("-o", "--output", default="benchmark.json")
+    args = parser.parse_args()
+
+    try:
+        workload = load_workload(args)
+    except (OSError, ValueError, BenchmarkError) as e:
+        print(f"[BENCH] ✗ Charge invalide : {e}")
+        sys.exit(1)
+
+    report = {
+        "format": 1,
+        "version": git_version(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "workload": workload,
+        "results": run_benchmark(workload, args.base_port),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] Résultats : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 # client.py — HTTP ONLY + DEBUG LOGS
 
+import hashlib
+import json
 import os
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 
+from http_pool import pools
+from config import CHUNK_SIZE, FOG_NODES, LOAD_BALANCER_URL
+from tracing import Tracer, bind
+
 # ============================================================
 # CONFIG
 # ============================================================
@@ -14,13 +22,46 @@ app = Flask(__name__)
 CORS(app)
 
 UPLOAD_FOLDER = "uploads_client"
-RESULT_FOLDER = "results_client"
-CHUNK_SIZE = 5 * 1024 * 1024
+# Relais des téléchargements LB → navigateur
+DOWNLOAD_BLOCK = 256 * 1024
+RELAYED_HEADERS = (
+    "Content-Type",
+    "Content-Length",
+    "Content-Range",
+    "Content-Disposition",
+    "Accept-Ranges",
+    "ETag",
+    "Last-Modified",
+)
+
+# Nombre maximal de chunks "en vol" (envoyés mais pas encore acquittés par le LB).
+# Par défaut celui que recommande le LB avec la taille de chunk (GET /chunk_plan),
+# de quoi occuper tous les fog nodes.
+UPLOAD_WINDOW = int(os.environ["UPLOAD_WINDOW"]) if os.environ.get("UPLOAD_WINDOW") else None
+DEFAULT_WINDOW = 3
+
+# Échéance d'un chunk (secondes), retries et requêtes de couverture du LB compris
+CHUNK_DEADLINE = float(os.environ.get("CHUNK_DEADLINE", "30"))
+
+# Passes d'envoi par upload : chaque passe ne renvoie que les chunks que le LB
+# n'a pas acquittés, après une pause croissante (RESUME_DELAY, puis ×2)
+UPLOAD_ROUNDS = int(os.environ.get("UPLOAD_ROUNDS", "4"))
+RESUME_DELAY = float(os.environ.get("RESUME_DELAY", "1"))
+
+# Même fichier (contenu et découpage identiques) → même clé et même nonce : les
+# chunks chiffrés sont identiques et le cache du LB les resert sans fog node
+# (cf. load_balancer/chunk_cache.py). Désactivé par défaut : deux envois d'un
+# même fichier deviennent reconnaissables.
+REUSE_KEYS = os.environ.get("REUSE_KEYS") == "1"
+KEYS_FILE = os.path.join(UPLOAD_FOLDER, "keys.json")
+
+# Tenant annoncé au LB (en-tête X-Tenant, relayé aux fog nodes pour leurs métriques)
+TENANT = os.environ.get("TENANT", "")
+
+# Une trace par upload (TRACE_SAMPLE_RATE), propagée au LB puis aux fog nodes (cf. tracing.py)
+tracer = Tracer("client")
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(RESULT_FOLDER, exist_ok=True)
-
-LOAD_BALANCER_URL = "http://127.0.0.1:5005"
 
 
 # ============================================================
@@ -49,66 +90,307 @@ def send_file_chunks():
     # Sauvegarde du fichier complet côté client
     file.save(filepath)
     file_size = os.path.getsize(filepath)
-    total_chunks = (file_size + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+    if file_size == 0:
+        # Rien à chiffrer : pas de session (le LB n'en ouvre que pour un fichier non vide)
+        print(f"[CLIENT] ✓ Fichier vide : {filename}, aucun chunk à envoyer")
+        return jsonify({"status": "Upload complet", "file": filename, "chunks": 0, "total_time": 0.0, "results": []})
+
+    # Découpage recommandé par le LB (débit et overhead mesurés des fog nodes)
+    plan = chunk_plan(file_size)
+    chunk_size = plan["chunk_size"]
+    total_chunks = (file_size + chunk_size - 1) // chunk_size
 
     print(f"[CLIENT] Fichier reçu : {filename} ({file_size} octets)")
-    print(f"[CLIENT] Nombre total de chunks : {total_chunks}")
+    print(f"[CLIENT] Taille de chunk : {chunk_size} octets, {total_chunks} chunk(s)")
 
     # =======================================================
     # AES KEY GENERATION
     # =======================================================
-    key = AESGCM.generate_key(bit_length=128)
-    nonce = os.urandom(12)
-    key_hex = key.hex()
-    nonce_hex = nonce.hex()
+    key_hex, nonce_hex = file_keys(filepath, chunk_size)
 
     print(f"[CLIENT] AES key : {key_hex}")
     print(f"[CLIENT] AES nonce : {nonce_hex}")
 
     # =======================================================
-    # SEND CHUNKS
+    # SESSION D'UPLOAD (reprenable, cf. load_balancer/sessions.py)
     # =======================================================
-    with open(filepath, "rb") as f:
-        for chunk_index in range(total_chunks):
-            chunk = f.read(CHUNK_SIZE)
+    window = upload_window(plan["window"])
+    print(f"[CLIENT] Fenêtre d'envoi : {window} chunk(s) en vol")
 
-            if not chunk:
-                break
+    try:
+        session = create_session(filename, file_size, nonce_hex, chunk_size)
+    except Exception as e:
+        print(f"[CLIENT][ERROR] Création de la session impossible → {e}")
+        return jsonify({"error": f"Création de la session impossible : {e}"}), 500
 
-            print(f"[CLIENT] → Envoi chunk {chunk_index}/{total_chunks-1}")
+    save_session(filename, session["upload_id"], key_hex, nonce_hex, chunk_size, total_chunks)
+    print(f"[CLIENT] Session d'upload : {session['upload_id']}")
 
-            files = {"chunk": (f"{filename}.part{chunk_index}", chunk)}
+    return run_upload(filename, session["upload_id"], key_hex, chunk_size, total_chunks, window,
+                      list(range(total_chunks)))
 
-            headers = {
-                "X-File-Name": filename,
-                "X-Chunk-Index": str(chunk_index),
-                "X-AES-Key": key_hex,
-                "X-AES-Nonce": nonce_hex,
-            }
 
-            try:
-                r = requests.post(
-                    f"{LOAD_BALANCER_URL}/receive_chunk",
-                    files=files,
-                    headers=headers,
-                    timeout=30,
-                )
-                r.raise_for_status()
+def run_upload(filename, upload_id, key_hex, chunk_size, total_chunks, window, pending=None):
+    # Racine de la trace de l'upload (une par envoi ou reprise)
+    with tracer.start("client.upload", file=filename, upload_id=upload_id, chunks=total_chunks) as span:
+        response = upload_chunks(filename, upload_id, key_hex, chunk_size, total_chunks, window, pending)
+        span.set(status=response[1] if isinstance(response, tuple) else 200)
+        return response
 
-                print(f"[CLIENT] ✓ Chunk {chunk_index} envoyé avec succès.")
 
+def upload_window(recommended):
+    # Fenêtre demandée par l'interface, sinon UPLOAD_WINDOW, sinon celle du LB
+    return max(1, int(request.form.get("window") or UPLOAD_WINDOW or recommended))
+
+
+def chunk_plan(file_size):
+    try:
+        r = pools.get(f"{LOAD_BALANCER_URL}/chunk_plan", params={"file_size": file_size}, timeout=5)
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        print(f"[CLIENT] Taille de chunk par défaut ({e})")
+        return {"chunk_size": CHUNK_SIZE, "window": DEFAULT_WINDOW}
+
+
+# ============================================================
+# REPRISE D'UN UPLOAD INTERROMPU (seuls les chunks manquants)
+# ============================================================
+@app.route("/resume/<filename>", methods=["POST"])
+def resume_upload(filename):
+    try:
+        with open(session_path(filename)) as f:
+            saved = json.load(f)
+    except OSError:
+        return jsonify({"error": f"Aucun upload interrompu pour {filename}"}), 404
+
+    window = upload_window(DEFAULT_WINDOW)
+    print(f"\n[CLIENT] ↻ Reprise de l'upload {saved['upload_id']} ({filename})")
+    return run_upload(filename, saved["upload_id"], saved["key"], saved["chunk_size"], saved["total_chunks"],
+                      window)
+
+
+def upload_chunks(filename, upload_id, key_hex, chunk_size, total_chunks, window, pending=None):
+    # Envoie les chunks manquants, redemande au LB ce qui manque encore, et
+    # recommence (UPLOAD_ROUNDS passes au plus) avant le commit de la session
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    results = {}
+    start_total = time.time()
+
+    def backoff(round_index):
+        # Pause avant la passe suivante ; aucune après la dernière (on passe au commit)
+        if round_index < UPLOAD_ROUNDS - 1:
+            time.sleep(RESUME_DELAY * 2 ** round_index)
+
+    for round_index in range(UPLOAD_ROUNDS):
+        if pending is None:
+            # Le LB fait foi : on lui redemande la liste des chunks manquants
+            try:
+                pending = missing_chunks(upload_id)
             except Exception as e:
-                print(f"[CLIENT][ERROR] Échec upload chunk {chunk_index} → {e}")
-                return (
-                    jsonify({"error": f"Erreur upload chunk {chunk_index}: {e}"}),
-                    500,
-                )
+                print(f"[CLIENT][ERROR] LB injoignable → {e}")
+                backoff(round_index)
+                continue
+        if not pending:
+            break
+        if round_index or len(pending) < total_chunks:
+            print(f"[CLIENT] ↻ Passe {round_index + 1} : {len(pending)} chunk(s) à envoyer")
+
+        sent, failures = send_chunks(filepath, upload_id, pending, chunk_size, total_chunks, key_hex, window)
+        results.update(sent)
+        for chunk_index, e in failures:
+            print(f"[CLIENT][ERROR] Échec upload chunk {chunk_index} → {e}")
+        pending = None
+        if failures:
+            backoff(round_index)
+
+    try:
+        committed, missing = commit_session(upload_id)
+    except Exception as e:
+        committed, missing = False, pending
+        print(f"[CLIENT][ERROR] Commit impossible → {e}")
+
+    total_time = time.time() - start_total
+    ordered = [results[i] for i in sorted(results)]
+    if not committed:
+        print(f"[CLIENT][ERROR] Upload incomplet ({len(missing or [])} chunk(s) manquant(s)), "
+              f"reprise : POST /resume/{filename}")
+        return (
+            jsonify(
+                {
+                    "error": f"Upload incomplet, reprise : POST /resume/{filename}",
+                    "upload_id": upload_id,
+                    "missing": missing,
+                    "results": ordered,
+                }
+            ),
+            500,
+        )
 
-    print("[CLIENT] ✓ Upload complet envoyé au Load Balancer.")
+    try:
+        os.remove(session_path(filename))
+    except OSError:
+        pass
+    print(f"[CLIENT] ✓ Upload complet envoyé au Load Balancer en {total_time:.3f}s.")
 
     return jsonify(
-        {"status": "Upload complet", "file": filename, "chunks": total_chunks}
+        {
+            "status": "Upload complet",
+            "file": filename,
+            "upload_id": upload_id,
+            "chunks": total_chunks,
+            "window": window,
+            "total_time": total_time,
+            "results": ordered,
+        }
+    )
+
+
+def send_chunks(filepath, upload_id, indices, chunk_size, total_chunks, key_hex, window):
+    # Pipeline : lecture disque ‖ envois réseau. Le sémaphore borne la lecture
+    # anticipée : au plus `window` chunks en mémoire.
+    slots = BoundedSemaphore(window)
+    futures = {}
+
+    def release_slot(_future):
+        slots.release()
+
+    with ThreadPoolExecutor(max_workers=window) as pool, open(filepath, "rb") as f:
+        for chunk_index in indices:
+            slots.acquire()
+
+            # Arrêt anticipé : LB ou réseau en échec, la passe suivante reprendra
+            if any(fut.done() and fut.exception() for fut in futures.values()):
+                slots.release()
+                break
+
+            with tracer.start("client.read_chunk", chunk=chunk_index):
+                f.seek(chunk_index * chunk_size)
+                chunk = f.read(chunk_size)
+            fut = pool.submit(bind(put_chunk), upload_id, chunk_index, total_chunks, chunk, key_hex)
+            fut.add_done_callback(release_slot)
+            futures[chunk_index] = fut
+
+    results, failures = {}, []
+    for chunk_index, fut in futures.items():
+        try:
+            results[chunk_index] = fut.result()
+        except Exception as e:
+            failures.append((chunk_index, e))
+    return results, failures
+
+
+def file_keys(filepath, chunk_size):
+    # Clé et nonce (hex) du fichier : nouveaux, ou ceux d'un envoi identique
+    # précédent (REUSE_KEYS). Le découpage fait partie de l'empreinte : un même
+    # nonce ne doit jamais chiffrer deux clairs différents.
+    if not REUSE_KEYS:
+        return AESGCM.generate_key(bit_length=128).hex(), os.urandom(12).hex()
+
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    fingerprint = f"{digest.hexdigest()}:{chunk_size}"
+
+    try:
+        with open(KEYS_FILE) as f:
+            known = json.load(f)
+    except (OSError, ValueError):
+        known = {}
+    if fingerprint in known:
+        print("[CLIENT] Fichier déjà envoyé : clé et nonce réutilisés")
+        return known[fingerprint]["key"], known[fingerprint]["nonce"]
+
+    keys = {"key": AESGCM.generate_key(bit_length=128).hex(), "nonce": os.urandom(12).hex()}
+    known[fingerprint] = keys
+    with open(KEYS_FILE + ".tmp", "w") as f:
+        json.dump(known, f)
+    os.replace(KEYS_FILE + ".tmp", KEYS_FILE)
+    return keys["key"], keys["nonce"]
+
+
+def session_path(filename):
+    # Session en cours, côté client (la clé reste ici, comme le fichier clair)
+    return os.path.join(UPLOAD_FOLDER, filename + ".session.json")
+
+
+def save_session(filename, upload_id, key_hex, nonce_hex, chunk_size, total_chunks):
+    with open(session_path(filename), "w") as f:
+        json.dump(
+            {
+                "upload_id": upload_id,
+                "key": key_hex,
+                "nonce": nonce_hex,
+                "chunk_size": chunk_size,
+                "total_chunks": total_chunks,
+            },
+            f,
+        )
+
+
+def create_session(filename, file_size, nonce_hex, chunk_size):
+    r = pools.post(
+        f"{LOAD_BALANCER_URL}/uploads",
+        json={
+            "filename": filename,
+            "file_size": file_size,
+            "chunk_size": chunk_size,
+            "aes_nonce": nonce_hex,
+        },
+        timeout=10,
     )
+    r.raise_for_status()
+    return r.json()
+
+
+def missing_chunks(upload_id):
+    r = pools.get(f"{LOAD_BALANCER_URL}/uploads/{upload_id}", timeout=10)
+    r.raise_for_status()
+    return r.json()["missing"]
+
+
+def commit_session(upload_id):
+    # Renvoie (scellé, chunks manquants)
+    r = pools.post(f"{LOAD_BALANCER_URL}/uploads/{upload_id}/commit", timeout=30)
+    if r.status_code == 409:
+        return False, r.json().get("missing", [])
+    r.raise_for_status()
+    return True, []
+
+
+def put_chunk(upload_id, chunk_index, total_chunks, chunk, key_hex):
+    print(f"[CLIENT] → Envoi chunk {chunk_index}/{total_chunks-1}")
+
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "X-AES-Key": key_hex,
+        # Budget du chunk, propagé par le LB jusqu'au fog node
+        "X-Deadline-Ms": str(int(CHUNK_DEADLINE * 1000)),
+        "X-Tenant": TENANT,
+    }
+
+    t0 = time.time()
+    with tracer.start("client.put_chunk", upload_id=upload_id, chunk=chunk_index, bytes=len(chunk)) as span:
+        r = pools.put(
+            f"{LOAD_BALANCER_URL}/uploads/{upload_id}/chunks/{chunk_index}",
+            data=chunk,
+            headers={**headers, **span.headers()},
+            timeout=CHUNK_DEADLINE,
+        )
+        span.set(status=r.status_code)
+        r.raise_for_status()
+    elapsed = time.time() - t0
+
+    status = r.json().get("status")
+    print(f"[CLIENT] ✓ Chunk {chunk_index} envoyé avec succès ({elapsed:.3f}s, {status}).")
+
+    return {
+        "chunk": chunk_index,
+        "node_used": r.json().get("node_used"),
+        "total_time": elapsed,
+    }
 
 
 # ============================================================
@@ -116,31 +398,40 @@ def send_file_chunks():
 # ============================================================
 @app.route("/download_result/<filename>", methods=["GET"])
 def download_result(filename):
+    # Relais en flux LB → navigateur : rien n'est écrit sur le disque du client,
+    # le téléchargement commence tout de suite. Range / If-Range sont transmis
+    # au LB : un téléchargement interrompu reprend où il s'était arrêté.
     print(f"[CLIENT] → Téléchargement du fichier traité : {filename}")
 
-    result_path = os.path.join(RESULT_FOLDER, filename)
-
+    headers = {name: request.headers[name] for name in ("Range", "If-Range") if name in request.headers}
     try:
-        r = requests.get(
+        r = pools.get(
             f"{LOAD_BALANCER_URL}/download_result/{filename}",
+            headers=headers,
             stream=True,
             timeout=60,
         )
-        r.raise_for_status()
-
-        print("[CLIENT] Réception du fichier depuis LB...")
-
-        with open(result_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
-                if chunk:
-                    f.write(chunk)
-
-        print("[CLIENT] ✓ Fichier traité sauvegardé.")
-        return send_file(result_path, as_attachment=True)
-
     except Exception as e:
         print(f"[CLIENT][ERROR] Erreur lors du download : {e}")
-        return jsonify({"error": f"Erreur download result: {e}"}), 500
+        return jsonify({"error": f"Erreur download result: {e}"}), 502
+
+    def relay():
+        try:
+            for block in r.iter_content(chunk_size=DOWNLOAD_BLOCK):
+                yield block
+            print(f"[CLIENT] ✓ Fichier traité relayé : {filename}")
+        except Exception as e:
+            # En-têtes déjà envoyés : le navigateur voit un téléchargement tronqué
+            print(f"[CLIENT][ERROR] Download interrompu : {e}")
+
+    response = Response(
+        relay(),
+        status=r.status_code,
+        headers={name: r.headers[name] for name in RELAYED_HEADERS if name in r.headers},
+        direct_passthrough=True,
+    )
+    response.call_on_close(r.close)
+    return response
 
 
 # ============================================================
@@ -148,12 +439,16 @@ def download_result(filename):
 # ============================================================
 @app.route("/metrics", methods=["GET"])
 def get_metrics():
-    NODES = ["http://127.0.0.1:5001", "http://127.0.0.1:5002", "http://127.0.0.1:5003"]
+    # Parc courant vu par le LB (nœuds enregistrés), sinon la configuration statique
+    try:
+        NODES = pools.get(f"{LOAD_BALANCER_URL}/nodes", timeout=1).json()["nodes"]
+    except Exception:
+        NODES = FOG_NODES
     metrics = []
 
     for node in NODES:
         try:
-            r = requests.get(f"{node}/health", timeout=1)
+            r = pools.get(f"{node}/health", timeout=1)
             metrics.append(r.json())
         except:
             metrics.append({"node": node, "error": "unreachable"})
@@ -161,6 +456,11 @@ def get_metrics():
     return jsonify(metrics)
 
 
+@app.route("/pool_stats", methods=["GET"])
+def pool_stats():
+    return jsonify(pools.stats())
+
+
 # ============================================================
 # RUN CLIENT
 # ============================================================
@@ -0,0 +1,30 @@
+# config.py — Paramètres partagés par le client, le load balancer et les fog nodes
+#
+# Surchargeables par variables d'environnement, par ex. :
+#   FOG_NODES=http://10.0.0.2:5001,http://10.0.0.3:5001 python src/load_balancer/load_balancer.py
+
+import os
+
+
+def parse_nodes(value):
+    return [node.strip().rstrip("/") for node in value.split(",") if node.strip()]
+
+
+# Fog nodes connus au démarrage du LB (d'autres peuvent s'enregistrer ensuite)
+FOG_NODES = parse_nodes(
+    os.environ.get(
+        "FOG_NODES",
+        "http://127.0.0.1:5001,http://127.0.0.1:5002,http://127.0.0.1:5003",
+    )
+)
+
+LOAD_BALANCER_URL = os.environ.get("LOAD_BALANCER_URL", "http://127.0.0.1:5005").rstrip("/")
+
+# Taille de chunk par défaut (le LB recommande une taille par upload : GET /chunk_plan)
+CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", str(5 * 1024 * 1024)))
+
+# Jeton partagé LB ↔ fog nodes (en-tête X-Node-Token) exigé pour s'enregistrer :
+# un nœud enregistré reçoit les clés AES et les chunks en clair. Sans jeton, le
+# LB n'accepte que les nœuds qui s'enregistrent depuis la machine locale.
+NODE_TOKEN = os.environ.get("NODE_TOKEN", "")
+NODE_TOKEN_HEADER = "X-Node-Token"
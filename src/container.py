@@ -0,0 +1,163 @@
+# container.py — Format du fichier chiffré (conteneur AEAD découpé en enregistrements)
+#
+#   en-tête | enregistrement 0 | enregistrement 1 | ... | index | fin
+#
+# en-tête        : "FOGC", version, taille de chunk, nombre de chunks, taille du
+#                  fichier clair, nonce de base (HEADER, 36 octets)
+# enregistrement : index, longueur du clair, nonce (RECORD, 20 octets),
+#                  puis chiffré + tag GCM (longueur + 16 octets)
+# index          : (offset, taille) de chaque enregistrement (INDEX_ENTRY)
+# fin            : offset de l'index, nombre de chunks, "FOGI" (TRAILER, 16 octets)
+#
+# Chaque chunk a son propre nonce (nonce de base XOR index) : jamais deux
+# chunks chiffrés avec le même couple clé/nonce. L'index du chunk et le nombre
+# total de chunks sont authentifiés (données associées) : un enregistrement
+# déplacé, dupliqué ou un fichier tronqué ne se déchiffre pas. Tous les
+# enregistrements sauf le dernier ont la même taille : l'offset du chunk i se
+# calcule directement, un chunk se lit avec un seul seek, et chaque chunk se
+# chiffre / déchiffre indépendamment, sur n'importe quel nœud, dans n'importe
+# quel ordre.
+
+import struct
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"FOGC"
+INDEX_MAGIC = b"FOGI"
+VERSION = 1
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+HEADER = struct.Struct(">4sHHIIQ12s")  # magic, version, flags, chunk_size, total_chunks, file_size, base_nonce
+RECORD = struct.Struct(">II12s")  # index, longueur du clair, nonce
+INDEX_ENTRY = struct.Struct(">QI")  # offset, taille de l'enregistrement
+TRAILER = struct.Struct(">QI4s")  # offset de l'index, nombre de chunks, INDEX_MAGIC
+
+
+class ContainerError(ValueError):
+    pass
+
+
+def chunk_nonce(base_nonce, index):
+    # Nonce du chunk : index XOR les 8 derniers octets du nonce de base
+    counter = int.from_bytes(base_nonce[4:], "big") ^ index
+    return base_nonce[:4] + counter.to_bytes(8, "big")
+
+
+def associated_data(index, total_chunks, length):
+    return struct.pack(">4sIII", MAGIC, index, total_chunks, length)
+
+
+def record_size(length):
+    return RECORD.size + length + TAG_SIZE
+
+
+def record_offset(chunk_size, index):
+    return HEADER.size + index * record_size(chunk_size)
+
+
+def container_size(chunk_size, total_chunks, file_size):
+    last = file_size - (total_chunks - 1) * chunk_size
+    return record_offset(chunk_size, total_chunks - 1) + record_size(last) + index_size(total_chunks)
+
+
+def index_size(total_chunks):
+    return total_chunks * INDEX_ENTRY.size + TRAILER.size
+
+
+# -----------------------------
+# Chiffrement / déchiffrement d'un chunk
+# -----------------------------
+def encrypt_record(key, base_nonce, index, total_chunks, data):
+    if len(base_nonce) != NONCE_SIZE:
+        raise ContainerError(f"Nonce de base de {len(base_nonce)} octets (attendu : {NONCE_SIZE})")
+    nonce = chunk_nonce(base_nonce, index)
+    sealed = AESGCM(key).encrypt(nonce, data, associated_data(index, total_chunks, len(data)))
+    return RECORD.pack(index, len(data), nonce) + sealed
+
+
+def decrypt_record(key, record, total_chunks, expected_index=None):
+    # Renvoie (index, clair) ; lève ContainerError si l'enregistrement est invalide
+    if len(record) < RECORD.size + TAG_SIZE:
+        raise ContainerError("Enregistrement tronqué")
+    index, length, nonce = RECORD.unpack_from(record)
+    if expected_index is not None and index != expected_index:
+        raise ContainerError(f"Enregistrement {index} trouvé à la place du chunk {expected_index}")
+    if len(record) != record_size(length):
+        raise ContainerError(f"Enregistrement {index} : taille {len(record)} au lieu de {record_size(length)}")
+    try:
+        data = AESGCM(key).decrypt(
+            nonce, memoryview(record)[RECORD.size:], associated_data(index, total_chunks, length)
+        )
+    except Exception as e:
+        raise ContainerError(f"Chunk {index} : authentification impossible ({type(e).__name__})") from e
+    return index, data
+
+
+# -----------------------------
+# En-tête et index
+# -----------------------------
+def pack_header(chunk_size, total_chunks, file_size, base_nonce):
+    return HEADER.pack(MAGIC, VERSION, 0, chunk_size, total_chunks, file_size, base_nonce)
+
+
+def parse_header(data):
+    if len(data) < HEADER.size:
+        raise ContainerError("En-tête tronqué")
+    magic, version, _, chunk_size, total_chunks, file_size, base_nonce = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ContainerError("Fichier non reconnu (en-tête FOGC absent)")
+    if version != VERSION:
+        raise ContainerError(f"Version de conteneur {version} non prise en charge")
+    return {
+        "chunk_size": chunk_size,
+        "total_chunks": total_chunks,
+        "file_size": file_size,
+        "base_nonce": base_nonce,
+    }
+
+
+def pack_index(chunk_size, total_chunks, file_size):
+    # Index + fin, placés juste après le dernier enregistrement
+    entries = []
+    for index in range(total_chunks):
+        length = min(chunk_size, file_size - index * chunk_size)
+        entries.append(INDEX_ENTRY.pack(record_offset(chunk_size, index), record_size(length)))
+    index_offset = record_offset(chunk_size, total_chunks - 1) + record_size(
+        file_size - (total_chunks - 1) * chunk_size
+    )
+    return b"".join(entries) + TRAILER.pack(index_offset, total_chunks, INDEX_MAGIC)
+
+
+class Container:
+    # Lecture d'un conteneur : en-tête + index, puis accès direct à chaque chunk
+    def __init__(self, f):
+        self.f = f
+        size = f.seek(0, 2)
+        if size < HEADER.size + TRAILER.size:
+            raise ContainerError(f"Fichier tronqué ({size} octets)")
+        f.seek(0)
+        self.header = parse_header(f.read(HEADER.size))
+
+        f.seek(size - TRAILER.size)
+        index_offset, total_chunks, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != INDEX_MAGIC or total_chunks != self.header["total_chunks"]:
+            raise ContainerError("Index absent ou incohérent (fichier incomplet ?)")
+        if index_offset + total_chunks * INDEX_ENTRY.size > size - TRAILER.size:
+            raise ContainerError("Index tronqué")
+        f.seek(index_offset)
+        raw = f.read(total_chunks * INDEX_ENTRY.size)
+        self.index = list(INDEX_ENTRY.iter_unpack(raw))
+
+    @property
+    def total_chunks(self):
+        return self.header["total_chunks"]
+
+    def read_record(self, index):
+        offset, size = self.index[index]
+        self.f.seek(offset)
+        return self.f.read(size)
+
+    def read_chunk(self, key, index):
+        _, data = decrypt_record(key, self.read_record(index), self.total_chunks, expected_index=index)
+        return data
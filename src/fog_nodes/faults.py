@@ -0,0 +1,176 @@
+# faults.py — Injection de pannes et de lenteurs dans un fog node (tests locaux)
+#
+# Rend un nœud local aussi inégal qu'un nœud de production (CPU plus lent,
+# lien instable) pour comparer les stratégies et le failover du LB :
+#
+#   FOG_FAULTS='{"latency": {"dist": "lognormal", "median": 0.05, "sigma": 0.5}}' python src/fog_nodes/fog_node.py
+#   python src/fog_nodes/fog_node.py --faults faults.json
+#   python src/fog_nodes/fog_node.py --admin          # pannes à chaud (cf. README : X-Node-Token)
+#   curl -X POST -H "Content-Type: application/json" -d '{"error_rate": 0.1}' http://127.0.0.1:5001/admin/faults
+#   curl -X DELETE http://127.0.0.1:5001/admin/faults
+#
+# Clés (toutes optionnelles, seules les routes de chunks sont touchées) :
+#   latency     : secondes ajoutées avant traitement ; nombre, ou distribution
+#                 {"dist": fixed (value) | uniform (min, max) | normal (mean, stddev)
+#                  | lognormal (median, sigma) | exponential (mean), "probability": p}
+#   bandwidth   : débit plafonné du nœud, octets/s (chunk reçu + réponse, toutes requêtes confondues)
+#   cpu_factor  : multiplicateur du temps de chiffrement (2 = CPU deux fois plus lent, calcul réel)
+#   error_rate  : probabilité de répondre error_status (500 par défaut) sans traiter
+#   hang_rate   : probabilité de bloquer hang_time secondes (60 par défaut) avant traitement
+#   seed        : graine des tirages (reproductibilité)
+
+import hashlib
+import json
+import math
+import random
+import time
+from threading import Lock
+
+DISTRIBUTIONS = {
+    "fixed": ("value",),
+    "uniform": ("min", "max"),
+    "normal": ("mean", "stddev"),
+    "lognormal": ("median", "sigma"),
+    "exponential": ("mean",),
+}
+KEYS = {"latency", "bandwidth", "cpu_factor", "error_rate", "error_status", "hang_rate", "hang_time", "seed"}
+BURN_BLOCK = b"\0" * (64 * 1024)
+
+
+def load_config(value):
+    # FOG_FAULTS / --faults : JSON, ou chemin d'un fichier JSON
+    if not value:
+        return {}
+    if value.lstrip().startswith("{"):
+        return json.loads(value)
+    with open(value) as f:
+        return json.load(f)
+
+
+def validate(config):
+    if not isinstance(config, dict):
+        raise ValueError("Configuration attendue : objet JSON")
+    unknown = set(config) - KEYS
+    if unknown:
+        raise ValueError(f"Clés inconnues : {', '.join(sorted(unknown))} (disponibles : {', '.join(sorted(KEYS))})")
+
+    latency = config.get("latency")
+    if isinstance(latency, (int, float)):
+        latency = {"dist": "fixed", "value": latency}
+    if latency is not None:
+        dist = latency.get("dist", "fixed")
+        if dist not in DISTRIBUTIONS:
+            raise ValueError(f"Distribution inconnue : {dist} (disponibles : {', '.join(DISTRIBUTIONS)})")
+        missing = [p for p in DISTRIBUTIONS[dist] if p not in latency]
+        if missing:
+            raise ValueError(f"latency {dist} : paramètres manquants {', '.join(missing)}")
+        latency = {"dist": dist, "probability": float(latency.get("probability", 1.0)),
+                   **{p: float(latency[p]) for p in DISTRIBUTIONS[dist]}}
+
+    for key in ("error_rate", "hang_rate"):
+        if not 0 <= float(config.get(key, 0)) <= 1:
+            raise ValueError(f"{key} : probabilité entre 0 et 1 attendue")
+    if float(config.get("cpu_factor", 1)) < 1:
+        raise ValueError("cpu_factor : multiplicateur ≥ 1 attendu")
+    if float(config.get("bandwidth", 0)) < 0:
+        raise ValueError("bandwidth : octets/s positifs attendus")
+    if not 500 <= int(config.get("error_status", 500)) <= 599:
+        raise ValueError("error_status : code 5xx attendu")
+
+    return {
+        "latency": latency,
+        "bandwidth": float(config.get("bandwidth", 0)),
+        "cpu_factor": float(config.get("cpu_factor", 1)),
+        "error_rate": float(config.get("error_rate", 0)),
+        "error_status": int(config.get("error_status", 500)),
+        "hang_rate": float(config.get("hang_rate", 0)),
+        "hang_time": float(config.get("hang_time", 60)),
+        "seed": config.get("seed"),
+    }
+
+
+def burn_cpu(seconds):
+    # Calcul réel (SHA-256, GIL relâché) : occupe le worker comme un CPU plus lent
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        hashlib.sha256(BURN_BLOCK).digest()
+
+
+class FaultInjector:
+    def __init__(self, config=None):
+        self.lock = Lock()
+        self.free_at = 0.0
+        self.counters = {"delayed": 0, "errors": 0, "hangs": 0, "throttled_bytes": 0}
+        self.configure(config or {})
+
+    def configure(self, config):
+        # Remplace toute la configuration (ValueError si invalide, l'ancienne reste active)
+        config = validate(config)
+        with self.lock:
+            self.config = config
+            self.rng = random.Random(config["seed"])
+            self.free_at = 0.0
+
+    @property
+    def enabled(self):
+        c = self.config
+        return bool(c["latency"] or c["bandwidth"] or c["cpu_factor"] > 1 or c["error_rate"] or c["hang_rate"])
+
+    @property
+    def cpu_factor(self):
+        return self.config["cpu_factor"]
+
+    def status(self):
+        with self.lock:
+            return {"enabled": self.enabled, "config": self.config, **self.counters}
+
+    # -----------------------------
+    # Tirages (un par chunk)
+    # -----------------------------
+    def hang(self):
+        # Durée de blocage (0 : pas de blocage)
+        with self.lock:
+            if self.config["hang_rate"] and self.rng.random() < self.config["hang_rate"]:
+                self.counters["hangs"] += 1
+                return self.config["hang_time"]
+        return 0.0
+
+    def error(self):
+        # Code 5xx à renvoyer (None : pas d'erreur)
+        with self.lock:
+            if self.config["error_rate"] and self.rng.random() < self.config["error_rate"]:
+                self.counters["errors"] += 1
+                return self.config["error_status"]
+        return None
+
+    def delay(self):
+        with self.lock:
+            latency = self.config["latency"]
+            if not latency or self.rng.random() >= latency["probability"]:
+                return 0.0
+            dist = latency["dist"]
+            if dist == "fixed":
+                value = latency["value"]
+            elif dist == "uniform":
+                value = self.rng.uniform(latency["min"], latency["max"])
+            elif dist == "normal":
+                value = self.rng.gauss(latency["mean"], latency["stddev"])
+            elif dist == "lognormal":
+                value = self.rng.lognormvariate(math.log(latency["median"]), latency["sigma"])
+            else:
+                value = self.rng.expovariate(1 / latency["mean"]) if latency["mean"] > 0 else 0.0
+            if value > 0:
+                self.counters["delayed"] += 1
+            return max(0.0, value)
+
+    def throttle(self, nbytes):
+        # Débit plafonné : chaque transfert réserve sa part du lien, puis attend la fin
+        bandwidth = self.config["bandwidth"]
+        if not bandwidth or nbytes <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.free_at = max(self.free_at, now) + nbytes / bandwidth
+            wait = self.free_at - now
+            self.counters["throttled_bytes"] += nbytes
+        time.sleep(wait)
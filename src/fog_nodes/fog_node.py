@@ -0,0 +1,603 @@
+# fog_node.py — Fog node paramétrable (un seul module pour toutes les instances)
+#
+#   python src/fog_nodes/fog_node.py --port 5001 --lb http://127.0.0.1:5005
+#
+# Plusieurs instances sur une machine : cf. launcher.py.
+
+from flask import Flask, request, jsonify, Response
+import os, sys, math, argparse, functools, hmac, signal, psutil, time, threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from prometheus_client import start_http_server, Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+# Modules partagés de src/ (pool HTTP, format du conteneur chiffré)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_pool import pools
+from config import NODE_TOKEN, NODE_TOKEN_HEADER
+from container import NONCE_SIZE, ContainerError, decrypt_record, encrypt_record
+from faults import FaultInjector, burn_cpu, load_config
+from tracing import CHUNK_HEADER, UPLOAD_HEADER, Tracer
+
+app = Flask(__name__)
+
+# -----------------------------
+# PROMETHEUS METRICS
+# -----------------------------
+# Étiquettes bornées : nœud, opération, tenant (FOG_TENANTS, "other" au-delà) ;
+# jamais de nom de fichier. Les jauges sont calculées au scrape (FogCollector).
+chunks_counter = Counter('chunks_processed_total', 'Total chunks encrypted', ['node', 'tenant'])
+decrypted_counter = Counter('chunks_decrypted_total', 'Total chunks decrypted (restore)', ['node', 'tenant'])
+bytes_counter = Counter('fog_bytes_processed_total', 'Plaintext bytes encrypted or decrypted', ['node', 'operation', 'tenant'])
+crypto_histogram = Histogram(
+    'fog_crypto_seconds', 'AES-GCM time per chunk in a worker (encrypt or decrypt)', ['node', 'operation'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+errors_counter = Counter('errors_total', 'Total errors', ['node'])
+rejected_counter = Counter('fog_rejected_total', 'Chunks rejected with 503 (node saturated)')
+expired_counter = Counter('fog_expired_total', 'Chunks dropped with 504 (deadline passed before encryption)')
+faults_counter = Counter('fog_faults_injected_total', 'Faults injected on chunk routes (faults.py)', ['kind'])
+
+tasks_running = 0  # chunks admis (lecture, attente ou chiffrement)
+in_pool = 0  # chunks soumis au pool de chiffrement
+bytes_in_flight = 0
+encrypted_bytes_total = 0
+encrypt_time_total = 0.0
+lock = threading.Lock()
+
+PORT = int(os.environ.get("PORT", "5001"))
+METRICS_PORT = int(os.environ.get("METRICS_PORT", str(8000 + (PORT % 1000))))
+
+# LB auprès duquel s'enregistrer au démarrage (vide = pas d'enregistrement)
+LB_URL = os.environ.get("LB_URL", "")
+ADVERTISE_URL = os.environ.get("ADVERTISE_URL", "")
+HEARTBEAT_PERIOD = float(os.environ.get("FOG_HEARTBEAT_PERIOD", "2"))
+# Jeton présenté au LB (NODE_TOKEN, cf. config.py)
+NODE_HEADERS = {NODE_TOKEN_HEADER: NODE_TOKEN} if NODE_TOKEN else {}
+
+# Tenants suivis un par un dans les métriques (en-tête X-Tenant), les autres sont regroupés
+TENANTS = {t.strip() for t in os.environ.get("FOG_TENANTS", "").split(",") if t.strip()}
+
+# Échantillonnage à la demande : au plus une mesure par période, lissage exponentiel (1 = pas de lissage)
+SAMPLE_PERIOD = float(os.environ.get("FOG_SAMPLE_PERIOD", "1"))
+SAMPLE_ALPHA = float(os.environ.get("FOG_SAMPLE_ALPHA", "0.5"))
+
+# Pool de chiffrement : AES-GCM (cryptography) relâche le GIL, des threads
+# suffisent à occuper tous les cœurs ; FOG_POOL=process pour des processus.
+WORKERS = int(os.environ.get("FOG_WORKERS", str(os.cpu_count() or 1)))
+MAX_QUEUE = int(os.environ.get("FOG_MAX_QUEUE", str(2 * WORKERS)))
+POOL_KIND = os.environ.get("FOG_POOL", "thread")
+executor = None
+
+# Pannes / lenteurs injectées (FOG_FAULTS, --faults ou POST /admin/faults)
+faults = FaultInjector(load_config(os.environ.get("FOG_FAULTS")))
+# /admin/faults n'existe que sur demande (FOG_ADMIN=1, --admin, ou pannes configurées au démarrage)
+ADMIN = os.environ.get("FOG_ADMIN") == "1" or bool(os.environ.get("FOG_FAULTS"))
+LOOPBACK = ("127.0.0.1", "::1")
+
+# Spans des chunks (contexte reçu du LB, cf. tracing.py)
+tracer = Tracer("fog")
+
+
+def smooth(previous, value):
+    return SAMPLE_ALPHA * value + (1 - SAMPLE_ALPHA) * previous
+
+
+def encrypt_chunk(key, nonce, index, total_chunks, data, deadline=None, cpu_factor=1.0):
+    # Exécuté dans un worker du pool (fonction de module : sérialisable en mode process).
+    # Renvoie l'enregistrement du conteneur (nonce propre au chunk, cf. container.py).
+    # Échéance passée pendant l'attente d'un worker : chunk abandonné (None)
+    if deadline is not None and time.time() > deadline:
+        return None, 0.0
+    t0 = time.perf_counter()
+    record = encrypt_record(key, nonce, index, total_chunks, data)
+    if cpu_factor > 1:
+        # CPU ralenti (faults.py) : le worker reste occupé (cpu_factor - 1) × le temps réel
+        burn_cpu((cpu_factor - 1) * (time.perf_counter() - t0))
+    return record, time.perf_counter() - t0
+
+
+def decrypt_chunk(key, index, total_chunks, record, deadline=None, cpu_factor=1.0):
+    # Pendant de encrypt_chunk : enregistrement du conteneur → clair (ContainerError si invalide)
+    if deadline is not None and time.time() > deadline:
+        return None, 0.0
+    t0 = time.perf_counter()
+    _, data = decrypt_record(key, record, total_chunks, expected_index=index)
+    if cpu_factor > 1:
+        burn_cpu((cpu_factor - 1) * (time.perf_counter() - t0))
+    return data, time.perf_counter() - t0
+
+
+def pool_load():
+    # (workers occupés, chunks en attente d'un worker)
+    return min(in_pool, WORKERS), max(0, in_pool - WORKERS)
+
+
+# -----------------------------
+# SAMPLER (unique source des métriques CPU/RAM/débit)
+# -----------------------------
+class Sampler:
+    # Mesure faite à la lecture (/health, scrape Prometheus), au plus une fois par
+    # SAMPLE_PERIOD : rien n'est calculé entre deux lectures
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_bytes, self.last_time = 0, 0.0
+        self.snapshot = {
+            "cpu_percent": 0.0,
+            "ram_percent": 0.0,
+            "encrypt_throughput": 0.0,
+            "encrypt_rate": 0.0,
+            "worker_utilization": 0.0,
+            "sampled_at": time.time(),
+        }
+        psutil.cpu_percent(interval=None)  # amorce : la mesure suivante couvre une période
+
+    def current(self):
+        with self.lock:
+            now = time.time()
+            period = now - self.snapshot["sampled_at"]
+            if period >= SAMPLE_PERIOD:
+                self.snapshot = self._sample(now, period)
+            return self.snapshot
+
+    def _sample(self, now, period):
+        with lock:
+            done_bytes, done_time = encrypted_bytes_total, encrypt_time_total
+
+        # Débit récent : octets chiffrés depuis la mesure précédente
+        throughput = (done_bytes - self.last_bytes) / period
+        # Vitesse de chiffrement pure : octets par seconde de chiffrement
+        busy = done_time - self.last_time
+        previous = self.snapshot
+        rate = (done_bytes - self.last_bytes) / busy if busy > 0 else previous["encrypt_rate"]
+        self.last_bytes, self.last_time = done_bytes, done_time
+
+        return {
+            "cpu_percent": smooth(previous["cpu_percent"], psutil.cpu_percent(interval=None)),
+            "ram_percent": smooth(previous["ram_percent"], psutil.virtual_memory().percent),
+            "encrypt_throughput": smooth(previous["encrypt_throughput"], throughput),
+            "encrypt_rate": smooth(previous["encrypt_rate"], rate) if previous["encrypt_rate"] else rate,
+            # Part du temps des workers passée à chiffrer depuis la mesure précédente
+            "worker_utilization": smooth(previous["worker_utilization"], min(1.0, busy / (period * WORKERS))),
+            "sampled_at": now,
+        }
+
+
+sampler = Sampler()
+
+
+class FogCollector:
+    # Jauges calculées au scrape (mêmes noms que les anciennes Gauge)
+    def collect(self):
+        snapshot = sampler.current()
+        busy_workers, waiting = pool_load()
+        for name, doc, value in (
+            ('fog_cpu_percent', 'CPU usage percent', snapshot["cpu_percent"]),
+            ('fog_ram_percent', 'RAM usage percent', snapshot["ram_percent"]),
+            ('fog_queue_depth', 'Chunks waiting for an encryption worker', waiting),
+            ('fog_workers_busy', 'Encryption workers currently busy', busy_workers),
+            ('fog_worker_utilization', 'Fraction of worker time spent encrypting over the last sample period',
+             snapshot["worker_utilization"]),
+            ('fog_tasks_running', 'Chunks admitted (reading, waiting or being processed)', tasks_running),
+            ('fog_bytes_in_flight', 'Chunk bytes held by admitted requests', bytes_in_flight),
+        ):
+            yield GaugeMetricFamily(name, doc, value=value)
+
+
+REGISTRY.register(FogCollector())
+
+
+def tenant_label():
+    # En-tête X-Tenant → étiquette bornée : tenant suivi, "other", ou "none" (absent)
+    tenant = request.headers.get("X-Tenant")
+    if not tenant:
+        return "none"
+    return tenant if tenant in TENANTS else "other"
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    snapshot = sampler.current()
+    busy_workers, waiting = pool_load()
+    return jsonify({
+        "status": "ok",
+        "port": PORT,
+        "cpu_percent": round(snapshot["cpu_percent"], 1),
+        "ram_percent": round(snapshot["ram_percent"], 1),
+        "tasks_running": tasks_running,
+        "queue_depth": waiting,
+        "workers": WORKERS,
+        "workers_busy": busy_workers,
+        "worker_utilization": snapshot["worker_utilization"],
+        "bytes_in_flight": bytes_in_flight,
+        "encrypt_throughput": snapshot["encrypt_throughput"],
+        "encrypt_rate": snapshot["encrypt_rate"],
+        "sample_age": time.time() - snapshot["sampled_at"],
+        "faults": faults.enabled,
+    })
+
+
+def node_auth(view):
+    # Même règle que le registre du LB : jeton partagé (NODE_TOKEN), sinon appels locaux uniquement
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        if NODE_TOKEN:
+            token = request.headers.get(NODE_TOKEN_HEADER)
+            if not token:
+                return jsonify({"error": f"En-tête {NODE_TOKEN_HEADER} manquant"}), 401
+            if not hmac.compare_digest(token.encode(), NODE_TOKEN.encode()):
+                print(f"[FOG {PORT}] ✗ Jeton invalide sur {request.path} ({request.remote_addr})")
+                return jsonify({"error": "Jeton invalide"}), 403
+        elif request.remote_addr not in LOOPBACK:
+            print(f"[FOG {PORT}] ✗ Appel distant refusé sans NODE_TOKEN sur {request.path} ({request.remote_addr})")
+            return jsonify({"error": "NODE_TOKEN non configuré : seuls les appels locaux sont acceptés"}), 403
+        return view(**kwargs)
+
+    return wrapper
+
+
+def enable_admin():
+    # Enregistre /admin/faults (une seule fois, avant de servir)
+    if "admin_faults" not in app.view_functions:
+        app.add_url_rule("/admin/faults", view_func=admin_faults, methods=["GET", "POST", "DELETE"])
+
+
+@node_auth
+def admin_faults():
+    # POST : remplace toute la configuration (cf. faults.py) ; DELETE : désactive tout
+    if request.method != "GET":
+        config = request.get_json(silent=True) if request.method == "POST" else {}
+        try:
+            faults.configure({} if config is None else config)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        print(f"[FOG {PORT}] Pannes injectées : {faults.status()['config'] if faults.enabled else 'aucune'}")
+    return jsonify(faults.status())
+
+
+if ADMIN:
+    enable_admin()
+
+
+def request_deadline():
+    # X-Deadline-Ms : budget restant à l'envoi, converti en échéance locale
+    try:
+        return time.time() + float(request.headers["X-Deadline-Ms"]) / 1000
+    except (KeyError, ValueError):
+        return None
+
+
+def inject_faults():
+    # Blocage, erreur 5xx, latence ajoutée ; renvoie la réponse d'erreur à servir, ou None
+    hang = faults.hang()
+    if hang:
+        faults_counter.labels(kind="hang").inc()
+        print(f"[FOG {PORT}] ✗ Panne injectée : blocage {hang:.0f}s")
+        with tracer.start("fog.fault", kind="hang"):
+            time.sleep(hang)
+
+    status = faults.error()
+    if status:
+        faults_counter.labels(kind="error").inc()
+        print(f"[FOG {PORT}] ✗ Panne injectée → {status}")
+        return jsonify({"error": "Panne injectée"}), status
+
+    delay = faults.delay()
+    if delay:
+        faults_counter.labels(kind="latency").inc()
+        with tracer.start("fog.fault", kind="latency"):
+            time.sleep(delay)
+    return None
+
+
+def deadline_expired(chunk_index):
+    expired_counter.inc()
+    print(f"[FOG {PORT}] ✗ Échéance dépassée, chunk {chunk_index} abandonné → 504")
+    return jsonify({"error": "Échéance dépassée, chunk abandonné"}), 504
+
+
+AES_KEY_SIZES = (16, 24, 32)
+
+
+def task_params(with_nonce):
+    # En-têtes du LB validés avant de passer par le pool : (clé, nonce, index, total).
+    # ValueError → 400 (requête invalide, inutile de réessayer ailleurs)
+    names = ["X-AES-Key", "X-Chunk-Index", "X-Total-Chunks"] + (["X-AES-Nonce"] if with_nonce else [])
+    missing = [name for name in names if not request.headers.get(name)]
+    if missing:
+        raise ValueError(f"Headers manquants : {', '.join(missing)}")
+
+    try:
+        chunk_index = int(request.headers["X-Chunk-Index"])
+        total_chunks = int(request.headers["X-Total-Chunks"])
+    except ValueError:
+        raise ValueError("Headers X-Chunk-Index / X-Total-Chunks : entiers attendus") from None
+    if not 0 <= chunk_index < total_chunks:
+        raise ValueError(f"Chunk {chunk_index} hors limites (0..{total_chunks - 1})")
+
+    try:
+        key = bytes.fromhex(request.headers["X-AES-Key"])
+        nonce = bytes.fromhex(request.headers["X-AES-Nonce"]) if with_nonce else None
+    except ValueError:
+        raise ValueError("Headers X-AES-Key / X-AES-Nonce : hexadécimal attendu") from None
+    if len(key) not in AES_KEY_SIZES:
+        raise ValueError(f"Clé AES de {len(key)} octets (attendu : 16, 24 ou 32)")
+    if with_nonce and len(nonce) != NONCE_SIZE:
+        raise ValueError(f"Nonce de {len(nonce)} octets (attendu : {NONCE_SIZE})")
+    return key, nonce, chunk_index, total_chunks
+
+
+def bad_request(e):
+    errors_counter.labels(node=str(PORT)).inc()
+    print(f"[FOG {PORT}] ✗ {e} → 400")
+    return jsonify({"error": str(e)}), 400
+
+
+# -----------------------------
+# CADRE COMMUN DES TÂCHES (chiffrement, déchiffrement)
+# -----------------------------
+def traced_task(name, process):
+    # Span du chunk, fils de l'envoi du LB (X-Trace-Id / X-Span-Id)
+    with tracer.start(
+        name,
+        request.headers,
+        node=PORT,
+        upload_id=request.headers.get(UPLOAD_HEADER),
+        chunk=request.headers.get(CHUNK_HEADER),
+        bytes=request.content_length,
+    ) as span:
+        response = chunk_task(process)
+        span.set(status=response[1] if isinstance(response, tuple) else response.status_code)
+        return response
+
+
+def chunk_task(process):
+    # Admission bornée, lecture du corps, échéance et comptage ;
+    # process(chunk_data, deadline) fait le travail et renvoie la réponse
+    global tasks_running, bytes_in_flight
+    chunk_size = 0
+    deadline = request_deadline()
+
+    # Admission bornée : au-delà des workers + file d'attente, on refuse tout de suite
+    with lock:
+        if tasks_running >= WORKERS + MAX_QUEUE:
+            saturated = True
+        else:
+            saturated = False
+            tasks_running += 1
+
+    if saturated:
+        rejected_counter.inc()
+        # Estimation du temps pour écouler la file actuelle
+        rate = sampler.current()["encrypt_rate"]
+        retry_after = max(1, math.ceil(bytes_in_flight / (rate * WORKERS))) if rate else 1
+        print(f"[FOG {PORT}] ✗ Saturé ({tasks_running} chunks en cours) → 503")
+        resp = jsonify({"error": "Fog node saturé", "tasks_running": tasks_running})
+        resp.headers["Retry-After"] = str(retry_after)
+        return resp, 503
+
+    try:
+        injected = inject_faults()
+        if injected is not None:
+            return injected
+
+        # Chunk envoyé par le LB : corps brut (octet-stream) ou multipart files['chunk']
+        with tracer.start("fog.read_body"):
+            if request.mimetype == "application/octet-stream":
+                chunk_data = request.get_data()
+            elif "chunk" in request.files:
+                chunk_data = request.files["chunk"].read()
+            else:
+                raise Exception("Chunk manquant (corps octet-stream ou POST files['chunk'])")
+
+            if not chunk_data:
+                raise Exception("Chunk vide reçu")
+
+            with lock:
+                chunk_size = len(chunk_data)
+                bytes_in_flight += chunk_size
+            faults.throttle(chunk_size)
+
+        # Le LB a déjà abandonné ce chunk (retry ailleurs) : inutile de le traiter
+        if deadline is not None and time.time() > deadline:
+            return deadline_expired(request.headers.get("X-Chunk-Index"))
+
+        response = process(chunk_data, deadline)
+        if isinstance(response, Response):
+            faults.throttle(response.content_length or 0)
+        return response
+
+    except Exception as e:
+        print(f"[FOG {PORT}] ERREUR: {e}")
+        errors_counter.labels(node=str(PORT)).inc()
+        return jsonify({"error": str(e)}), 500
+
+    finally:
+        with lock:
+            tasks_running -= 1
+            bytes_in_flight -= chunk_size
+
+
+def run_in_pool(fn, *args):
+    # Traitement dans le pool de workers ; renvoie (résultat, durée)
+    global in_pool, encrypted_bytes_total, encrypt_time_total
+    with lock:
+        in_pool += 1
+    submitted = time.time()
+    try:
+        result, elapsed = executor.submit(fn, *args).result()
+    finally:
+        with lock:
+            in_pool -= 1
+
+    # Attente d'un worker (et sérialisation en mode process), puis calcul
+    done = time.time()
+    span = tracer.current()
+    span.record("fog.queue", submitted, done - elapsed)
+    span.record(f"fog.{fn.__name__}", done - elapsed, done)
+
+    if result is not None:
+        # Débit AES-GCM (chiffrement ou déchiffrement) : estimation du Retry-After
+        with lock:
+            encrypted_bytes_total += len(result)
+            encrypt_time_total += elapsed
+    return result, elapsed
+
+
+# -----------------------------
+# RÉCEPTION DU CHUNK
+# -----------------------------
+@app.route("/task_chunk", methods=["POST"])
+def task_chunk():
+    return traced_task("fog.task_chunk", encrypt_task)
+
+
+def encrypt_task(chunk_data, deadline):
+    # Headers envoyés par le LB (obligatoires)
+    try:
+        key, nonce, chunk_index, total_chunks = task_params(with_nonce=True)
+    except ValueError as e:
+        return bad_request(e)
+    filename = request.headers.get("X-File-Name", "unknown")
+
+    print(f"[FOG {PORT}] → Réception chunk {chunk_index} pour fichier {filename}")
+
+    # Traitement = chiffrement, dans le pool de workers
+    encrypted_chunk, elapsed = run_in_pool(
+        encrypt_chunk, key, nonce, chunk_index, total_chunks, chunk_data, deadline, faults.cpu_factor
+    )
+    if encrypted_chunk is None:
+        return deadline_expired(chunk_index)
+
+    tenant = tenant_label()
+    chunks_counter.labels(node=str(PORT), tenant=tenant).inc()
+    bytes_counter.labels(node=str(PORT), operation="encrypt", tenant=tenant).inc(len(chunk_data))
+    crypto_histogram.labels(node=str(PORT), operation="encrypt").observe(elapsed)
+
+    print(f"[FOG {PORT}] ✓ Chunk {chunk_index} chiffré et renvoyé")
+
+    # Retourner chunk chiffré → Load Balancer
+    return Response(encrypted_chunk, mimetype="application/octet-stream")
+
+
+# -----------------------------
+# DÉCHIFFREMENT D'UN CHUNK (restauration)
+# -----------------------------
+@app.route("/decrypt_chunk", methods=["POST"])
+def decrypt_chunk_route():
+    return traced_task("fog.decrypt_chunk", decrypt_task)
+
+
+def decrypt_task(record, deadline):
+    try:
+        key, _, chunk_index, total_chunks = task_params(with_nonce=False)
+    except ValueError as e:
+        return bad_request(e)
+
+    print(f"[FOG {PORT}] → Déchiffrement chunk {chunk_index}")
+
+    try:
+        plaintext, elapsed = run_in_pool(
+            decrypt_chunk, key, chunk_index, total_chunks, record, deadline, faults.cpu_factor,
+        )
+    except ContainerError as e:
+        # Mauvaise clé ou enregistrement altéré : inutile de réessayer ailleurs
+        print(f"[FOG {PORT}] ✗ {e}")
+        return jsonify({"error": str(e)}), 422
+    if plaintext is None:
+        return deadline_expired(chunk_index)
+
+    tenant = tenant_label()
+    decrypted_counter.labels(node=str(PORT), tenant=tenant).inc()
+    bytes_counter.labels(node=str(PORT), operation="decrypt", tenant=tenant).inc(len(plaintext))
+    crypto_histogram.labels(node=str(PORT), operation="decrypt").observe(elapsed)
+
+    print(f"[FOG {PORT}] ✓ Chunk {chunk_index} déchiffré et renvoyé")
+    return Response(plaintext, mimetype="application/octet-stream")
+
+
+# -----------------------------
+# ENREGISTREMENT AUPRÈS DU LB
+# -----------------------------
+def register_with_lb():
+    # Le LB peut démarrer après le nœud : on réessaie jusqu'à ce qu'il réponde
+    while True:
+        try:
+            r = pools.post(f"{LB_URL}/nodes/register", json={"url": ADVERTISE_URL}, headers=NODE_HEADERS, timeout=2)
+            r.raise_for_status()
+            print(f"[FOG {PORT}] ✓ Enregistré auprès du LB {LB_URL} ({ADVERTISE_URL})")
+            return
+        except Exception as e:
+            print(f"[FOG {PORT}] LB {LB_URL} injoignable ({e}), nouvel essai dans 1s")
+            time.sleep(1)
+
+
+def heartbeat_loop():
+    # Heartbeat périodique : sans nouvelles pendant LB_HEARTBEAT_TIMEOUT, le LB
+    # cesse d'envoyer des chunks au nœud. 404 = LB redémarré, on se ré-enregistre.
+    register_with_lb()
+    while True:
+        time.sleep(HEARTBEAT_PERIOD)
+        try:
+            r = pools.post(f"{LB_URL}/nodes/heartbeat", json={"url": ADVERTISE_URL}, headers=NODE_HEADERS, timeout=2)
+            if r.status_code == 404:
+                print(f"[FOG {PORT}] Inconnu du LB, ré-enregistrement")
+                register_with_lb()
+        except Exception:
+            pass
+
+
+def deregister_from_lb():
+    try:
+        pools.post(f"{LB_URL}/nodes/deregister", json={"url": ADVERTISE_URL}, headers=NODE_HEADERS, timeout=1)
+        print(f"[FOG {PORT}] Désenregistré du LB {LB_URL}")
+    except Exception:
+        pass
+
+
+# -----------------------------
+# RUN SERVEUR
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fog node de chiffrement AES-GCM")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--metrics-port", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--lb", default=LB_URL, help="URL du LB auprès duquel s'enregistrer")
+    parser.add_argument("--advertise", default=ADVERTISE_URL, help="URL publiée au LB")
+    parser.add_argument("--faults", default=None, help="pannes injectées : JSON ou fichier JSON (cf. faults.py)")
+    parser.add_argument("--admin", action="store_true", help="active POST/DELETE /admin/faults (pannes à chaud)")
+    args = parser.parse_args()
+
+    PORT = args.port
+    METRICS_PORT = args.metrics_port or int(os.environ.get("METRICS_PORT", str(8000 + (PORT % 1000))))
+    WORKERS = args.workers
+    MAX_QUEUE = int(os.environ.get("FOG_MAX_QUEUE", str(2 * WORKERS)))
+    LB_URL = args.lb.rstrip("/")
+    ADVERTISE_URL = args.advertise or f"http://127.0.0.1:{PORT}"
+    if args.faults:
+        faults.configure(load_config(args.faults))
+    if args.admin or args.faults:
+        enable_admin()
+
+    # Démarrage ici (et non à l'import) : les workers d'un ProcessPool réimportent ce module
+    if POOL_KIND == "process":
+        executor = ProcessPoolExecutor(max_workers=WORKERS)
+    else:
+        executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="encrypt")
+
+    start_http_server(METRICS_PORT)
+
+    if LB_URL:
+        threading.Thread(target=heartbeat_loop, daemon=True).start()
+        # SIGTERM (arrêt par le launcher) : sortie propre pour se désenregistrer
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"[FOG] Démarrage Fog Node sur port {PORT} ({WORKERS} workers {POOL_KIND}, file max {MAX_QUEUE}, métriques {METRICS_PORT})")
+    if faults.enabled:
+        print(f"[FOG] Pannes injectées : {faults.status()['config']}")
+    try:
+        app.run(host="0.0.0.0", port=PORT)
+    finally:
+        # Avant l'arrêt de l'interpréteur (les pools urllib3 sont vidés à l'atexit)
+        if LB_URL:
+            deregister_from_lb()
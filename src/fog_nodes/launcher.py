@@ -0,0 +1,83 @@
+# launcher.py — Démarre N fog nodes locaux (un processus chacun) et les enregistre au LB
+#
+#   python src/fog_nodes/launcher.py --nodes 4 --lb http://127.0.0.1:5005
+#
+# Chaque nœud a son propre pool de workers (cœurs répartis entre les nœuds)
+# et son propre port de métriques Prometheus (8000 + port % 1000).
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LOAD_BALANCER_URL
+
+FOG_NODE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fog_node.py")
+
+
+def node_ports(count, base_port, reserved):
+    ports = []
+    port = base_port
+    while len(ports) < count:
+        if port not in reserved:
+            ports.append(port)
+        port += 1
+    return ports
+
+
+def start_nodes(count, base_port=5001, lb_url=LOAD_BALANCER_URL, workers=None, env=None, stdout=None):
+    # Renvoie la liste des (url, processus) démarrés ; stdout : journal des nœuds (défaut : console)
+    lb_port = urlsplit(lb_url).port if lb_url else None
+    reserved = {lb_port} if lb_port else set()
+    workers = workers or max(1, (os.cpu_count() or 1) // count)
+
+    nodes = []
+    for port in node_ports(count, base_port, reserved):
+        url = f"http://127.0.0.1:{port}"
+        cmd = [sys.executable, FOG_NODE, "--port", str(port), "--workers", str(workers)]
+        if lb_url:
+            cmd += ["--lb", lb_url, "--advertise", url]
+        proc = subprocess.Popen(cmd, env={**os.environ, **(env or {})}, stdout=stdout, stderr=stdout)
+        print(f"[LAUNCHER] Fog node {url} démarré (pid {proc.pid}, {workers} workers)")
+        nodes.append((url, proc))
+    return nodes
+
+
+def stop_nodes(nodes):
+    for _, proc in nodes:
+        proc.terminate()
+    for _, proc in nodes:
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lance plusieurs fog nodes locaux")
+    parser.add_argument("--nodes", type=int, default=3, help="nombre de fog nodes")
+    parser.add_argument("--base-port", type=int, default=5001)
+    parser.add_argument("--workers", type=int, default=None, help="workers par nœud (défaut : cœurs / nœuds)")
+    parser.add_argument("--lb", default=LOAD_BALANCER_URL, help="LB auprès duquel enregistrer les nœuds ('' : aucun)")
+    args = parser.parse_args()
+
+    # SIGTERM : même arrêt propre que Ctrl+C (les nœuds se désenregistrent)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    nodes = start_nodes(args.nodes, args.base_port, args.lb, args.workers)
+    try:
+        while all(proc.poll() is None for _, proc in nodes):
+            time.sleep(1)
+        print("[LAUNCHER] Un fog node s'est arrêté, arrêt des autres")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_nodes(nodes)
+
+
+if __name__ == "__main__":
+    main()
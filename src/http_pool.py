@@ -0,0 +1,127 @@
+# http_pool.py — Sessions HTTP keep-alive partagées (une par nœud)
+#
+# Chaque nœud (fog node ou LB) a sa propre requests.Session avec un pool
+# urllib3 borné : les connexions TCP sont réutilisées d'un chunk à l'autre
+# au lieu d'être rouvertes à chaque requests.post / requests.get.
+
+import os
+import time
+from threading import Lock
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "2"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+MAX_CONNECTIONS_PER_NODE = int(os.environ.get("HTTP_MAX_CONNECTIONS", "16"))
+
+
+class NodePool:
+    def __init__(self, base_url, max_connections, connect_timeout, read_timeout):
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        # pool_block=True : au-delà de max_connections, on attend une connexion libre
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max_connections,
+            pool_block=True,
+            max_retries=0,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self.lock = Lock()
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.time_total = 0.0
+
+    def request(self, method, url, timeout=None, **kwargs):
+        # timeout : (connect, read) par défaut ; un nombre seul remplace le read timeout
+        if timeout is None:
+            timeout = (self.connect_timeout, self.read_timeout)
+        elif not isinstance(timeout, tuple):
+            timeout = (min(self.connect_timeout, timeout), timeout)
+
+        with self.lock:
+            self.in_flight += 1
+        start = time.time()
+        try:
+            return self.session.request(method, url, timeout=timeout, **kwargs)
+        except Exception:
+            with self.lock:
+                self.errors_total += 1
+            raise
+        finally:
+            elapsed = time.time() - start
+            with self.lock:
+                self.in_flight -= 1
+                self.requests_total += 1
+                self.time_total += elapsed
+
+    def stats(self):
+        # Connexions TCP réellement ouvertes par urllib3 depuis le démarrage
+        url_pools = self.adapter.poolmanager.pools
+        connections_opened = 0
+        for key in url_pools.keys():
+            url_pool = url_pools.get(key)
+            if url_pool is not None:
+                connections_opened += url_pool.num_connections
+        with self.lock:
+            return {
+                "requests_total": self.requests_total,
+                "errors_total": self.errors_total,
+                "in_flight": self.in_flight,
+                "connections_opened": connections_opened,
+                "avg_request_time": self.time_total / self.requests_total
+                if self.requests_total
+                else 0,
+            }
+
+
+class HttpPool:
+    def __init__(
+        self,
+        max_connections=MAX_CONNECTIONS_PER_NODE,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+    ):
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.lock = Lock()
+        self.nodes = {}
+
+    def node(self, url):
+        parts = urlsplit(url)
+        base_url = f"{parts.scheme}://{parts.netloc}"
+        with self.lock:
+            pool = self.nodes.get(base_url)
+            if pool is None:
+                pool = NodePool(
+                    base_url, self.max_connections, self.connect_timeout, self.read_timeout
+                )
+                self.nodes[base_url] = pool
+            return pool
+
+    def get(self, url, **kwargs):
+        return self.node(url).request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.node(url).request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.node(url).request("PUT", url, **kwargs)
+
+    def stats(self):
+        with self.lock:
+            nodes = dict(self.nodes)
+        return {base_url: pool.stats() for base_url, pool in nodes.items()}
+
+
+# Pool partagé par tout le processus
+pools = HttpPool()
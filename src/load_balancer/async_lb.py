@@ -0,0 +1,991 @@
+# async_lb.py — Plan de données asyncio du load balancer
+#
+#   python src/load_balancer/load_balancer.py --async
+#
+# Un seul thread, une boucle asyncio : serveur HTTP/1.1 et connexions vers les
+# fog nodes en flux asyncio bruts (aucune dépendance en plus). Des milliers de
+# chunks peuvent être relayés en même temps ; la concurrence vers chaque nœud
+# est bornée par un sémaphore (LB_NODE_CONCURRENCY) au lieu d'un thread par chunk.
+#
+# /receive_chunk, PUT /uploads/<id>/chunks/<index> et /download_result sont
+# servis nativement, avec le même contrat que la version Flask ; toutes les autres routes (administration,
+# registre des nœuds, interface web) sont déléguées à l'application Flask,
+# exécutée dans un thread (pont WSGI minimal).
+#
+# Aucun accès disque sur la boucle : écritures à l'offset, journal des
+# sessions, tampon des corps au-delà de SPOOL_MEMORY et cache sur disque passent
+# par asyncio.to_thread (un disque lent ne bloque pas les autres connexions).
+
+import asyncio
+import json
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+import time
+from email.utils import formatdate
+from http import HTTPStatus
+from urllib.parse import unquote, unquote_to_bytes, urlsplit
+
+import lb_metrics
+from config import CHUNK_SIZE
+from http_pool import CONNECT_TIMEOUT, MAX_CONNECTIONS_PER_NODE, READ_TIMEOUT
+from chunk_cache import cache_hasher
+from engine import (
+    CACHE_NODE,
+    DEADLINE_HEADER,
+    MAX_ATTEMPTS,
+    SPOOL_MEMORY,
+    STREAM_BUFFER,
+    TENANT_HEADER,
+    ChunkRejected,
+    ClientDisconnected,
+    DeadlineExceeded,
+    DispatchResult,
+    NoNodeAvailable,
+    check_chunk_length,
+    check_dispatch_headers,
+    chunk_geometry,
+    deadline_from,
+    dispatch_outcome,
+    error_status,
+    is_rejection,
+    parse_range,
+    tracer,
+)
+from sessions import SessionError
+from tracing import CHUNK_HEADER, UPLOAD_HEADER
+
+NODE_CONCURRENCY = int(os.environ.get("LB_NODE_CONCURRENCY", str(MAX_CONNECTIONS_PER_NODE)))
+MAX_HEADER_SIZE = 64 * 1024
+UPLOAD_CHUNK = re.compile(r"/uploads/([^/]+)/chunks/(\d+)")
+
+
+class FogHTTPError(Exception):
+    def __init__(self, node, status_code):
+        super().__init__(f"{status_code} renvoyé par {node}")
+        self.status_code = status_code
+
+
+# -----------------------------
+# HTTP/1.1 : lecture des requêtes, écriture des réponses
+# -----------------------------
+async def read_head(reader):
+    # Ligne de requête (ou de statut) + en-têtes ; None si la connexion est fermée
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.endswith(b"\n"):
+        raise ConnectionError("En-tête HTTP incomplet")
+    headers = {}
+    size = len(line)
+    while True:
+        raw = await reader.readline()
+        size += len(raw)
+        if size > MAX_HEADER_SIZE:
+            raise ConnectionError("En-têtes HTTP trop longs")
+        if raw in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = raw.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return line.decode("latin-1").split(None, 2), headers
+
+
+def response_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines += [f"{name}: {value}" for name, value in headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send_response(writer, status, body=b"", content_type="application/json", keep_alive=True, headers=()):
+    headers = [
+        ("Content-Type", content_type),
+        ("Content-Length", str(len(body))),
+        ("Connection", "keep-alive" if keep_alive else "close"),
+        *headers,
+    ]
+    writer.write(response_head(status, headers) + body)
+    await writer.drain()
+
+
+async def send_json(writer, status, payload, keep_alive=True):
+    body = (json.dumps(payload) + "\n").encode()
+    await send_response(writer, status, body, keep_alive=keep_alive)
+
+
+class IncomingBody:
+    # Corps de la requête client, lu au plus une fois sur la connexion
+    def __init__(self, reader, length):
+        self.reader = reader
+        self.len = length
+        self.remaining = length
+
+    async def read(self, size):
+        if self.remaining <= 0:
+            return b""
+        block = await self.reader.read(min(size, self.remaining))
+        if not block:
+            raise ClientDisconnected("Corps de requête incomplet")
+        self.remaining -= len(block)
+        return block
+
+    async def drain(self):
+        while await self.read(STREAM_BUFFER):
+            pass
+
+
+class AsyncStreamBody:
+    # Équivalent asyncio de engine.StreamBody : chaque bloc lu sur le flux
+    # client est recopié dans un tampon, chaque tentative relit à son offset.
+    def __init__(self, incoming):
+        self.incoming = incoming
+        self.len = incoming.len
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        self.spooled = 0
+        self.lock = asyncio.Lock()
+
+    async def read_at(self, offset, size):
+        async with self.lock:
+            if offset < self.spooled:
+                size = min(size, self.spooled - offset)
+                if self.spooled > SPOOL_MEMORY:
+                    # Tampon passé sur disque : lecture hors de la boucle
+                    return await asyncio.to_thread(self._read, offset, size)
+                return self._read(offset, size)
+            block = await self.incoming.read(min(size, self.len - self.spooled))
+            if self.spooled + len(block) > SPOOL_MEMORY:
+                await asyncio.to_thread(self._write, block)
+            else:
+                self._write(block)
+            self.spooled += len(block)
+            return block
+
+    def _read(self, offset, size):
+        self.spool.seek(offset)
+        return self.spool.read(size)
+
+    def _write(self, block):
+        self.spool.seek(self.spooled)
+        self.spool.write(block)
+
+    def close(self):
+        self.spool.close()
+
+
+async def write_chunk(chunk, blocks):
+    # Réponse du fog node écrite à l'offset du chunk, bloc par bloc, hors de la boucle
+    try:
+        async for block in blocks:
+            await asyncio.to_thread(chunk.write, block)
+    finally:
+        await asyncio.to_thread(chunk.close)
+
+
+def open_with_stat(path):
+    f = open(path, "rb")
+    return f, os.fstat(f.fileno())
+
+
+# -----------------------------
+# Connexions vers les fog nodes
+# -----------------------------
+class NodeConnections:
+    # Connexions keep-alive vers un nœud, au plus NODE_CONCURRENCY en même temps
+    def __init__(self, url, limit=NODE_CONCURRENCY):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle = []
+        self.opened = 0
+
+    async def connect(self):
+        # (reader, writer, réutilisée ?)
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), CONNECT_TIMEOUT
+        )
+        self.opened += 1
+        return reader, writer, False
+
+    def release(self, reader, writer):
+        if len(self.idle) < self.limit and not writer.is_closing():
+            self.idle.append((reader, writer))
+        else:
+            writer.close()
+
+
+class FogResponse:
+    # Réponse d'un fog node dont les en-têtes sont lus ; le corps se lit en flux.
+    # La connexion (et la place dans le sémaphore du nœud) est rendue à la fin.
+    def __init__(self, connections, reader, writer, status, headers):
+        self.connections = connections
+        self.reader = reader
+        self.writer = writer
+        self.status = status
+        self.headers = headers
+        self.done = False
+        self.semaphore = None
+
+    async def blocks(self):
+        try:
+            if self.headers.get("transfer-encoding", "").lower() == "chunked":
+                while True:
+                    size = int((await self._read(self.reader.readline())).split(b";")[0], 16)
+                    if size == 0:
+                        await self._read(self.reader.readline())
+                        break
+                    remaining = size
+                    while remaining:
+                        block = await self._read(self.reader.read(min(STREAM_BUFFER, remaining)))
+                        remaining -= len(block)
+                        yield block
+                    await self._read(self.reader.readline())
+            elif "content-length" in self.headers:
+                remaining = int(self.headers["content-length"])
+                while remaining:
+                    block = await self._read(self.reader.read(min(STREAM_BUFFER, remaining)))
+                    remaining -= len(block)
+                    yield block
+            else:
+                while True:
+                    block = await asyncio.wait_for(self.reader.read(STREAM_BUFFER), READ_TIMEOUT)
+                    if not block:
+                        break
+                    yield block
+                self.headers["connection"] = "close"
+            self.done = True
+        finally:
+            self.close()
+
+    @staticmethod
+    async def _read(awaitable):
+        block = await asyncio.wait_for(awaitable, READ_TIMEOUT)
+        if not block:
+            raise ConnectionError("Réponse du fog node interrompue")
+        return block
+
+    def close(self):
+        if self.writer is not None:
+            if self.done and self.headers.get("connection", "").lower() != "close":
+                self.connections.release(self.reader, self.writer)
+            else:
+                self.writer.close()
+            self.writer = None
+        if self.semaphore is not None:
+            self.semaphore.release()
+            self.semaphore = None
+
+
+# ==========================================================
+# PLAN DE DONNÉES
+# ==========================================================
+class AsyncDataPlane:
+    def __init__(self, app, engine, reassembler, sessions):
+        self.app = app
+        self.engine = engine
+        self.reassembler = reassembler
+        self.sessions = sessions
+        self.connections = {}
+
+    def node_connections(self, node):
+        connections = self.connections.get(node)
+        if connections is None:
+            connections = self.connections[node] = NodeConnections(node)
+        return connections
+
+    # -----------------------------
+    # Envoi d'un chunk (même logique que Engine.dispatch, en coroutines)
+    # -----------------------------
+    async def send(self, attempt, path, body, headers, deadline):
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceeded("Échéance dépassée avant l'envoi")
+        connections = self.node_connections(attempt.node)
+        await asyncio.wait_for(connections.semaphore.acquire(), remaining)
+        attempt.sent_at = time.time()
+        try:
+            response = await asyncio.wait_for(
+                self._exchange(connections, attempt, path, body, headers, deadline),
+                deadline - time.time(),
+            )
+            if response.status >= 400:
+                # Corps d'erreur (JSON court) lu pour garder la connexion réutilisable
+                async for _ in response.blocks():
+                    pass
+                raise FogHTTPError(attempt.node, response.status)
+        except BaseException:
+            connections.semaphore.release()
+            raise
+        response.semaphore = connections.semaphore
+        return response
+
+    async def _exchange(self, connections, attempt, path, body, headers, deadline):
+        # Une connexion keep-alive peut avoir été fermée par le nœud entre deux
+        # chunks : un seul nouvel essai, sur une connexion neuve
+        while True:
+            reader, writer, reused = await connections.connect()
+            try:
+                return await self._request(connections, reader, writer, attempt, path, body, headers, deadline)
+            except ClientDisconnected:
+                writer.close()
+                raise
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+            except BaseException:
+                writer.close()
+                raise
+
+    async def _request(self, connections, reader, writer, attempt, path, body, headers, deadline):
+        head = [
+            f"POST {path} HTTP/1.1",
+            f"Host: {connections.host}:{connections.port}",
+            "Content-Type: application/octet-stream",
+            f"Content-Length: {body.len}",
+            f"{DEADLINE_HEADER}: {int((deadline - time.time()) * 1000)}",
+        ]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        head += [f"{name}: {value}" for name, value in attempt.span.headers().items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+
+        offset = 0
+        while offset < body.len:
+            block = await body.read_at(offset, STREAM_BUFFER)
+            if not block:
+                raise ConnectionError("Corps du chunk incomplet")
+            writer.write(block)
+            offset += len(block)
+            await writer.drain()
+
+        parsed = await read_head(reader)
+        if parsed is None:
+            raise ConnectionError("Connexion fermée par le fog node")
+        attempt.headers_at = time.time()
+        return FogResponse(connections, reader, writer, int(parsed[0][1]), parsed[1])
+
+    def _abandon(self, strategy, attempt, task, nbytes):
+        task.cancel()
+
+        def release(task):
+            if not task.cancelled() and task.exception() is None:
+                task.result().close()
+            self.engine.finish_attempt(strategy, attempt, nbytes, None)
+
+        task.add_done_callback(release)
+
+    async def cache_key(self, cache_context, body):
+        hasher = cache_hasher(*cache_context, body.len)
+        offset = 0
+        while offset < body.len:
+            block = await body.read_at(offset, STREAM_BUFFER)
+            hasher.update(block)
+            offset += len(block)
+        return hasher.hexdigest()
+
+    def cache_tee(self, key, consume):
+        # Équivalent asyncio de ChunkCache.tee
+        async def consume_and_store(blocks):
+            parts = []
+            complete = []
+
+            async def copy():
+                async for block in blocks:
+                    parts.append(bytes(block))
+                    yield block
+                complete.append(True)
+
+            value = await consume(copy())
+            if complete:
+                await self.cache_call(self.engine.cache.put, key, b"".join(parts))
+            return value
+
+        return consume_and_store
+
+    async def cache_call(self, fn, *args):
+        # Niveau disque du cache activé : lecture / déversement dans un thread
+        if self.engine.cache.disk_limit > 0:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    @staticmethod
+    async def counted(attempt, blocks):
+        async for block in blocks:
+            attempt.received += len(block)
+            yield block
+
+    async def dispatch(self, path, body, headers, consume, strategy=None, deadline=None, cache_context=None):
+        strategy = self.engine.pick_strategy(strategy)
+        start = time.time()
+        with tracer.start("lb.dispatch", strategy=strategy.name, bytes=body.len) as span:
+            try:
+                result = await self._dispatch(path, body, headers, consume, strategy, deadline, cache_context)
+            except Exception as e:
+                lb_metrics.dispatch_finished(strategy.name, "none", dispatch_outcome(e), time.time() - start)
+                span.set(outcome=dispatch_outcome(e))
+                raise
+            outcome = "cache" if result.node == CACHE_NODE else "ok"
+            lb_metrics.dispatch_finished(strategy.name, result.node, outcome, time.time() - start)
+            span.set(node=result.node, outcome=outcome, attempts=result.attempts, hedged=result.hedged)
+            return result
+
+    async def _dispatch(self, path, body, headers, consume, strategy, deadline, cache_context):
+        engine = self.engine
+        deadline = deadline or deadline_from(None)
+
+        if cache_context is not None and engine.cache.enabled:
+            start = time.time()
+            with tracer.start("lb.cache_lookup") as span:
+                key = await self.cache_key(cache_context, body)
+                record = await self.cache_call(engine.cache.get, key)
+                span.set(hit=record is not None)
+            if record is not None:
+                async def cached():
+                    yield record
+
+                value = await consume(cached())
+                return DispatchResult(CACHE_NODE, strategy.name, time.time() - start, 0, value)
+            consume = self.cache_tee(key, consume)
+
+        tried = []
+        pending = {}  # tâche -> Attempt
+        hedge_at = None
+        hedged = False
+
+        engine.refill_hedge_tokens()
+        delay = engine.hedge_delay(body.len)
+
+        def launch(hedge=False):
+            attempt = engine.begin_attempt(strategy, tried, body.len, hedge)
+            task = asyncio.ensure_future(self.send(attempt, path, body, headers, deadline))
+            pending[task] = attempt
+            return attempt
+
+        try:
+            while True:
+                if not pending:
+                    if len(tried) >= MAX_ATTEMPTS:
+                        raise NoNodeAvailable(f"Échec après {len(tried)} tentatives ({tried})")
+                    attempt = launch()
+                    if delay is not None and not hedged:
+                        hedge_at = attempt.start + delay
+
+                now = time.time()
+                if now >= deadline:
+                    with engine.lock:
+                        engine.stats[strategy.name]["deadline_exceeded"] += 1
+                    raise DeadlineExceeded(f"Échéance dépassée après {len(tried)} tentative(s) ({tried})")
+                timeout = deadline - now
+                if hedge_at is not None:
+                    timeout = max(0.0, min(timeout, hedge_at - now))
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if hedge_at is not None and time.time() >= hedge_at:
+                        hedge_at = None
+                        hedged = True
+                        if len(tried) < MAX_ATTEMPTS and engine.take_hedge_token():
+                            try:
+                                attempt = launch(hedge=True)
+                            except NoNodeAvailable:
+                                continue
+                            print(f"[LB] ⇉ Requête de couverture vers {attempt.node} (après {delay:.3f}s)")
+                    continue
+
+                winner = None
+                for task in done:
+                    attempt = pending.pop(task)
+                    try:
+                        fog_resp = task.result()
+                    except ClientDisconnected:
+                        engine.finish_attempt(strategy, attempt, body.len, None)
+                        raise
+                    except Exception as e:
+                        print(f"[LB] ✗ Échec envoi vers {attempt.node} : {e!r}")
+                        if is_rejection(error_status(e)):
+                            engine.finish_attempt(strategy, attempt, body.len, None)
+                            raise ChunkRejected(attempt.node, error_status(e)) from e
+                        engine.finish_attempt(strategy, attempt, body.len, False, e)
+                        continue
+                    if winner is None:
+                        winner = (attempt, fog_resp)
+                    else:
+                        fog_resp.close()
+                        engine.finish_attempt(strategy, attempt, body.len, None)
+                if winner is None:
+                    continue
+
+                for task, other in pending.items():
+                    self._abandon(strategy, other, task, body.len)
+                pending = {}
+
+                attempt, fog_resp = winner
+                try:
+                    with tracer.start("lb.relay", node=attempt.node):
+                        value = await consume(self.counted(attempt, fog_resp.blocks()))
+                except (ConnectionError, asyncio.TimeoutError) as e:
+                    print(f"[LB] ✗ Réponse interrompue depuis {attempt.node} : {e!r}")
+                    engine.finish_attempt(strategy, attempt, body.len, False, e)
+                    continue
+                except Exception as e:
+                    engine.finish_attempt(strategy, attempt, body.len, False, e)
+                    raise
+                finally:
+                    fog_resp.close()
+
+                engine.finish_attempt(strategy, attempt, body.len, True)
+                return DispatchResult(
+                    attempt.node, strategy.name, time.time() - attempt.start, len(tried), value,
+                    hedged=attempt.hedge,
+                )
+
+        finally:
+            for task, attempt in pending.items():
+                self._abandon(strategy, attempt, task, body.len)
+
+    # -----------------------------
+    # CLIENT → LB → FOG → LB (enregistrement chunk)
+    # -----------------------------
+    async def receive_chunk(self, headers, incoming, writer, keep_alive):
+        try:
+            filename = headers.get("x-file-name")
+            chunk_index = headers.get("x-chunk-index")
+            aes_key = headers.get("x-aes-key")
+            aes_nonce = headers.get("x-aes-nonce")
+            total_chunks = headers.get("x-total-chunks")
+
+            if not filename or not aes_key or not aes_nonce:
+                return await send_json(writer, 400, {"error": "Headers manquants"}, keep_alive)
+
+            if chunk_index is None or total_chunks is None:
+                return await send_json(
+                    writer, 400, {"error": "Headers X-Chunk-Index / X-Total-Chunks manquants"}, keep_alive
+                )
+
+            try:
+                chunk_index, total_chunks, chunk_size, file_size = chunk_geometry(
+                    chunk_index, total_chunks, headers.get("x-chunk-size", CHUNK_SIZE), headers.get("x-file-size")
+                )
+                check_dispatch_headers(aes_key, aes_nonce, headers.get("x-lb-strategy"))
+            except ValueError as e:
+                return await send_json(writer, 400, {"error": str(e)}, keep_alive)
+
+            if not incoming.len:
+                return await send_json(writer, 400, {"error": "chunk manquant"}, keep_alive)
+            try:
+                check_chunk_length(chunk_index, total_chunks, chunk_size, incoming.len, file_size)
+            except ValueError as e:
+                await incoming.drain()
+                return await send_json(writer, 400, {"error": str(e)}, keep_alive)
+
+            upload_id = headers.get("x-upload-id", aes_nonce)
+
+            print(f"[LB] → Envoi chunk {chunk_index} ({incoming.len} octets)")
+
+            async def consume(blocks):
+                chunk = await asyncio.to_thread(
+                    self.reassembler.open_chunk,
+                    filename,
+                    upload_id,
+                    chunk_index,
+                    chunk_size,
+                    total_chunks,
+                    file_size=file_size,
+                    base_nonce=bytes.fromhex(aes_nonce),
+                )
+                if chunk is None:
+                    return True
+                await write_chunk(chunk, blocks)
+                return await asyncio.to_thread(self.reassembler.commit, chunk)
+
+            body = AsyncStreamBody(incoming)
+            try:
+                result = await self.dispatch(
+                    "/task_chunk",
+                    body,
+                    {
+                        "X-AES-Key": aes_key,
+                        "X-AES-Nonce": aes_nonce,
+                        "X-File-Name": filename,
+                        "X-Chunk-Index": str(chunk_index),
+                        "X-Total-Chunks": str(total_chunks),
+                        TENANT_HEADER: headers.get(TENANT_HEADER.lower(), ""),
+                        UPLOAD_HEADER: upload_id,
+                    },
+                    consume,
+                    strategy=headers.get("x-lb-strategy"),
+                    deadline=deadline_from(headers.get(DEADLINE_HEADER.lower())),
+                    cache_context=(aes_key, aes_nonce, chunk_index, total_chunks),
+                )
+            finally:
+                body.close()
+            complete = result.value
+
+            print(f"[LB] ✓ Chunk {chunk_index} placé dans {filename}.encrypted (via {result.node})")
+            if complete:
+                print(f"[LB] ✓ Fichier {filename}.encrypted complet")
+
+            await send_json(
+                writer,
+                200,
+                {
+                    "results": [
+                        {
+                            "chunk": chunk_index,
+                            "node_used": result.node,
+                            "strategy": result.strategy,
+                            "processing_time": result.elapsed,
+                            "attempts": result.attempts,
+                            "hedged": result.hedged,
+                            "status": "received",
+                        }
+                    ],
+                    "complete": complete,
+                },
+                keep_alive,
+            )
+
+        except ChunkRejected as e:
+            # Refus 4xx des fog nodes : erreur du client, relayée telle quelle
+            print("[LB ERROR]", e)
+            await send_json(writer, e.status_code, {"error": str(e)}, keep_alive)
+
+        except NoNodeAvailable as e:
+            print("[LB ERROR]", e)
+            await send_json(writer, 503, {"error": str(e)}, keep_alive)
+
+        except DeadlineExceeded as e:
+            print("[LB ERROR]", e)
+            await send_json(writer, 504, {"error": str(e)}, keep_alive)
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+
+        except Exception as e:
+            print("[LB ERROR]", e)
+            await send_json(writer, 500, {"error": str(e)}, keep_alive)
+
+    # -----------------------------
+    # Session d'upload : PUT d'un chunk (idempotent)
+    # -----------------------------
+    async def put_chunk(self, upload_id, chunk_index, headers, incoming, writer, keep_alive):
+        sessions = self.sessions
+        try:
+            session = sessions.get(upload_id)
+            aes_key = headers.get("x-aes-key")
+            if not aes_key:
+                raise SessionError("Header X-AES-Key manquant")
+            # Première clé de la session : enregistrée sur disque
+            await asyncio.to_thread(sessions.check_key, session, aes_key)
+            pending = sessions.pending(session, chunk_index)
+        except SessionError as e:
+            await incoming.drain()
+            return await send_json(writer, e.status_code, {"error": str(e)}, keep_alive)
+
+        if not pending:
+            # Chunk déjà acquitté (renvoi après une coupure) : rien à refaire
+            await incoming.drain()
+            return await send_json(writer, 200, {"chunk": chunk_index, "status": "already_received"}, keep_alive)
+
+        try:
+            check_dispatch_headers(aes_key, strategy=headers.get("x-lb-strategy"))
+        except ValueError as e:
+            await incoming.drain()
+            return await send_json(writer, 400, {"error": str(e)}, keep_alive)
+
+        expected = min(session.chunk_size, session.file_size - chunk_index * session.chunk_size)
+        if incoming.len != expected:
+            await incoming.drain()
+            return await send_json(
+                writer,
+                400,
+                {"error": f"Chunk {chunk_index} : {incoming.len} octets reçus, {expected} attendus"},
+                keep_alive,
+            )
+
+        print(f"[LB] → Session {upload_id} : chunk {chunk_index} ({incoming.len} octets)")
+
+        async def consume(blocks):
+            chunk = await asyncio.to_thread(sessions.open_chunk, session, chunk_index)
+            if chunk is None:
+                return
+            await write_chunk(chunk, blocks)
+            await asyncio.to_thread(sessions.acknowledge, session, chunk)
+
+        body = AsyncStreamBody(incoming)
+        try:
+            result = await self.dispatch(
+                "/task_chunk",
+                body,
+                {
+                    "X-AES-Key": aes_key,
+                    "X-AES-Nonce": session.base_nonce,
+                    "X-File-Name": session.filename,
+                    "X-Chunk-Index": str(chunk_index),
+                    "X-Total-Chunks": str(session.total_chunks),
+                    TENANT_HEADER: headers.get(TENANT_HEADER.lower(), ""),
+                    UPLOAD_HEADER: upload_id,
+                },
+                consume,
+                strategy=headers.get("x-lb-strategy"),
+                deadline=deadline_from(headers.get(DEADLINE_HEADER.lower())),
+                cache_context=(aes_key, session.base_nonce, chunk_index, session.total_chunks),
+            )
+        except ChunkRejected as e:
+            print("[LB ERROR]", e)
+            return await send_json(writer, e.status_code, {"error": str(e)}, keep_alive)
+        except NoNodeAvailable as e:
+            print("[LB ERROR]", e)
+            return await send_json(writer, 503, {"error": str(e)}, keep_alive)
+        except DeadlineExceeded as e:
+            print("[LB ERROR]", e)
+            return await send_json(writer, 504, {"error": str(e)}, keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            print("[LB ERROR]", e)
+            return await send_json(writer, 500, {"error": str(e)}, keep_alive)
+        finally:
+            body.close()
+
+        print(f"[LB] ✓ Session {upload_id} : chunk {chunk_index} acquitté (via {result.node})")
+        await send_json(
+            writer,
+            200,
+            {
+                "chunk": chunk_index,
+                "node_used": result.node,
+                "strategy": result.strategy,
+                "processing_time": result.elapsed,
+                "attempts": result.attempts,
+                "hedged": result.hedged,
+                "status": "received",
+            },
+            keep_alive,
+        )
+
+    # -----------------------------
+    # CLIENT → LB : Récupération du fichier final
+    # -----------------------------
+    async def download_result(self, filename, headers, writer, keep_alive):
+        filepath = self.reassembler.final_path(filename)
+
+        try:
+            f, stat = await asyncio.to_thread(open_with_stat, filepath)
+        except FileNotFoundError:
+            progress = self.reassembler.progress(filename)
+            if progress is not None:
+                return await send_json(writer, 409, {"error": "Upload en cours", **progress}, keep_alive)
+            return await send_json(writer, 404, {"error": "Fichier indisponible"}, keep_alive)
+
+        name = os.path.basename(filepath)
+        with f:
+            size = stat.st_size
+            etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+            response_headers = [
+                ("Content-Type", mimetypes.guess_type(name)[0] or "application/octet-stream"),
+                ("Content-Disposition", f"attachment; filename={name}"),
+                ("Accept-Ranges", "bytes"),
+                ("ETag", etag),
+                ("Last-Modified", formatdate(stat.st_mtime, usegmt=True)),
+                ("Connection", "keep-alive" if keep_alive else "close"),
+            ]
+
+            # Reprise (Range) : ignorée si le fichier a changé depuis (If-Range)
+            byte_range = headers.get("range")
+            if_range = headers.get("if-range")
+            if if_range and if_range != etag:
+                byte_range = None
+            try:
+                byte_range = parse_range(byte_range, size)
+            except ValueError:
+                return await send_response(
+                    writer, 416, b"", keep_alive=keep_alive, headers=[("Content-Range", f"bytes */{size}")]
+                )
+
+            status = 200
+            start, end = byte_range or (0, size)
+            if byte_range is not None:
+                status = 206
+                response_headers.append(("Content-Range", f"bytes {start}-{end - 1}/{size}"))
+            response_headers.append(("Content-Length", str(end - start)))
+
+            print(f"[LB] → Envoi fichier final au client : {name} (octets {start}-{end - 1}/{size})")
+            writer.write(response_head(status, response_headers))
+            await writer.drain()
+            if end > start:
+                # sendfile() du noyau quand le transport le permet, lecture/écriture sinon
+                await asyncio.get_running_loop().sendfile(writer.transport, f, start, end - start)
+
+    # -----------------------------
+    # Autres routes : application Flask (pont WSGI, dans un thread)
+    # -----------------------------
+    async def delegate(self, method, target, version, headers, incoming, writer, keep_alive):
+        # Corps tamponné pour Flask : en mémoire jusqu'à SPOOL_MEMORY, puis le passage
+        # sur disque et les écritures suivantes hors de la boucle (cf. AsyncStreamBody)
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        spooled = 0
+        while True:
+            block = await incoming.read(STREAM_BUFFER)
+            if not block:
+                break
+            spooled += len(block)
+            if spooled > SPOOL_MEMORY:
+                await asyncio.to_thread(body.write, block)
+            else:
+                body.write(block)
+        body.seek(0)
+
+        path, _, query = target.partition("?")
+        host, _, port = headers.get("host", "").partition(":")
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote_to_bytes(path).decode("latin-1"),
+            "QUERY_STRING": query,
+            "SERVER_NAME": host or "localhost",
+            "SERVER_PORT": port or "80",
+            "SERVER_PROTOCOL": version,
+            "REMOTE_ADDR": (writer.get_extra_info("peername") or ("",))[0],
+            "CONTENT_TYPE": headers.get("content-type", ""),
+            "CONTENT_LENGTH": str(incoming.len),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in headers.items():
+            if name not in ("content-type", "content-length"):
+                environ["HTTP_" + name.upper().replace("-", "_")] = value
+
+        loop = asyncio.get_running_loop()
+        try:
+            status, response_headers, result = await loop.run_in_executor(None, self._start_app, environ)
+        finally:
+            body.close()
+
+        # Réponse relayée en flux (restauration...) : Content-Length de l'application
+        # s'il est connu, sinon encodage chunked
+        length = None
+        kept = []
+        for name, value in response_headers:
+            lowered = name.lower()
+            if lowered == "content-length":
+                length = value
+            elif lowered not in ("transfer-encoding", "connection"):
+                kept.append((name, value))
+        chunked = length is None
+        kept.append(("Transfer-Encoding", "chunked") if chunked else ("Content-Length", length))
+        kept.append(("Connection", "keep-alive" if keep_alive else "close"))
+
+        iterator = iter(result)
+        try:
+            writer.write(response_head(status, kept))
+            while True:
+                block = await loop.run_in_executor(None, next, iterator, None)
+                if block is None:
+                    break
+                if not block:
+                    continue
+                if chunked:
+                    writer.write(f"{len(block):x}\r\n".encode() + block + b"\r\n")
+                else:
+                    writer.write(block)
+                await writer.drain()
+            if chunked:
+                writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            if hasattr(result, "close"):
+                await loop.run_in_executor(None, result.close)
+
+    def _start_app(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(None, 1)[0])
+            started["headers"] = headers
+
+        result = self.app(environ, start_response)
+        return started["status"], started["headers"], result
+
+    # -----------------------------
+    # Connexions client
+    # -----------------------------
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                parsed = await read_head(reader)
+                if parsed is None:
+                    break
+                request_line, headers = parsed
+                if len(request_line) != 3:
+                    await send_json(writer, 400, {"error": "Requête HTTP invalide"}, keep_alive=False)
+                    break
+                method, target, version = request_line
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    await send_json(writer, 411, {"error": "Content-Length requis"}, keep_alive=False)
+                    break
+                incoming = IncomingBody(reader, int(headers.get("content-length") or 0))
+                if headers.get("expect", "").lower() == "100-continue":
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+                path = target.partition("?")[0]
+                if (
+                    method == "POST"
+                    and path == "/receive_chunk"
+                    and headers.get("content-type", "").startswith("application/octet-stream")
+                ):
+                    with tracer.start(
+                        "lb.receive_chunk",
+                        headers,
+                        upload_id=headers.get(UPLOAD_HEADER.lower()),
+                        chunk=headers.get(CHUNK_HEADER.lower()),
+                        bytes=incoming.len,
+                    ):
+                        await self.receive_chunk(headers, incoming, writer, keep_alive)
+                elif method == "PUT" and UPLOAD_CHUNK.fullmatch(path):
+                    upload_id, chunk_index = UPLOAD_CHUNK.fullmatch(path).groups()
+                    upload_id, chunk_index = unquote(upload_id), int(chunk_index)
+                    with tracer.start(
+                        "lb.put_chunk", headers, upload_id=upload_id, chunk=chunk_index, bytes=incoming.len
+                    ):
+                        await self.put_chunk(upload_id, chunk_index, headers, incoming, writer, keep_alive)
+                elif method == "GET" and path.startswith("/download_result/"):
+                    filename = unquote(path[len("/download_result/"):])
+                    await self.download_result(filename, headers, writer, keep_alive)
+                else:
+                    # Ancien format multipart inclus : traité par la route Flask
+                    await self.delegate(method, target, version, headers, incoming, writer, keep_alive)
+
+                # Corps non lu jusqu'au bout (requête rejetée) : connexion inutilisable
+                if not keep_alive or incoming.remaining:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print("[LB ERROR]", e)
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_SIZE)
+        async with server:
+            await server.serve_forever()
+
+
+def serve(app, engine, reassembler, sessions, host="0.0.0.0", port=5005):
+    asyncio.run(AsyncDataPlane(app, engine, reassembler, sessions).serve(host, port))
@@ -0,0 +1,216 @@
+# chunk_cache.py — Cache des chunks chiffrés, adressé par contenu
+#
+# Un chunk déjà chiffré avec la même clé, le même nonce de chunk, les mêmes
+# données associées (index, nombre de chunks, longueur) et le même clair donne
+# exactement le même enregistrement : le LB peut le resservir sans passer par
+# un fog node. La clé de cache est un HMAC-SHA256 (clé AES) de tout ce
+# contexte et du clair :
+#   - jamais de réutilisation de nonce : un succès de cache ne chiffre rien,
+#     il renvoie l'octet près ce que le fog node aurait produit ;
+#   - un chunk identique à un autre index, ou sous une autre clé, n'est pas
+#     partagé (nonce différent) ;
+#   - sans la clé AES, les clés de cache (noms de fichiers du niveau disque)
+#     ne révèlent rien du contenu.
+# Les succès viennent des renvois d'un même chunk et des ré-uploads d'un même
+# fichier avec la même clé (REUSE_KEYS=1 côté client).
+#
+# Deux niveaux : mémoire (LRU bornée en octets, LB_CACHE_MEMORY), puis disque
+# (LB_CACHE_DISK) où sont déversées les entrées évincées de la mémoire.
+# Désactivé par défaut (LB_CACHE_MEMORY=0) : le chunk doit être reçu en
+# entier avant l'envoi pour calculer sa clé de cache.
+
+import hashlib
+import hmac
+import os
+from collections import OrderedDict
+from threading import Lock, get_ident
+
+from container import associated_data, chunk_nonce
+
+CACHE_MEMORY = int(os.environ.get("LB_CACHE_MEMORY", "0"))
+CACHE_DISK = int(os.environ.get("LB_CACHE_DISK", "0"))
+CACHE_FOLDER = os.environ.get("LB_CACHE_FOLDER", os.path.join("uploads_lb", "chunk_cache"))
+
+
+def cache_hasher(key_hex, nonce_hex, chunk_index, total_chunks, length):
+    # HMAC à compléter avec le clair du chunk (update), puis hexdigest()
+    mac = hmac.new(bytes.fromhex(key_hex), digestmod=hashlib.sha256)
+    mac.update(chunk_nonce(bytes.fromhex(nonce_hex), chunk_index))
+    mac.update(associated_data(chunk_index, total_chunks, length))
+    return mac
+
+
+class ChunkCache:
+    def __init__(self, memory=CACHE_MEMORY, disk=CACHE_DISK, folder=CACHE_FOLDER):
+        self.memory_limit = memory
+        self.disk_limit = disk
+        self.folder = folder
+        self.lock = Lock()
+        self.memory = OrderedDict()  # clé -> enregistrement
+        self.memory_bytes = 0
+        self.disk = OrderedDict()  # clé -> taille du fichier
+        self.disk_bytes = 0
+        self.counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "bytes_saved": 0,
+        }
+        if self.enabled and disk > 0:
+            os.makedirs(folder, exist_ok=True)
+            self._load_disk()
+
+    @property
+    def enabled(self):
+        return self.memory_limit > 0
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + ".rec")
+
+    def _load_disk(self):
+        # Niveau disque conservé d'un démarrage à l'autre (plus ancien en tête)
+        entries = []
+        for name in os.listdir(self.folder):
+            if name.endswith(".rec"):
+                stat = os.stat(os.path.join(self.folder, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_bytes += size
+        self._remove(self._evict_disk())
+
+    # -----------------------------
+    # Lecture / écriture
+    # -----------------------------
+    # Le verrou ne protège que la comptabilité LRU ; lectures, écritures et
+    # suppressions de fichiers se font hors verrou (un accès disque lent ne
+    # bloque pas les succès en mémoire des autres chunks).
+    def get(self, key):
+        with self.lock:
+            record = self.memory.get(key)
+            if record is not None:
+                self.memory.move_to_end(key)
+                self.counters["hits"] += 1
+                self.counters["bytes_saved"] += len(record)
+                return record
+            if key not in self.disk:
+                self.counters["misses"] += 1
+                return None
+            self.disk.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                record = f.read()
+        except OSError:
+            # Fichier disparu (évincé entre-temps) : simple défaut de cache
+            with self.lock:
+                if key in self.disk:
+                    self.disk_bytes -= self.disk.pop(key)
+                self.counters["misses"] += 1
+            return None
+        # Remonté en mémoire (le fichier disque reste tant qu'il n'est pas évincé)
+        with self.lock:
+            self.counters["hits"] += 1
+            self.counters["disk_hits"] += 1
+            self.counters["bytes_saved"] += len(record)
+            spills = self._store(key, record)
+        self._spill(spills)
+        return record
+
+    def put(self, key, record):
+        if not self.enabled or len(record) > self.memory_limit:
+            return
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return
+            self.counters["stores"] += 1
+            spills = self._store(key, record)
+        self._spill(spills)
+
+    def _store(self, key, record):
+        # Sous le verrou ; renvoie les entrées évincées à déverser sur disque
+        self.memory[key] = record
+        self.memory_bytes += len(record)
+        spills = []
+        while self.memory_bytes > self.memory_limit:
+            victim, data = self.memory.popitem(last=False)
+            self.memory_bytes -= len(data)
+            self.counters["evictions"] += 1
+            if self.disk_limit <= 0 or len(data) > self.disk_limit:
+                continue
+            if victim in self.disk:
+                self.disk.move_to_end(victim)
+            else:
+                spills.append((victim, data))
+        return spills
+
+    def _spill(self, spills):
+        # Hors verrou : écriture des fichiers, puis comptabilité, puis suppression des évincés
+        for key, record in spills:
+            tmp = f"{self._path(key)}.{get_ident()}.tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(record)
+                os.replace(tmp, self._path(key))
+            except OSError as e:
+                print(f"[LB] ✗ Cache disque : {e}")
+                continue
+            with self.lock:
+                if key not in self.disk:
+                    self.disk[key] = len(record)
+                    self.disk_bytes += len(record)
+                victims = self._evict_disk()
+            self._remove(victims)
+
+    def _evict_disk(self):
+        # Sous le verrou ; renvoie les clés dont le fichier est à supprimer
+        victims = []
+        while self.disk_bytes > self.disk_limit and self.disk:
+            key, size = self.disk.popitem(last=False)
+            self.disk_bytes -= size
+            victims.append(key)
+        return victims
+
+    def _remove(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def tee(self, key, consume):
+        # Enveloppe consume(blocs) : l'enregistrement relayé est aussi mis en cache
+        # (seulement s'il a été relayé en entier)
+        def consume_and_store(blocks):
+            parts = []
+            complete = []
+
+            def copy():
+                for block in blocks:
+                    parts.append(bytes(block))
+                    yield block
+                complete.append(True)
+
+            value = consume(copy())
+            if complete:
+                self.put(key, b"".join(parts))
+            return value
+
+        return consume_and_store
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "enabled": self.enabled,
+                **self.counters,
+                "hit_ratio": self.counters["hits"] / lookups if lookups else 0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+                "memory_limit": self.memory_limit,
+                "disk_entries": len(self.disk),
+                "disk_bytes": self.disk_bytes,
+                "disk_limit": self.disk_limit,
+            }
@@ -0,0 +1,84 @@
+# chunk_sizing.py — Taille de chunk recommandée pour un upload
+#
+# Chaque nœud sain est modélisé par son coût fixe par requête et son coût par
+# octet (appris par le moteur sur les envois réels, cf. Engine.models). Pour
+# chaque taille candidate, on simule l'upload : chaque chunk va au nœud qui le
+# finirait le plus tôt, la durée prévue est celle du dernier nœud à finir.
+#   - chunks trop gros : peu de chunks, des nœuds inoccupés (fichier moyen en
+#     un seul chunk) et une longue traîne sur les nœuds lents ;
+#   - chunks trop petits : le coût fixe par requête domine.
+# On retient le plus gros chunk dont la durée prévue reste à SLACK près de la
+# meilleure (moins de requêtes, moins d'overhead réel à durée égale).
+# Le modèle compte transfert et chiffrement comme un seul coût, en série ; en
+# réalité le chunk suivant arrive pendant que le nœud chiffre le précédent :
+# on vise donc au moins PIPELINE_DEPTH chunks par nœud.
+
+import math
+import os
+
+MIN_CHUNK_SIZE = int(os.environ.get("LB_MIN_CHUNK_SIZE", str(256 * 1024)))
+MAX_CHUNK_SIZE = int(os.environ.get("LB_MAX_CHUNK_SIZE", str(16 * 1024 * 1024)))
+CHUNK_ALIGN = 64 * 1024
+SLACK = 0.1
+PIPELINE_DEPTH = int(os.environ.get("LB_PIPELINE_DEPTH", "2"))
+# Candidats : fichier découpé en 1..SPLITS_PER_NODE × nœuds chunks, plus une
+# grille géométrique ; au plus MAX_SIMULATED chunks simulés par candidat
+SPLITS_PER_NODE = 8
+MAX_SIMULATED = 1024
+# Chunks en vol conseillés au client, par nœud (un en cours + un en attente)
+WINDOW_PER_NODE = 2
+
+
+def align_up(size):
+    return -(-size // CHUNK_ALIGN) * CHUNK_ALIGN
+
+
+def predict(file_size, chunk_size, params):
+    # Durée prévue de l'upload : params = [(secondes par octet, overhead)] par nœud
+    full, last = divmod(file_size, chunk_size)
+    sizes = [chunk_size] * full + ([last] if last else [])
+    free_at = [0.0] * len(params)
+    for size in sizes:
+        # Nœud qui finirait ce chunk le plus tôt (coût fixe + coût par octet)
+        ends = [free_at[i] + overhead + spb * size for i, (spb, overhead) in enumerate(params)]
+        i = min(range(len(ends)), key=ends.__getitem__)
+        free_at[i] = ends[i]
+    return max(free_at)
+
+
+def candidates(file_size, nodes):
+    sizes = {align_up(math.ceil(file_size / k)) for k in range(1, SPLITS_PER_NODE * nodes + 1)}
+    size = MIN_CHUNK_SIZE
+    while size < MAX_CHUNK_SIZE:
+        sizes.add(align_up(size))
+        size = int(size * math.sqrt(2))
+    sizes.add(MAX_CHUNK_SIZE)
+    return sorted(
+        s for s in sizes
+        if MIN_CHUNK_SIZE <= s <= MAX_CHUNK_SIZE and math.ceil(file_size / s) <= MAX_SIMULATED
+    ) or [MAX_CHUNK_SIZE]
+
+
+def recommend(file_size, params):
+    if not params:
+        raise ValueError("Aucun nœud sain pour dimensionner les chunks")
+    nodes = len(params)
+
+    if file_size <= MIN_CHUNK_SIZE:
+        # Petit fichier : un seul chunk
+        chunk_size = max(1, file_size)
+    else:
+        scored = [(predict(file_size, s, params), s) for s in candidates(file_size, nodes)]
+        best = min(t for t, _ in scored)
+        chunk_size = max(s for t, s in scored if t <= best * (1 + SLACK))
+        pipelined = align_up(math.ceil(file_size / (PIPELINE_DEPTH * nodes)))
+        chunk_size = min(chunk_size, max(pipelined, MIN_CHUNK_SIZE), file_size)
+    total_chunks = math.ceil(file_size / chunk_size)
+
+    return {
+        "chunk_size": chunk_size,
+        "total_chunks": total_chunks,
+        "window": max(1, min(total_chunks, WINDOW_PER_NODE * nodes)),
+        "nodes": nodes,
+        "predicted_time": predict(file_size, chunk_size, params) if file_size else 0.0,
+    }
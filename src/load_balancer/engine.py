@@ -0,0 +1,716 @@
+# engine.py — Moteur commun du load balancer
+#
+# Un seul chemin d'envoi pour toutes les stratégies : choix du nœud par la
+# stratégie active, relais en flux vers le fog node, et statistiques par
+# stratégie. La stratégie active (ou un mélange pondéré pour comparer deux
+# algorithmes en A/B) peut être changée à chaud.
+#
+# Chaque chunk a une échéance (X-Deadline-Ms, propagée au fog node). Un envoi
+# en échec est rejoué sur un autre nœud ; un envoi plus lent que le p95 des
+# envois récents est doublé vers un second nœud (requête de couverture), et
+# la première réponse l'emporte.
+#
+# Cache optionnel des chunks chiffrés (cf. chunk_cache.py) : un chunk déjà
+# chiffré dans le même contexte est resservi sans aller-retour vers un nœud.
+#
+# Traces (cf. tracing.py) : un span par envoi (attente dans le LB, service du
+# nœud) et un pour le relais de la réponse ; le contexte suit le chunk jusqu'au nœud.
+
+import os
+import random
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+
+from requests import RequestException
+
+import lb_metrics
+from chunk_cache import ChunkCache, cache_hasher
+from chunk_sizing import MAX_CHUNK_SIZE, recommend
+from container import NONCE_SIZE
+from http_pool import pools
+from registry import NodeRegistry
+from strategies import STRATEGIES, HybridStrategy, NodeModel, resolve
+from telemetry import TelemetryCollector
+from tracing import Tracer
+
+# Taille des blocs relayés client → fog → disque : borne la mémoire par requête
+STREAM_BUFFER = 64 * 1024
+# Corps rejouable : gardé en mémoire jusqu'à cette taille, sur disque au-delà
+SPOOL_MEMORY = 1024 * 1024
+
+# Échéance par chunk (si le client n'en fournit pas) et nombre max de tentatives
+DEADLINE_HEADER = "X-Deadline-Ms"
+# Tenant du client, relayé tel quel aux fog nodes (étiquette de leurs métriques)
+TENANT_HEADER = "X-Tenant"
+
+tracer = Tracer("lb")
+CHUNK_DEADLINE = float(os.environ.get("LB_CHUNK_DEADLINE", "60"))
+MAX_ATTEMPTS = int(os.environ.get("LB_MAX_ATTEMPTS", "3"))
+
+# Requêtes de couverture : déclenchées au-delà du p95 du temps de réponse
+# (ramené à l'octet) des envois récents, dans la limite de LB_HEDGE_BUDGET
+# requêtes supplémentaires par chunk envoyé (0 = désactivé)
+HEDGE_QUANTILE = 0.95
+HEDGE_BUDGET = float(os.environ.get("LB_HEDGE_BUDGET", "0.1"))
+HEDGE_BURST = 10
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+LATENCY_WINDOW = 256
+
+DISPATCH_THREADS = 128
+# Nœud affiché pour un chunk servi par le cache
+CACHE_NODE = "cache"
+
+
+class NoNodeAvailable(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class ChunkRejected(Exception):
+    # Refus 4xx du fog node (clé incorrecte, enregistrement altéré...) : le
+    # même chunk serait refusé par tous les nœuds, inutile de réessayer
+    def __init__(self, node, status_code):
+        super().__init__(f"Chunk refusé par {node} ({status_code})")
+        self.node = node
+        self.status_code = status_code
+
+
+class ClientDisconnected(ConnectionError):
+    # Corps du chunk interrompu côté client : aucun nœud n'est en cause
+    pass
+
+
+def error_status(error):
+    # Code HTTP d'une réponse en erreur (requests ou plan asyncio), sinon None
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_rejection(status):
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+
+def failure_reason(error):
+    # Motif d'échec d'une tentative (étiquette bornée des métriques)
+    status = error_status(error)
+    if status is not None:
+        return str(status)
+    if isinstance(error, DeadlineExceeded):
+        return "deadline"
+    return "network"
+
+
+def dispatch_outcome(error):
+    # Résultat d'un envoi de chunk en échec (étiquette des métriques)
+    if isinstance(error, NoNodeAvailable):
+        return "unavailable"
+    if isinstance(error, DeadlineExceeded):
+        return "deadline"
+    if isinstance(error, ChunkRejected):
+        return "rejected"
+    if isinstance(error, ClientDisconnected):
+        return "client_disconnected"
+    return "error"
+
+
+def deadline_from(value, default=CHUNK_DEADLINE):
+    # En-tête X-Deadline-Ms (budget restant en ms) → échéance absolue
+    try:
+        budget = float(value) / 1000 if value is not None else default
+    except ValueError:
+        budget = default
+    return time.time() + budget
+
+
+def header_int(name, value, minimum=0, maximum=None):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Header {name} : entier attendu (reçu {value!r})")
+    if number < minimum or (maximum is not None and number > maximum):
+        bound = f"{minimum}..{maximum}" if maximum is not None else f"≥ {minimum}"
+        raise ValueError(f"Header {name} : {number} hors limites ({bound})")
+    return number
+
+
+def chunk_geometry(chunk_index, total_chunks, chunk_size, file_size):
+    # En-têtes numériques de /receive_chunk (valeurs brutes, chunk_size déjà défaut
+    # si absent) → (index, nombre de chunks, taille de chunk, taille du fichier ou None).
+    # ValueError (→ 400) si un en-tête n'est pas un entier ou sort des limites.
+    total_chunks = header_int("X-Total-Chunks", total_chunks, 1)
+    chunk_index = header_int("X-Chunk-Index", chunk_index, 0, total_chunks - 1)
+    chunk_size = header_int("X-Chunk-Size", chunk_size, 1, MAX_CHUNK_SIZE)
+    if file_size is not None:
+        file_size = header_int("X-File-Size", file_size, 1)
+        if -(-file_size // chunk_size) != total_chunks:
+            raise ValueError(
+                f"Header X-File-Size : {file_size} octets incohérents avec {total_chunks} chunk(s) de {chunk_size}"
+            )
+    return chunk_index, total_chunks, chunk_size, file_size
+
+
+AES_KEY_SIZES = (16, 24, 32)
+
+
+def check_dispatch_headers(aes_key, aes_nonce=None, strategy=None):
+    # Clé / nonce transmis aux fog nodes et stratégie demandée (X-LB-Strategy),
+    # vérifiés avant dispatch : ValueError (→ 400) plutôt qu'un refus des nœuds
+    try:
+        key = bytes.fromhex(aes_key)
+        nonce = bytes.fromhex(aes_nonce) if aes_nonce is not None else None
+    except ValueError:
+        raise ValueError("Headers X-AES-Key / X-AES-Nonce : hexadécimal attendu") from None
+    if len(key) not in AES_KEY_SIZES:
+        raise ValueError(f"Header X-AES-Key : clé de {len(key)} octets (attendu : 16, 24 ou 32)")
+    if nonce is not None and len(nonce) != NONCE_SIZE:
+        raise ValueError(f"Header X-AES-Nonce : {len(nonce)} octets (attendu : {NONCE_SIZE})")
+    if strategy:
+        resolve(strategy)
+
+
+def check_chunk_length(chunk_index, total_chunks, chunk_size, length, file_size=None):
+    # Taille du corps d'un chunk avant dispatch : chunk_size exactement, sauf le dernier
+    # (0 < length <= chunk_size, ou le reste exact si X-File-Size est connu).
+    # Un enregistrement d'une autre taille déborderait sur son voisin (cf. reassembly.py).
+    if file_size is not None:
+        expected = min(chunk_size, file_size - chunk_index * chunk_size)
+        valid = expected > 0 and length == expected
+    elif chunk_index < total_chunks - 1:
+        expected = chunk_size
+        valid = length == expected
+    else:
+        expected = f"1..{chunk_size}"
+        valid = 0 < length <= chunk_size
+    if not valid:
+        raise ValueError(f"Chunk {chunk_index} : {length} octets reçus, {expected} attendus")
+
+
+def parse_range(value, size):
+    # En-tête Range → (début, fin exclue), ou None si la réponse porte sur tout le
+    # fichier : Range absent, multiple, mal formé ou invalide (bytes=5-3), tous
+    # ignorés (RFC 9110 §14.2). ValueError (416) si la plage ne recouvre aucun octet.
+    # Commun aux deux plans (/download_result).
+    if not value or not value.startswith("bytes=") or "," in value:
+        return None
+    first, sep, last = (part.strip() for part in value[len("bytes="):].partition("-"))
+    if not sep or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if not first:
+        # bytes=-N : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise ValueError("Plage vide")
+        return max(0, size - length), size
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Plage hors du fichier")
+    return start, min(size, int(last) + 1) if last else size
+
+
+class BodyReader:
+    # Vue fichier d'un corps de longueur connue, avec son propre curseur :
+    # requests l'envoie tel quel (Content-Length = len) en le lisant par blocs.
+    def __init__(self, body):
+        self.body = body
+        self.len = body.len
+        self.offset = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.len
+        size = min(size, self.len - self.offset)
+        if size <= 0:
+            return b""
+        block = self.body.read_at(self.offset, size)
+        self.offset += len(block)
+        return block
+
+
+class StreamBody:
+    # Corps reçu en flux, rejouable sans être lu d'avance : chaque bloc lu sur
+    # le flux client est recopié dans un tampon (mémoire, puis disque). Une
+    # tentative lit d'abord le tampon, puis la suite du flux.
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.len = length
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        self.spooled = 0
+        self.lock = Lock()
+
+    def open(self):
+        return BodyReader(self)
+
+    def read_at(self, offset, size):
+        with self.lock:
+            if offset < self.spooled:
+                self.spool.seek(offset)
+                return self.spool.read(min(size, self.spooled - offset))
+            try:
+                block = self.stream.read(min(size, self.len - self.spooled))
+            except Exception as e:
+                raise ClientDisconnected(f"Corps du chunk interrompu : {e}") from e
+            if not block:
+                raise ClientDisconnected("Corps du chunk incomplet")
+            self.spool.seek(self.spooled)
+            self.spool.write(block)
+            self.spooled += len(block)
+            return block
+
+    def close(self):
+        with self.lock:
+            self.spool.close()
+
+
+class BytesBody:
+    # Chunk déjà en mémoire (ou lu depuis le disque)
+    def __init__(self, data):
+        self.data = data
+        self.len = len(data)
+
+    def open(self):
+        return BodyReader(self)
+
+    def read_at(self, offset, size):
+        return self.data[offset:offset + size]
+
+    def close(self):
+        pass
+
+
+class Attempt:
+    # Un envoi d'un chunk vers un nœud (premier envoi, retry ou couverture)
+    def __init__(self, node, hedge=False, retry=False):
+        self.node = node
+        self.hedge = hedge
+        self.start = time.time()
+        self.sent_at = None  # sortie de la file d'attente du LB
+        self.headers_at = None
+        self.received = 0  # octets de la réponse relayés
+        self.future = None
+        # Fils du span courant (lb.dispatch) ; terminé par Engine.finish_attempt
+        self.span = tracer.start("lb.attempt", start=self.start, node=node, hedge=hedge, retry=retry)
+
+
+class DispatchResult:
+    def __init__(self, node, strategy, elapsed, attempts, value, hedged=False):
+        self.node = node
+        self.strategy = strategy
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.value = value
+        self.hedged = hedged
+
+
+class Engine:
+    def __init__(self, nodes, strategy="round_robin"):
+        self.lock = Lock()
+        self.registry = NodeRegistry(nodes)
+        self.inflight = {node: 0 for node in nodes}
+        self.inflight_bytes = {node: 0 for node in nodes}
+        self.telemetry = TelemetryCollector(nodes, on_alive=self.registry.heartbeat).start()
+        self.registry.on_change(self._members_changed)
+
+        # Une instance par stratégie, conservée d'un changement à l'autre
+        self.strategies = {name: cls(self) for name, cls in STRATEGIES.items()}
+        self.stats = {name: self._empty_stats() for name in STRATEGIES}
+        self.mix = []
+        self.set_strategy({strategy: 1.0})
+
+        self.executor = ThreadPoolExecutor(max_workers=DISPATCH_THREADS, thread_name_prefix="dispatch")
+        # Temps jusqu'aux en-têtes de réponse, en secondes par octet (seuil de couverture)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.hedge_tokens = HEDGE_BURST * HEDGE_BUDGET
+        self.cache = ChunkCache()
+        # Modèle de coût par nœud (overhead + coût par octet), appris quelle que
+        # soit la stratégie active : stratégie hybrid et dimensionnement des chunks
+        self.models = {}
+
+    # -----------------------------
+    # Composition du parc (cf. registry.py)
+    # -----------------------------
+    @property
+    def nodes(self):
+        return self.registry.members()
+
+    def _members_changed(self, members):
+        with self.lock:
+            # Compteurs jamais supprimés : des envois vers un nœud retiré peuvent être en cours
+            for node in members:
+                self.inflight.setdefault(node, 0)
+                self.inflight_bytes.setdefault(node, 0)
+        # Les nœuds éjectés ou muets restent sondés pour détecter leur retour
+        self.telemetry.nodes = members
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "chunks": 0,
+            "errors": 0,
+            "retries": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "deadline_exceeded": 0,
+            "bytes": 0,
+            "time_total": 0.0,
+        }
+
+    # -----------------------------
+    # Stratégie active / A/B
+    # -----------------------------
+    def set_strategy(self, weights):
+        # weights : {"nom": poids}. Un seul nom = stratégie unique, plusieurs = A/B
+        mix = [(resolve(name), float(w)) for name, w in weights.items() if float(w) > 0]
+        if not mix:
+            raise ValueError("Aucune stratégie avec un poids positif")
+        self.mix = mix
+
+    def pick_strategy(self, name=None):
+        if name:
+            return self.strategies[resolve(name)]
+        mix = self.mix
+        if len(mix) == 1:
+            return self.strategies[mix[0][0]]
+        names, weights = zip(*mix)
+        return self.strategies[random.choices(names, weights=weights)[0]]
+
+    def strategy_status(self):
+        with self.lock:
+            stats = {
+                name: {
+                    **s,
+                    "avg_time": s["time_total"] / s["chunks"] if s["chunks"] else 0,
+                }
+                for name, s in self.stats.items()
+            }
+        return {
+            "strategy": {name: w for name, w in self.mix},
+            "available": list(STRATEGIES),
+            "stats": stats,
+        }
+
+    # -----------------------------
+    # Charge des nœuds (télémétrie en arrière-plan)
+    # -----------------------------
+    def node_load(self, node):
+        if not self.telemetry.is_fresh(node):
+            return 100, 100
+        sample, _ = self.telemetry.get(node)
+        return sample["cpu_percent"], sample["ram_percent"]
+
+    def node_tasks(self, node):
+        if not self.telemetry.is_fresh(node):
+            return float("inf")
+        sample, _ = self.telemetry.get(node)
+        return sample["tasks_running"]
+
+    # -----------------------------
+    # Dimensionnement des chunks (cf. chunk_sizing.py)
+    # -----------------------------
+    def model_prior(self):
+        # Médiane du parc mesuré (nœud jamais mesuré), sinon valeurs par défaut
+        measured = [m for m in list(self.models.values()) if m.updated_at is not None]
+        if not measured:
+            return HybridStrategy.DEFAULT_SPB, HybridStrategy.DEFAULT_OVERHEAD
+        spbs = sorted(m.spb for m in measured)
+        overheads = sorted(m.overhead for m in measured)
+        return spbs[len(spbs) // 2], overheads[len(overheads) // 2]
+
+    def chunk_plan(self, file_size):
+        # Nœud encore jamais mesuré : médiane du parc
+        with self.lock:
+            prior = self.model_prior()
+            params = []
+            for node in self.registry.available():
+                model = self.models.get(node)
+                params.append((model.spb, model.overhead) if model is not None else prior)
+        return recommend(file_size, params)
+
+    # -----------------------------
+    # Envoi d'un chunk
+    # -----------------------------
+    def choose(self, strategy, candidates, chunk_size):
+        node = strategy.select(candidates, chunk_size)
+        # Slow-start : un nœud qui vient de (re)joindre n'accepte qu'une part du trafic
+        weights = {n: self.registry.weight(n) for n in candidates}
+        top = max(weights.values())
+        if weights[node] < top and random.random() > weights[node] / top:
+            others = [n for n in candidates if n != node]
+            node = strategy.select(others, chunk_size)
+        return node
+
+    def hedge_delay(self, nbytes):
+        # Délai avant requête de couverture : p95 des envois récents (None = pas assez de mesures)
+        with self.lock:
+            samples = sorted(self.latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        per_byte = samples[int(HEDGE_QUANTILE * (len(samples) - 1))]
+        return max(HEDGE_MIN_DELAY, per_byte * nbytes)
+
+    def refill_hedge_tokens(self):
+        # Chaque chunk envoyé crédite LB_HEDGE_BUDGET requête de couverture
+        with self.lock:
+            self.hedge_tokens = min(HEDGE_BURST, self.hedge_tokens + HEDGE_BUDGET)
+
+    def take_hedge_token(self):
+        with self.lock:
+            if self.hedge_tokens < 1:
+                return False
+            self.hedge_tokens -= 1
+            return True
+
+    def begin_attempt(self, strategy, tried, nbytes, hedge=False):
+        # Choix du nœud (hors nœuds déjà essayés) et comptage de l'envoi en cours
+        candidates = [n for n in self.registry.available() if n not in tried]
+        if not candidates:
+            raise NoNodeAvailable(f"Aucun fog node disponible (essayés : {tried})")
+
+        node = self.choose(strategy, candidates, nbytes)
+        tried.append(node)
+        with self.lock:
+            self.inflight[node] += 1
+            self.inflight_bytes[node] += nbytes
+            if hedge:
+                self.stats[strategy.name]["hedges"] += 1
+            elif len(tried) > 1:
+                self.stats[strategy.name]["retries"] += 1
+        lb_metrics.attempt_started(strategy.name, node, hedge, len(tried) > 1)
+        return Attempt(node, hedge, retry=len(tried) > 1 and not hedge)
+
+    def _launch(self, strategy, tried, path, body, headers, deadline, hedge=False):
+        attempt = self.begin_attempt(strategy, tried, body.len, hedge)
+        attempt.future = self.executor.submit(self._send, attempt, path, body, headers, deadline)
+        return attempt
+
+    def _send(self, attempt, path, body, headers, deadline):
+        # Dans un thread du pool : renvoie la réponse dès réception de ses en-têtes
+        attempt.sent_at = time.time()
+        remaining = deadline - attempt.sent_at
+        if remaining <= 0:
+            raise DeadlineExceeded("Échéance dépassée avant l'envoi")
+        fog_resp = pools.post(
+            f"{attempt.node}{path}",
+            data=body.open(),
+            headers={
+                "Content-Type": "application/octet-stream",
+                **headers,
+                **attempt.span.headers(),
+                DEADLINE_HEADER: str(int(remaining * 1000)),
+            },
+            stream=True,
+            timeout=remaining,
+        )
+        attempt.headers_at = time.time()
+        try:
+            fog_resp.raise_for_status()
+        except RequestException:
+            fog_resp.close()
+            raise
+        return fog_resp
+
+    def finish_attempt(self, strategy, attempt, nbytes, ok, error=None):
+        # ok=None : tentative abandonnée (une autre a répondu avant), rien à apprendre
+        elapsed = time.time() - attempt.start
+        lb_metrics.attempt_finished(strategy.name, attempt, nbytes, ok, None if ok else failure_reason(error))
+        self.end_span(attempt, ok, error)
+        with self.lock:
+            self.inflight[attempt.node] -= 1
+            self.inflight_bytes[attempt.node] -= nbytes
+            if ok is None:
+                return
+            stats = self.stats[strategy.name]
+            if ok:
+                stats["chunks"] += 1
+                stats["bytes"] += nbytes
+                stats["time_total"] += elapsed
+                stats["hedge_wins"] += attempt.hedge
+                self.latencies.append((attempt.headers_at - attempt.start) / max(nbytes, 1))
+            else:
+                stats["errors"] += 1
+            model = self.models.get(attempt.node)
+            if model is None:
+                model = self.models[attempt.node] = NodeModel(*self.model_prior())
+            # Échec : compté comme un envoi deux fois plus lent que prévu
+            observed = elapsed if ok else max(elapsed, 2 * (model.overhead + model.spb * nbytes))
+            model.observe(nbytes, observed, HybridStrategy.ALPHA)
+        strategy.on_result(attempt.node, elapsed, nbytes, ok)
+
+        # 503 = nœud saturé (contre-pression), 504 / échéance = budget du chunk
+        # épuisé : ni l'un ni l'autre n'est une panne du nœud
+        status = error_status(error)
+        if status not in (503, 504) and not isinstance(error, DeadlineExceeded):
+            self.registry.record(attempt.node, ok, elapsed, nbytes)
+
+    @staticmethod
+    def end_span(attempt, ok, error):
+        span = attempt.span
+        if attempt.sent_at is not None:
+            span.record("lb.queue", attempt.start, attempt.sent_at)
+            if attempt.headers_at is not None:
+                span.record("lb.fog", attempt.sent_at, attempt.headers_at)
+        outcome = "abandoned" if ok is None else "ok" if ok else failure_reason(error)
+        span.set(outcome=outcome, received=attempt.received)
+        span.end(error)
+
+    def _abandon(self, strategy, attempt, body):
+        attempt.future.cancel()
+
+        def release(future):
+            if not future.cancelled() and future.exception() is None:
+                future.result().close()
+            self.finish_attempt(strategy, attempt, body.len, None)
+
+        attempt.future.add_done_callback(release)
+
+    def cache_key(self, cache_context, body):
+        # Clé de cache du chunk : lit le corps en entier (il reste rejouable)
+        hasher = cache_hasher(*cache_context, body.len)
+        offset = 0
+        while offset < body.len:
+            block = body.read_at(offset, STREAM_BUFFER)
+            hasher.update(block)
+            offset += len(block)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def counted(attempt, blocks):
+        # Octets de la réponse relayés (métrique lb_bytes_in_total)
+        for block in blocks:
+            attempt.received += len(block)
+            yield block
+
+    def dispatch(self, path, body, headers, consume, strategy=None, deadline=None, cache_context=None):
+        # consume(blocs) traite la réponse du fog node en flux et renvoie un résultat.
+        # body : StreamBody / BytesBody (rejouable pour les retries et la couverture)
+        # cache_context : (clé hex, nonce hex, index, nombre de chunks) d'un chiffrement
+        strategy = self.pick_strategy(strategy)
+        start = time.time()
+        with tracer.start("lb.dispatch", strategy=strategy.name, bytes=body.len) as span:
+            try:
+                result = self._dispatch(path, body, headers, consume, strategy, deadline, cache_context)
+            except Exception as e:
+                lb_metrics.dispatch_finished(strategy.name, "none", dispatch_outcome(e), time.time() - start)
+                span.set(outcome=dispatch_outcome(e))
+                raise
+            outcome = "cache" if result.node == CACHE_NODE else "ok"
+            lb_metrics.dispatch_finished(strategy.name, result.node, outcome, time.time() - start)
+            span.set(node=result.node, outcome=outcome, attempts=result.attempts, hedged=result.hedged)
+            return result
+
+    def _dispatch(self, path, body, headers, consume, strategy, deadline, cache_context):
+        deadline = deadline or time.time() + CHUNK_DEADLINE
+
+        if cache_context is not None and self.cache.enabled:
+            start = time.time()
+            with tracer.start("lb.cache_lookup") as span:
+                key = self.cache_key(cache_context, body)
+                record = self.cache.get(key)
+                span.set(hit=record is not None)
+            if record is not None:
+                return DispatchResult(CACHE_NODE, strategy.name, time.time() - start, 0, consume([record]))
+            consume = self.cache.tee(key, consume)
+
+        tried = []
+        pending = {}  # future -> Attempt
+        hedge_at = None
+        hedged = False
+
+        self.refill_hedge_tokens()
+        delay = self.hedge_delay(body.len)
+
+        try:
+            while True:
+                if not pending:
+                    if len(tried) >= MAX_ATTEMPTS:
+                        raise NoNodeAvailable(f"Échec après {len(tried)} tentatives ({tried})")
+                    attempt = self._launch(strategy, tried, path, body, headers, deadline)
+                    pending[attempt.future] = attempt
+                    if delay is not None and not hedged:
+                        hedge_at = attempt.start + delay
+
+                now = time.time()
+                if now >= deadline:
+                    with self.lock:
+                        self.stats[strategy.name]["deadline_exceeded"] += 1
+                    raise DeadlineExceeded(f"Échéance dépassée après {len(tried)} tentative(s) ({tried})")
+                timeout = deadline - now
+                if hedge_at is not None:
+                    timeout = max(0.0, min(timeout, hedge_at - now))
+
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    if hedge_at is not None and time.time() >= hedge_at:
+                        # Premier envoi trop lent : doublé vers un autre nœud
+                        hedge_at = None
+                        hedged = True
+                        if len(tried) < MAX_ATTEMPTS and self.take_hedge_token():
+                            try:
+                                attempt = self._launch(strategy, tried, path, body, headers, deadline, hedge=True)
+                            except NoNodeAvailable:
+                                continue
+                            pending[attempt.future] = attempt
+                            print(f"[LB] ⇉ Requête de couverture vers {attempt.node} (après {delay:.3f}s)")
+                    continue
+
+                winner = None
+                for future in done:
+                    attempt = pending.pop(future)
+                    try:
+                        fog_resp = future.result()
+                    except ClientDisconnected:
+                        self.finish_attempt(strategy, attempt, body.len, None)
+                        raise
+                    except Exception as e:
+                        print(f"[LB] ✗ Échec envoi vers {attempt.node} : {e}")
+                        if is_rejection(error_status(e)):
+                            self.finish_attempt(strategy, attempt, body.len, None)
+                            raise ChunkRejected(attempt.node, error_status(e)) from e
+                        self.finish_attempt(strategy, attempt, body.len, False, e)
+                        continue
+                    if winner is None:
+                        winner = (attempt, fog_resp)
+                    else:
+                        fog_resp.close()
+                        self.finish_attempt(strategy, attempt, body.len, None)
+                if winner is None:
+                    continue
+
+                # Première réponse reçue : les autres tentatives sont abandonnées
+                for other in pending.values():
+                    self._abandon(strategy, other, body)
+                pending = {}
+
+                attempt, fog_resp = winner
+                try:
+                    with fog_resp, tracer.start("lb.relay", node=attempt.node):
+                        value = consume(self.counted(attempt, fog_resp.iter_content(STREAM_BUFFER)))
+                except RequestException as e:
+                    # Réponse coupée en cours de relais : l'écriture à l'offset est rejouable
+                    print(f"[LB] ✗ Réponse interrompue depuis {attempt.node} : {e}")
+                    self.finish_attempt(strategy, attempt, body.len, False, e)
+                    continue
+                except Exception as e:
+                    self.finish_attempt(strategy, attempt, body.len, False, e)
+                    raise
+
+                self.finish_attempt(strategy, attempt, body.len, True)
+                return DispatchResult(
+                    attempt.node, strategy.name, time.time() - attempt.start, len(tried), value,
+                    hedged=attempt.hedge,
+                )
+
+        finally:
+            for attempt in pending.values():
+                self._abandon(strategy, attempt, body)
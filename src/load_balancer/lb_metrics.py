@@ -0,0 +1,82 @@
+# lb_metrics.py — Métriques Prometheus du load balancer
+#
+# Exposées sur LB_METRICS_PORT (9005 par défaut, 0 = désactivé), même
+# principe que les fog nodes (8000 + port % 1000). Toutes les séries sont
+# étiquetées par stratégie et par nœud (cardinalité bornée par le parc) :
+#   lb_dispatch_seconds       durée d'un chunk de bout en bout (retries et couverture compris),
+#                             par résultat (ok, cache, deadline, unavailable, rejected...)
+#   lb_queue_wait_seconds     attente côté LB avant l'envoi au nœud (pool d'envoi,
+#                             concurrence par nœud du plan asyncio)
+#   lb_fog_service_seconds    envoi du chunk → en-têtes de la réponse du nœud
+#   lb_bytes_out_total        octets de chunks envoyés aux nœuds
+#   lb_bytes_in_total         octets reçus des nœuds (chunks chiffrés / déchiffrés)
+#   lb_retries_total, lb_hedges_total, lb_failures_total (par motif : code HTTP, deadline, network)
+#   lb_inflight_requests      envois en cours
+
+import os
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+METRICS_PORT = int(os.environ.get("LB_METRICS_PORT", "9005"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+dispatch_histogram = Histogram(
+    'lb_dispatch_seconds', 'Chunk dispatch time, retries and hedges included',
+    ['strategy', 'node', 'outcome'], buckets=LATENCY_BUCKETS,
+)
+queue_wait_histogram = Histogram(
+    'lb_queue_wait_seconds', 'Time an attempt waits in the LB before being sent to the node',
+    ['strategy', 'node'], buckets=WAIT_BUCKETS,
+)
+service_histogram = Histogram(
+    'lb_fog_service_seconds', 'Time from sending a chunk to the node until its response headers',
+    ['strategy', 'node'], buckets=LATENCY_BUCKETS,
+)
+bytes_out_counter = Counter('lb_bytes_out_total', 'Chunk bytes sent to fog nodes', ['strategy', 'node'])
+bytes_in_counter = Counter('lb_bytes_in_total', 'Bytes received from fog nodes', ['strategy', 'node'])
+retries_counter = Counter('lb_retries_total', 'Attempts replayed on another node', ['strategy', 'node'])
+hedges_counter = Counter('lb_hedges_total', 'Hedge requests sent', ['strategy', 'node'])
+failures_counter = Counter('lb_failures_total', 'Failed attempts', ['strategy', 'node', 'reason'])
+inflight_gauge = Gauge('lb_inflight_requests', 'Attempts in flight', ['strategy', 'node'])
+
+
+def start(port=METRICS_PORT):
+    if not port:
+        return
+    try:
+        start_http_server(port)
+        print(f"[LB] Métriques Prometheus sur le port {port}")
+    except OSError as e:
+        # Port déjà pris (autre LB sur la machine) : le LB sert quand même
+        print(f"[LB] ✗ Métriques Prometheus indisponibles (port {port}) : {e}")
+
+
+def attempt_started(strategy, node, hedge, retry):
+    inflight_gauge.labels(strategy, node).inc()
+    if hedge:
+        hedges_counter.labels(strategy, node).inc()
+    elif retry:
+        retries_counter.labels(strategy, node).inc()
+
+
+def attempt_finished(strategy, attempt, nbytes, ok, reason=None):
+    # ok=None : tentative abandonnée, seul l'envoi en cours est décompté
+    node = attempt.node
+    inflight_gauge.labels(strategy, node).dec()
+    if ok is None:
+        return
+    if attempt.sent_at is not None:
+        queue_wait_histogram.labels(strategy, node).observe(attempt.sent_at - attempt.start)
+        bytes_out_counter.labels(strategy, node).inc(nbytes)
+        if attempt.headers_at is not None:
+            service_histogram.labels(strategy, node).observe(attempt.headers_at - attempt.sent_at)
+    if attempt.received:
+        bytes_in_counter.labels(strategy, node).inc(attempt.received)
+    if not ok:
+        failures_counter.labels(strategy, node, reason or "error").inc()
+
+
+def dispatch_finished(strategy, node, outcome, elapsed):
+    dispatch_histogram.labels(strategy, node, outcome).observe(elapsed)
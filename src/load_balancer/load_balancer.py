@@ -0,0 +1,760 @@
+# load_balancer.py — Load balancer unifié (stratégie choisie au démarrage ou à chaud)
+#
+#   python src/load_balancer/load_balancer.py --strategy round_robin
+#
+# Stratégies : random, round_robin, hybrid, least_connections, least_outstanding,
+# p2c, peak_ewma (cf. strategies.py).
+# Changement à chaud : POST /admin/strategy {"strategy": "hybrid"}
+# A/B sur le trafic réel : POST /admin/strategy {"strategy": {"random": 1, "hybrid": 1}}
+# Plan de données asyncio (forte concurrence, cf. async_lb.py) : --async ou LB_ASYNC=1
+# Uploads reprenables : POST /uploads, PUT /uploads/<id>/chunks/<i>, commit (cf. sessions.py)
+
+from flask import Flask, Response, request, jsonify, send_file
+from flask_cors import CORS
+import argparse
+import functools
+import hmac
+import os
+import sys
+import time
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+# Modules partagés de src/ (pool HTTP, configuration)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_pool import pools
+from config import CHUNK_SIZE, FOG_NODES, NODE_TOKEN, NODE_TOKEN_HEADER
+from container import Container, ContainerError
+
+from engine import (
+    DEADLINE_HEADER,
+    TENANT_HEADER,
+    BytesBody,
+    ChunkRejected,
+    DeadlineExceeded,
+    Engine,
+    NoNodeAvailable,
+    StreamBody,
+    check_chunk_length,
+    check_dispatch_headers,
+    chunk_geometry,
+    deadline_from,
+    parse_range,
+    tracer,
+)
+import lb_metrics
+from reassembly import Reassembler
+from sessions import SessionError, SessionStore
+from strategies import resolve
+from tracing import CHUNK_HEADER, UPLOAD_HEADER
+
+app = Flask(__name__)
+CORS(app)
+
+# Dossier des fichiers reconstruits
+OUTPUT_FOLDER = "processed_files/"
+UPLOAD_FOLDER = "uploads_lb"
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+MAX_THREADS = 5
+# Chunks déchiffrés en parallèle par restauration (borne aussi la mémoire)
+RESTORE_WINDOW = int(os.environ.get("LB_RESTORE_WINDOW", "6"))
+LB_PORT = int(os.environ.get("LB_PORT", "5005"))
+
+reassembler = Reassembler(OUTPUT_FOLDER)
+sessions = SessionStore(reassembler)
+engine = Engine(FOG_NODES, os.environ.get("LB_STRATEGY", "round_robin"))
+
+
+def incoming_chunk():
+    # Corps brut application/octet-stream, ou ancien format multipart (files["chunk"])
+    if "chunk" in request.files:
+        stream = request.files["chunk"].stream
+        stream.seek(0, os.SEEK_END)
+        length = stream.tell()
+        stream.seek(0)
+        return stream, length
+    return request.stream, request.content_length or 0
+
+
+def drain(stream, length):
+    # Corps ignoré (chunk déjà reçu) : lu quand même pour garder la connexion utilisable
+    while length > 0:
+        block = stream.read(min(length, 64 * 1024))
+        if not block:
+            break
+        length -= len(block)
+
+
+def fog_headers(filename, chunk_index, total_chunks, aes_key, aes_nonce, tenant=None, upload_id=None):
+    return {
+        "X-AES-Key": aes_key,
+        "X-AES-Nonce": aes_nonce,
+        "X-File-Name": filename,
+        "X-Chunk-Index": str(chunk_index),
+        "X-Total-Chunks": str(total_chunks),
+        TENANT_HEADER: tenant or "",
+        UPLOAD_HEADER: upload_id or aes_nonce,
+    }
+
+
+def traced(name):
+    # Span serveur de la route, rattaché à la trace du client (cf. tracing.py)
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            with tracer.start(
+                name,
+                request.headers,
+                upload_id=kwargs.get("upload_id", request.headers.get(UPLOAD_HEADER)),
+                chunk=kwargs.get("chunk_index", request.headers.get(CHUNK_HEADER)),
+                bytes=request.content_length,
+            ):
+                return view(**kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ==========================================================
+# CLIENT → LB → FOG → LB (enregistrement chunk)
+# ==========================================================
+@app.route("/receive_chunk", methods=["POST"])
+@traced("lb.receive_chunk")
+def receive_chunk():
+
+    try:
+        filename = request.headers.get("X-File-Name")
+        chunk_index = request.headers.get("X-Chunk-Index")
+        aes_key = request.headers.get("X-AES-Key")
+        aes_nonce = request.headers.get("X-AES-Nonce")
+        total_chunks = request.headers.get("X-Total-Chunks")
+
+        if not filename or not aes_key or not aes_nonce:
+            return jsonify({"error": "Headers manquants"}), 400
+
+        if chunk_index is None or total_chunks is None:
+            return jsonify({"error": "Headers X-Chunk-Index / X-Total-Chunks manquants"}), 400
+
+        try:
+            chunk_index, total_chunks, chunk_size, file_size = chunk_geometry(
+                chunk_index,
+                total_chunks,
+                request.headers.get("X-Chunk-Size", CHUNK_SIZE),
+                request.headers.get("X-File-Size"),
+            )
+            check_dispatch_headers(aes_key, aes_nonce, request.headers.get("X-LB-Strategy"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        stream, length = incoming_chunk()
+        if not length:
+            return jsonify({"error": "chunk manquant"}), 400
+        try:
+            check_chunk_length(chunk_index, total_chunks, chunk_size, length, file_size)
+        except ValueError as e:
+            drain(stream, length)
+            return jsonify({"error": str(e)}), 400
+
+        # Un upload est identifié par son nonce (un nouveau nonce = un nouvel envoi)
+        upload_id = request.headers.get("X-Upload-Id", aes_nonce)
+
+        print(f"[LB] → Envoi chunk {chunk_index} ({length} octets)")
+
+        # Écriture à l'offset du chunk : l'ordre d'arrivée n'a pas d'importance
+        # (réponse fog relayée bloc par bloc vers le disque)
+        def consume(blocks):
+            return reassembler.write_chunk(
+                filename,
+                upload_id,
+                chunk_index,
+                chunk_size,
+                total_chunks,
+                blocks,
+                file_size=file_size,
+                base_nonce=bytes.fromhex(aes_nonce),
+            )
+
+        # Échéance fournie par le client (budget restant), sinon LB_CHUNK_DEADLINE
+        deadline = deadline_from(request.headers.get(DEADLINE_HEADER))
+        body = StreamBody(stream, length)
+        try:
+            result = engine.dispatch(
+                "/task_chunk",
+                body,
+                fog_headers(
+                    filename, chunk_index, total_chunks, aes_key, aes_nonce,
+                    request.headers.get(TENANT_HEADER), upload_id,
+                ),
+                consume,
+                strategy=request.headers.get("X-LB-Strategy"),
+                deadline=deadline,
+                cache_context=(aes_key, aes_nonce, chunk_index, total_chunks),
+            )
+        finally:
+            body.close()
+        complete = result.value
+
+        print(f"[LB] ✓ Chunk {chunk_index} placé dans {filename}.encrypted (via {result.node})")
+        if complete:
+            print(f"[LB] ✓ Fichier {filename}.encrypted complet")
+
+        return jsonify(
+            {
+                "results": [
+                    {
+                        "chunk": chunk_index,
+                        "node_used": result.node,
+                        "strategy": result.strategy,
+                        "processing_time": result.elapsed,
+                        "attempts": result.attempts,
+                        "hedged": result.hedged,
+                        "status": "received",
+                    }
+                ],
+                "complete": complete,
+            }
+        )
+
+    except ChunkRejected as e:
+        # Refus 4xx des fog nodes : erreur du client, relayée telle quelle
+        print("[LB ERROR]", e)
+        return jsonify({"error": str(e)}), e.status_code
+
+    except NoNodeAvailable as e:
+        print("[LB ERROR]", e)
+        return jsonify({"error": str(e)}), 503
+
+    except DeadlineExceeded as e:
+        print("[LB ERROR]", e)
+        return jsonify({"error": str(e)}), 504
+
+    except Exception as e:
+        print("[LB ERROR]", e)
+        return jsonify({"error": str(e)}), 500
+
+
+# ==========================================================
+# SESSIONS D'UPLOAD (reprise : seuls les chunks manquants sont renvoyés)
+# ==========================================================
+def chunk_plan(file_size):
+    # Taille recommandée (débit et overhead mesurés des nœuds sains), sinon défaut
+    try:
+        return engine.chunk_plan(file_size)
+    except ValueError:
+        total_chunks = max(1, -(-file_size // CHUNK_SIZE))
+        return {"chunk_size": CHUNK_SIZE, "total_chunks": total_chunks, "window": MAX_THREADS, "nodes": 0}
+
+
+@app.route("/chunk_plan", methods=["GET"])
+def get_chunk_plan():
+    file_size = request.args.get("file_size", type=int)
+    if not file_size or file_size <= 0:
+        return jsonify({"error": "Paramètre file_size (octets) attendu"}), 400
+    return jsonify(chunk_plan(file_size))
+
+
+@app.route("/uploads", methods=["POST"])
+def create_upload():
+    # chunk_size absent : taille recommandée par le LB pour ce fichier
+    data = request.get_json(silent=True) or {}
+    try:
+        file_size = int(data.get("file_size", 0))
+        chunk_size = data.get("chunk_size")
+        plan = chunk_plan(file_size) if not chunk_size and file_size > 0 else {}
+        session = sessions.create(
+            data.get("filename"),
+            file_size,
+            int(chunk_size or plan.get("chunk_size", CHUNK_SIZE)),
+            data.get("aes_nonce"),
+        )
+    except (TypeError, ValueError):
+        return jsonify({"error": "file_size / chunk_size entiers attendus"}), 400
+    except SessionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    return jsonify({**sessions.status(session), "window": plan.get("window")}), 201
+
+
+@app.route("/uploads/<upload_id>", methods=["GET"])
+def upload_status(upload_id):
+    try:
+        return jsonify(sessions.status(sessions.get(upload_id)))
+    except SessionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+
+
+@app.route("/uploads/<upload_id>/chunks/<int:chunk_index>", methods=["PUT"])
+@traced("lb.put_chunk")
+def put_chunk(upload_id, chunk_index):
+    stream, length = request.stream, request.content_length or 0
+    try:
+        session = sessions.get(upload_id)
+        aes_key = request.headers.get("X-AES-Key")
+        if not aes_key:
+            raise SessionError("Header X-AES-Key manquant")
+        sessions.check_key(session, aes_key)
+        pending = sessions.pending(session, chunk_index)
+    except SessionError as e:
+        drain(stream, length)
+        return jsonify({"error": str(e)}), e.status_code
+
+    if not pending:
+        # Chunk déjà acquitté (renvoi après une coupure) : rien à refaire
+        drain(stream, length)
+        return jsonify({"chunk": chunk_index, "status": "already_received"})
+
+    try:
+        check_dispatch_headers(aes_key, strategy=request.headers.get("X-LB-Strategy"))
+    except ValueError as e:
+        drain(stream, length)
+        return jsonify({"error": str(e)}), 400
+
+    expected = min(session.chunk_size, session.file_size - chunk_index * session.chunk_size)
+    if length != expected:
+        drain(stream, length)
+        return jsonify({"error": f"Chunk {chunk_index} : {length} octets reçus, {expected} attendus"}), 400
+
+    print(f"[LB] → Session {upload_id} : chunk {chunk_index} ({length} octets)")
+
+    def consume(blocks):
+        writer = sessions.open_chunk(session, chunk_index)
+        if writer is None:
+            return
+        with writer:
+            for block in blocks:
+                writer.write(block)
+        sessions.acknowledge(session, writer)
+
+    body = StreamBody(stream, length)
+    try:
+        result = engine.dispatch(
+            "/task_chunk",
+            body,
+            fog_headers(
+                session.filename, chunk_index, session.total_chunks, aes_key, session.base_nonce,
+                request.headers.get(TENANT_HEADER), upload_id,
+            ),
+            consume,
+            strategy=request.headers.get("X-LB-Strategy"),
+            deadline=deadline_from(request.headers.get(DEADLINE_HEADER)),
+            cache_context=(aes_key, session.base_nonce, chunk_index, session.total_chunks),
+        )
+    except ChunkRejected as e:
+        print("[LB ERROR]", e)
+        return jsonify({"error": str(e)}), e.status_code
+    except NoNodeAvailable as e:
+        print("[LB ERROR]", e)
+        return jsonify({"error": str(e)}), 503
+    except DeadlineExceeded as e:
+        print("[LB ERROR]", e)
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        print("[LB ERROR]", e)
+        return jsonify({"error": str(e)}), 500
+    finally:
+        body.close()
+
+    print(f"[LB] ✓ Session {upload_id} : chunk {chunk_index} acquitté (via {result.node})")
+    return jsonify(
+        {
+            "chunk": chunk_index,
+            "node_used": result.node,
+            "strategy": result.strategy,
+            "processing_time": result.elapsed,
+            "attempts": result.attempts,
+            "hedged": result.hedged,
+            "status": "received",
+        }
+    )
+
+
+@app.route("/uploads/<upload_id>/commit", methods=["POST"])
+def commit_upload(upload_id):
+    try:
+        session = sessions.get(upload_id)
+        missing = sessions.commit(session)
+    except SessionError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    if missing:
+        return jsonify({"error": "Chunks manquants", "missing": missing}), 409
+    return jsonify({"status": "committed", "file": session.filename, "upload_id": upload_id})
+
+
+# ==========================================================
+# CLIENT → LB : Récupération du fichier final
+# ==========================================================
+@app.route("/download_result/<filename>", methods=["GET"])
+def download_result(filename):
+
+    filepath = reassembler.final_path(filename)
+
+    if not os.path.exists(filepath):
+        progress = reassembler.progress(filename)
+        if progress is not None:
+            return jsonify({"error": "Upload en cours", **progress}), 409
+        return jsonify({"error": "Fichier indisponible"}), 404
+
+    print(f"[LB] → Envoi fichier final au client : {filename}.encrypted")
+
+    # Même lecture de Range que le plan asyncio : plage invalide ignorée (200),
+    # 416 seulement si elle ne recouvre aucun octet du fichier
+    size = os.path.getsize(filepath)
+    try:
+        if parse_range(request.headers.get("Range"), size) is None:
+            request.environ.pop("HTTP_RANGE", None)
+    except ValueError:
+        return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+
+    # conditional : Range / If-Range (206, reprise de téléchargement) et ETag ;
+    # le fichier passe par wsgi.file_wrapper (sendfile sous un serveur WSGI qui le fournit)
+    return send_file(os.path.abspath(filepath), as_attachment=True, conditional=True, etag=True)
+
+
+# ==========================================================
+# CLIENT → LB → FOG : Restauration (déchiffrement) du fichier
+# ==========================================================
+@app.route("/restore/<filename>", methods=["GET"])
+def restore(filename):
+    # Déchiffrement réparti sur les fog nodes (mêmes stratégies que le chiffrement),
+    # clair renvoyé en flux et dans l'ordre, au plus RESTORE_WINDOW chunks en mémoire
+    key_hex = request.headers.get("X-AES-Key")
+    if not key_hex:
+        return jsonify({"error": "Header X-AES-Key manquant"}), 400
+    strategy = request.headers.get("X-LB-Strategy")
+    try:
+        check_dispatch_headers(key_hex, strategy=strategy)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filepath = reassembler.final_path(filename)
+    if not os.path.exists(filepath):
+        progress = reassembler.progress(filename)
+        if progress is not None:
+            return jsonify({"error": "Upload en cours", **progress}), 409
+        return jsonify({"error": "Fichier indisponible"}), 404
+
+    # Fichier et pool fermés à toute sortie anticipée ; en cas de succès, la
+    # réponse en flux en devient responsable (close() en fin de generate)
+    with ExitStack() as cleanup:
+        f = cleanup.enter_context(open(filepath, "rb"))
+        try:
+            container = Container(f)
+        except ContainerError as e:
+            return jsonify({"error": str(e)}), 422
+
+        total_chunks = container.total_chunks
+        tenant = request.headers.get(TENANT_HEADER, "")
+        pool = ThreadPoolExecutor(max_workers=RESTORE_WINDOW)
+        window = deque()
+        next_index = 0
+
+        def decrypt_one(index, record):
+            return engine.dispatch(
+                "/decrypt_chunk",
+                BytesBody(record),
+                {
+                    "X-AES-Key": key_hex,
+                    "X-File-Name": filename,
+                    "X-Chunk-Index": str(index),
+                    "X-Total-Chunks": str(total_chunks),
+                    TENANT_HEADER: tenant,
+                },
+                lambda blocks: b"".join(blocks),
+                strategy=strategy,
+            )
+
+        def fill():
+            nonlocal next_index
+            while next_index < total_chunks and len(window) < RESTORE_WINDOW:
+                window.append(pool.submit(decrypt_one, next_index, container.read_record(next_index)))
+                next_index += 1
+
+        def close():
+            for future in window:
+                future.cancel()
+            pool.shutdown(wait=False)
+            f.close()
+
+        cleanup.callback(close)
+
+        print(f"[LB] → Restauration de {filename} ({total_chunks} chunks)")
+        fill()
+
+        # Premier chunk attendu avant de répondre : une mauvaise clé donne une erreur propre
+        try:
+            first = window.popleft().result()
+        except ChunkRejected as e:
+            return jsonify({"error": f"Déchiffrement refusé (clé incorrecte ou fichier altéré) : {e}"}), 422
+        except NoNodeAvailable as e:
+            return jsonify({"error": str(e)}), 503
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        cleanup.pop_all()
+
+    def generate():
+        try:
+            yield first.value
+            while window:
+                fill()
+                yield window.popleft().result().value
+            print(f"[LB] ✓ {filename} restauré")
+        finally:
+            close()
+
+    return Response(
+        generate(),
+        mimetype="application/octet-stream",
+        headers={
+            "Content-Length": str(container.header["file_size"]),
+            "Content-Disposition": f"attachment; filename={filename}",
+        },
+    )
+
+
+# ==========================================================
+# ROUTE /process_file — utilisée par l'interface web (fichier entier)
+# ==========================================================
+@app.route("/process_file", methods=["POST"])
+@app.route("/send_file", methods=["POST"])
+def process_file():
+
+    file = request.files.get("file")
+    if not file:
+        return jsonify({"error": "Aucun fichier reçu"}), 400
+
+    # lb_type : stratégie imposée pour ce fichier (sinon stratégie active)
+    lb_type = request.form.get("lb_type") or None
+    if lb_type:
+        try:
+            lb_type = resolve(lb_type)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    filename = file.filename
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    file.save(filepath)
+
+    file_size = os.path.getsize(filepath)
+    plan = chunk_plan(file_size)
+    chunk_size, total_chunks = plan["chunk_size"], plan["total_chunks"]
+
+    # L'interface web ne fournit pas de clé : le LB en génère une pour ce fichier
+    aes_key = os.urandom(16).hex()
+    aes_nonce = os.urandom(12).hex()
+    tenant = request.headers.get(TENANT_HEADER)
+
+    def send_one(chunk_index):
+        t0 = time.time()
+        with open(filepath, "rb") as f:
+            f.seek(chunk_index * chunk_size)
+            chunk = f.read(chunk_size)
+
+        def consume(blocks):
+            return reassembler.write_chunk(
+                filename, aes_nonce, chunk_index, chunk_size, total_chunks, blocks,
+                file_size=file_size, base_nonce=bytes.fromhex(aes_nonce),
+            )
+
+        try:
+            result = engine.dispatch(
+                "/task_chunk",
+                BytesBody(chunk),
+                fog_headers(filename, chunk_index, total_chunks, aes_key, aes_nonce, tenant),
+                consume,
+                strategy=lb_type,
+            )
+        except Exception as e:
+            print(f"[LB ERROR] chunk {chunk_index} : {e}")
+            return {
+                "chunk": chunk_index,
+                "node_used": None,
+                "error": str(e),
+                "processing_time": 0,
+                "total_time": time.time() - t0,
+            }
+
+        return {
+            "chunk": chunk_index,
+            "node_used": result.node,
+            "strategy": result.strategy,
+            "processing_time": result.elapsed,
+            "total_time": time.time() - t0,
+        }
+
+    start_total = time.time()
+    with ThreadPoolExecutor(max_workers=max(MAX_THREADS, plan["window"])) as executor:
+        results = list(executor.map(send_one, range(total_chunks)))
+    total_time = time.time() - start_total
+
+    errors = sum(1 for r in results if "error" in r)
+
+    return jsonify(
+        {
+            "results": results,
+            "throughput": total_chunks / total_time if total_time > 0 else 0,
+            "throughput_mbps": file_size / (1024 * 1024) / total_time if total_time > 0 else 0,
+            "error_rate": errors / total_chunks if total_chunks else 0,
+            "total_time": total_time,
+            "aes_key": aes_key,
+            "aes_nonce": aes_nonce,
+        }
+    )
+
+
+# ==========================================================
+# ADMINISTRATION : stratégie active, état des nœuds
+# ==========================================================
+@app.route("/admin/strategy", methods=["GET", "POST"])
+def admin_strategy():
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        strategy = data.get("strategy")
+        if isinstance(strategy, str):
+            strategy = {strategy: 1.0}
+        if not isinstance(strategy, dict):
+            return jsonify({"error": "Champ 'strategy' attendu (nom ou {nom: poids})"}), 400
+        try:
+            engine.set_strategy(strategy)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        print(f"[LB] Stratégie active : {strategy}")
+
+    return jsonify(engine.strategy_status())
+
+
+@app.route("/nodes", methods=["GET"])
+def list_nodes():
+    return jsonify(
+        {
+            "nodes": engine.nodes,
+            "available": engine.registry.available(),
+            "registry": engine.registry.status(),
+        }
+    )
+
+
+LOOPBACK = ("127.0.0.1", "::1")
+
+
+def node_auth(view):
+    # Registre des nœuds : jeton partagé (NODE_TOKEN), sinon appels locaux uniquement
+    @functools.wraps(view)
+    def wrapper(**kwargs):
+        if NODE_TOKEN:
+            token = request.headers.get(NODE_TOKEN_HEADER)
+            if not token:
+                return jsonify({"error": f"En-tête {NODE_TOKEN_HEADER} manquant"}), 401
+            if not hmac.compare_digest(token.encode(), NODE_TOKEN.encode()):
+                print(f"[LB] ✗ Jeton de nœud invalide ({request.remote_addr})")
+                return jsonify({"error": "Jeton de nœud invalide"}), 403
+        elif request.remote_addr not in LOOPBACK:
+            print(f"[LB] ✗ Enregistrement distant refusé sans NODE_TOKEN ({request.remote_addr})")
+            return jsonify({"error": "NODE_TOKEN non configuré : seuls les nœuds locaux sont acceptés"}), 403
+        return view(**kwargs)
+
+    return wrapper
+
+
+@app.route("/nodes/register", methods=["POST"])
+@node_auth
+def register_node():
+    url = ((request.get_json(silent=True) or {}).get("url") or "").rstrip("/")
+    if not url.startswith(("http://", "https://")):
+        return jsonify({"error": "Champ 'url' attendu (http://hôte:port)"}), 400
+    if engine.registry.register(url):
+        print(f"[LB] + Fog node enregistré : {url}")
+    return jsonify({"nodes": engine.nodes})
+
+
+@app.route("/nodes/deregister", methods=["POST"])
+@node_auth
+def deregister_node():
+    url = ((request.get_json(silent=True) or {}).get("url") or "").rstrip("/")
+    if engine.registry.deregister(url):
+        print(f"[LB] - Fog node retiré : {url}")
+    return jsonify({"nodes": engine.nodes})
+
+
+@app.route("/nodes/heartbeat", methods=["POST"])
+@node_auth
+def node_heartbeat():
+    url = ((request.get_json(silent=True) or {}).get("url") or "").rstrip("/")
+    if not engine.registry.heartbeat(url):
+        # Nœud inconnu (LB redémarré, ou désenregistré) : il doit se ré-enregistrer
+        return jsonify({"error": "Nœud inconnu", "url": url}), 404
+    return jsonify({"status": "ok"})
+
+
+@app.route("/nodes_status", methods=["GET"])
+def nodes_status():
+    models = engine.strategies["hybrid"].describe()
+    statuses = {}
+    for node in engine.nodes:
+        sample, age = engine.telemetry.get(node)
+        if sample is not None and engine.telemetry.is_fresh(node):
+            statuses[node] = {
+                "status": "online",
+                "cpu_percent": sample["cpu_percent"],
+                "ram_percent": sample["ram_percent"],
+                "tasks_running": sample["tasks_running"],
+                "lb_inflight": engine.inflight[node],
+                "sample_age": age,
+                "model": models[node],
+            }
+        else:
+            statuses[node] = {"status": "offline", "sample_age": age, "model": models[node]}
+    return jsonify(statuses)
+
+
+# --- Cache des chunks chiffrés (succès, échecs, occupation) ---
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    return jsonify(engine.cache.stats())
+
+
+# --- Statistiques du pool de connexions vers les fog nodes ---
+@app.route("/pool_stats", methods=["GET"])
+def pool_stats():
+    return jsonify(pools.stats())
+
+
+@app.route("/")
+def home():
+    return "Load Balancer opérationnel."
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load balancer fog (stratégie enfichable)")
+    parser.add_argument("--strategy", default=None, help="nom de stratégie (cf. strategies.py)")
+    parser.add_argument("--port", type=int, default=LB_PORT)
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        default=os.environ.get("LB_ASYNC") == "1",
+        help="plan de données asyncio (un thread, des milliers de chunks en parallèle)",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=lb_metrics.METRICS_PORT, help="port Prometheus (0 : désactivé)"
+    )
+    args = parser.parse_args()
+
+    if args.strategy:
+        engine.set_strategy({args.strategy: 1.0})
+
+    lb_metrics.start(args.metrics_port)
+
+    mode = "asyncio" if args.use_async else "threads"
+    print(f"[LB] Démarrage sur port {args.port} ({mode}), stratégie : {engine.strategy_status()['strategy']}")
+    if args.use_async:
+        from async_lb import serve
+
+        serve(app, engine, reassembler, sessions, port=args.port)
+    else:
+        app.run(host="0.0.0.0", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# reassembly.py — Reconstruction des fichiers chiffrés, indépendante de l'ordre d'arrivée
+#
+# Chaque enregistrement chiffré renvoyé par un fog node est écrit directement
+# à son offset dans un fichier partiel préalloué (format : cf. container.py).
+# Les chunks peuvent donc arriver dans n'importe quel ordre, en parallèle, ou
+# être renvoyés (retry) sans corrompre le résultat. Quand tous les index sont
+# reçus, l'en-tête et l'index sont écrits, puis le fichier partiel est renommé
+# atomiquement en <nom>.encrypted.
+#
+# Les uploads en cours sont identifiés par leur upload_id, pas par le nom du
+# fichier : deux envois du même nom ne se marchent pas dessus, et un upload
+# interrompu peut reprendre (cf. sessions.py) là où il s'était arrêté.
+
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from container import RECORD, TAG_SIZE, container_size, pack_header, pack_index, record_offset, record_size
+
+
+# Uploads terminés mémorisés (retries tardifs de chunks déjà assemblés)
+COMPLETED_MEMORY = 4096
+# Upload sans session abandonné depuis plus longtemps : fichier partiel supprimé
+UPLOAD_TTL = float(os.environ.get("LB_UPLOAD_TTL", "86400"))
+
+
+class UploadState:
+    def __init__(self, filename, upload_id, partial_path, chunk_size, total_chunks, file_size, base_nonce,
+                 auto_seal=True):
+        self.filename = filename
+        self.upload_id = upload_id
+        self.partial_path = partial_path
+        self.chunk_size = chunk_size
+        self.total_chunks = total_chunks
+        self.file_size = file_size
+        self.base_nonce = base_nonce
+        self.received = set()
+        # False pour une session : le fichier n'est scellé qu'au commit explicite
+        self.auto_seal = auto_seal
+        self.touched = time.monotonic()
+
+    def offset(self, chunk_index):
+        return record_offset(self.chunk_size, chunk_index)
+
+    def record_end(self, chunk_index):
+        # Fin de la région du chunk (début du suivant) ; dernier chunk de taille
+        # inconnue : au plus un chunk complet
+        length = self.chunk_size
+        if chunk_index == self.total_chunks - 1 and self.file_size is not None:
+            length = self.file_size - chunk_index * self.chunk_size
+        return self.offset(chunk_index) + record_size(length)
+
+
+class ChunkWriter:
+    # Un handle par chunk : les régions sont disjointes, aucune sérialisation
+    def __init__(self, state, chunk_index):
+        self.state = state
+        self.chunk_index = chunk_index
+        self.fd = os.open(state.partial_path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        self.offset = state.offset(chunk_index)
+        self.end = state.record_end(chunk_index)
+        self.written = 0
+
+    def write(self, block):
+        view = memoryview(block)
+        # Jamais au-delà de la région du chunk : l'enregistrement suivant reste intact
+        if self.offset + view.nbytes > self.end:
+            raise ValueError(f"Chunk {self.chunk_index} : enregistrement plus long que sa région")
+        # lseek + write plutôt que pwrite (absent sous Windows) : le handle est à nous seuls
+        os.lseek(self.fd, self.offset, os.SEEK_SET)
+        while view:
+            written = os.write(self.fd, view)
+            self.offset += written
+            self.written += written
+            view = view[written:]
+
+    def close(self):
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Reassembler:
+    def __init__(self, folder):
+        self.folder = folder
+        self.lock = Lock()
+        self.uploads = {}  # upload_id -> UploadState en cours
+        self.completed = OrderedDict()  # upload_id -> nom des derniers uploads terminés
+        os.makedirs(folder, exist_ok=True)
+
+    def final_path(self, filename):
+        return os.path.join(self.folder, filename + ".encrypted")
+
+    def partial_path(self, filename, upload_id):
+        # Un fichier partiel par upload : l'identifiant (fourni par le client) est assaini
+        tag = re.sub(r"[^A-Za-z0-9_-]", "_", upload_id)[:64]
+        return os.path.join(self.folder, f"{filename}.{tag}.partial")
+
+    def begin(self, filename, upload_id, chunk_size, total_chunks, file_size, base_nonce,
+              received=None, auto_seal=True):
+        # Démarre (ou retrouve) un upload ; received : index déjà écrits dans un
+        # fichier partiel existant (reprise après redémarrage du LB)
+        with self.lock:
+            state = self.uploads.get(upload_id)
+            if state is not None:
+                return state
+            self._purge()
+
+            partial_path = self.partial_path(filename, upload_id)
+            if received is None or not os.path.exists(partial_path):
+                received = ()
+                with open(partial_path, "wb") as f:
+                    if file_size is not None:
+                        f.truncate(container_size(chunk_size, total_chunks, file_size))
+
+            state = UploadState(
+                filename, upload_id, partial_path, chunk_size, total_chunks, file_size, base_nonce, auto_seal
+            )
+            state.received.update(received)
+            self.uploads[upload_id] = state
+            self.completed.pop(upload_id, None)
+            return state
+
+    def _purge(self):
+        # Uploads sans session abandonnés (client disparu en cours d'envoi)
+        limit = time.monotonic() - UPLOAD_TTL
+        for upload_id, state in list(self.uploads.items()):
+            if state.auto_seal and state.touched < limit:
+                del self.uploads[upload_id]
+                try:
+                    os.remove(state.partial_path)
+                except OSError:
+                    pass
+
+    def write_chunk(self, filename, upload_id, chunk_index, chunk_size, total_chunks,
+                    blocks, file_size=None, base_nonce=b""):
+        # Écrit un enregistrement chiffré (itérable de blocs d'octets) à son offset ;
+        # renvoie True si le fichier est complet
+        writer = self.open_chunk(
+            filename, upload_id, chunk_index, chunk_size, total_chunks, file_size, base_nonce
+        )
+        if writer is None:
+            # Retry d'un chunk déjà assemblé : rien à réécrire
+            return True
+        with writer:
+            for block in blocks:
+                writer.write(block)
+        return self.commit(writer)
+
+    def open_chunk(self, filename, upload_id, chunk_index, chunk_size, total_chunks,
+                   file_size=None, base_nonce=b""):
+        # Ouvre l'écriture d'un chunk (blocs écrits au fil de l'eau, puis commit) ;
+        # None si l'upload est déjà terminé
+        if not 0 <= chunk_index < total_chunks:
+            raise ValueError(f"Index de chunk {chunk_index} hors limites (0..{total_chunks - 1})")
+
+        with self.lock:
+            if upload_id in self.completed:
+                return None
+
+        state = self.begin(filename, upload_id, chunk_size, total_chunks, file_size, base_nonce)
+        return ChunkWriter(state, chunk_index)
+
+    def resume_chunk(self, upload_id, chunk_index):
+        # Écriture d'un chunk dans un upload déjà démarré (session) ; None si terminé
+        with self.lock:
+            state = self.uploads.get(upload_id)
+        if state is None:
+            return None
+        if not 0 <= chunk_index < state.total_chunks:
+            raise ValueError(f"Index de chunk {chunk_index} hors limites (0..{state.total_chunks - 1})")
+        return ChunkWriter(state, chunk_index)
+
+    def commit(self, writer):
+        # Chunk entièrement écrit : renvoie True si le fichier est complet
+        state = writer.state
+        with self.lock:
+            if self.uploads.get(state.upload_id) is not state:
+                # Upload abandonné (expiré) entre-temps
+                return False
+
+            state.received.add(writer.chunk_index)
+            state.touched = time.monotonic()
+            if writer.chunk_index == state.total_chunks - 1 and state.file_size is None:
+                # Taille du fichier clair inconnue à l'avance : déduite du dernier chunk
+                last = writer.written - RECORD.size - TAG_SIZE
+                state.file_size = (state.total_chunks - 1) * state.chunk_size + last
+            if len(state.received) < state.total_chunks or not state.auto_seal:
+                return False
+
+            self._finish(state)
+            return True
+
+    def finish(self, upload_id):
+        # Commit explicite d'une session : renvoie la liste des chunks manquants
+        # (vide si le fichier est scellé)
+        with self.lock:
+            if upload_id in self.completed:
+                return []
+            state = self.uploads.get(upload_id)
+            if state is None:
+                raise KeyError(upload_id)
+            missing = self._missing(state)
+            if not missing:
+                self._finish(state)
+            return missing
+
+    def _finish(self, state):
+        self._seal(state)
+        os.replace(state.partial_path, self.final_path(state.filename))
+        del self.uploads[state.upload_id]
+        self.completed[state.upload_id] = state.filename
+        while len(self.completed) > COMPLETED_MEMORY:
+            self.completed.popitem(last=False)
+
+    def _seal(self, state):
+        # En-tête au début, index à la fin : le conteneur est complet
+        footer = pack_index(state.chunk_size, state.total_chunks, state.file_size)
+        end = container_size(state.chunk_size, state.total_chunks, state.file_size)
+        with open(state.partial_path, "r+b") as f:
+            f.write(pack_header(state.chunk_size, state.total_chunks, state.file_size, state.base_nonce))
+            f.seek(end - len(footer))
+            f.write(footer)
+            f.truncate(end)
+
+    def discard(self, upload_id):
+        with self.lock:
+            state = self.uploads.pop(upload_id, None)
+        if state is not None:
+            try:
+                os.remove(state.partial_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _missing(state):
+        return [i for i in range(state.total_chunks) if i not in state.received]
+
+    def missing(self, upload_id):
+        # Index non encore reçus ; None si l'upload est inconnu
+        with self.lock:
+            if upload_id in self.completed:
+                return []
+            state = self.uploads.get(upload_id)
+            return None if state is None else self._missing(state)
+
+    def progress(self, filename):
+        # Upload en cours le plus récent pour ce nom
+        with self.lock:
+            states = [s for s in self.uploads.values() if s.filename == filename]
+            if not states:
+                return None
+            state = max(states, key=lambda s: s.touched)
+            return {"received": len(state.received), "total_chunks": state.total_chunks}
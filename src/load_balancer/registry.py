@@ -0,0 +1,189 @@
+# registry.py — Registre dynamique des fog nodes
+#
+# - enregistrement / désenregistrement (POST /nodes/register, /nodes/deregister)
+# - vivacité par heartbeats (envoyés par les nœuds ou sondes /health réussies)
+# - éjection des nœuds aberrants : échecs consécutifs ou latence très au-dessus
+#   du reste du parc, pour une durée qui double à chaque nouvelle éjection
+# - slow-start : un nœud qui (re)joint le parc reçoit une part de trafic
+#   croissante pendant SLOW_START secondes
+#
+# Les stratégies ne voient que available() : un nœud mort ou éjecté ne coûte
+# plus un timeout par chunk.
+
+import os
+import time
+from threading import Lock
+
+HEARTBEAT_TIMEOUT = float(os.environ.get("LB_HEARTBEAT_TIMEOUT", "5"))
+EJECT_AFTER_FAILURES = int(os.environ.get("LB_EJECT_AFTER_FAILURES", "3"))
+BASE_EJECTION = float(os.environ.get("LB_BASE_EJECTION", "5"))
+MAX_EJECTION = 60.0
+MAX_EJECTED_FRACTION = 0.5  # jamais plus de la moitié du parc éjectée
+LATENCY_SPIKE_FACTOR = 3.0  # latence/octet > 3 × médiane des autres nœuds
+LATENCY_MIN_SAMPLES = 5
+LATENCY_ALPHA = 0.3
+SLOW_START = float(os.environ.get("LB_SLOW_START", "10"))
+SLOW_START_MIN_WEIGHT = 0.1
+
+
+class NodeState:
+    def __init__(self, url):
+        self.url = url
+        now = time.monotonic()
+        self.last_heartbeat = now
+        self.joined_at = now
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.latency = None  # moyenne exp. des secondes par octet
+        self.samples = 0
+
+    def status(self, now):
+        if self.ejected_until > now:
+            return "ejected"
+        if now - self.last_heartbeat > HEARTBEAT_TIMEOUT:
+            return "down"
+        return "healthy"
+
+
+class NodeRegistry:
+    def __init__(self, nodes=()):
+        self.lock = Lock()
+        self.nodes = {}
+        self.listeners = []
+        for url in nodes:
+            # Parc initial (statique) : pas de slow-start au démarrage du LB
+            state = NodeState(url)
+            state.joined_at -= SLOW_START
+            self.nodes[url] = state
+
+    def on_change(self, callback):
+        self.listeners.append(callback)
+
+    def _changed(self):
+        members = self.members()
+        for callback in self.listeners:
+            callback(members)
+
+    def members(self):
+        # Tous les nœuds connus, quel que soit leur état
+        return list(self.nodes)
+
+    # -----------------------------
+    # Composition du parc
+    # -----------------------------
+    def register(self, url):
+        with self.lock:
+            state = self.nodes.get(url)
+            if state is None:
+                self.nodes[url] = NodeState(url)
+                added = True
+            else:
+                # Ré-enregistrement (redémarrage du nœud) : nouveau slow-start
+                state.last_heartbeat = state.joined_at = time.monotonic()
+                state.consecutive_failures = 0
+                state.ejected_until = 0.0
+                added = False
+        if added:
+            self._changed()
+        return added
+
+    def deregister(self, url):
+        with self.lock:
+            removed = self.nodes.pop(url, None) is not None
+        if removed:
+            self._changed()
+        return removed
+
+    def heartbeat(self, url):
+        # Renvoie False si le nœud est inconnu (il doit se ré-enregistrer)
+        with self.lock:
+            state = self.nodes.get(url)
+            if state is None:
+                return False
+            now = time.monotonic()
+            if now - state.last_heartbeat > HEARTBEAT_TIMEOUT:
+                # Retour après une absence : slow-start
+                state.joined_at = now
+            state.last_heartbeat = now
+            return True
+
+    # -----------------------------
+    # Résultats des envois → éjection
+    # -----------------------------
+    def record(self, url, ok, elapsed, nbytes):
+        with self.lock:
+            state = self.nodes.get(url)
+            if state is None:
+                return
+            now = time.monotonic()
+
+            if not ok:
+                state.consecutive_failures += 1
+                if state.consecutive_failures >= EJECT_AFTER_FAILURES:
+                    self._eject(state, now, f"{state.consecutive_failures} échecs consécutifs")
+                return
+
+            state.consecutive_failures = 0
+            per_byte = elapsed / max(nbytes, 1)
+            state.latency = per_byte if state.latency is None else (
+                LATENCY_ALPHA * per_byte + (1 - LATENCY_ALPHA) * state.latency
+            )
+            state.samples += 1
+
+            if state.samples >= LATENCY_MIN_SAMPLES:
+                others = sorted(
+                    s.latency for s in self.nodes.values()
+                    if s is not state and s.latency is not None and s.status(now) == "healthy"
+                )
+                if len(others) >= 2:
+                    median = others[len(others) // 2]
+                    if state.latency > LATENCY_SPIKE_FACTOR * median:
+                        self._eject(state, now, "latence aberrante")
+
+    def _eject(self, state, now, reason):
+        if state.ejected_until > now:
+            return
+        ejected = sum(1 for s in self.nodes.values() if s.ejected_until > now)
+        if ejected + 1 > MAX_EJECTED_FRACTION * len(self.nodes):
+            return
+
+        duration = min(MAX_EJECTION, BASE_EJECTION * 2 ** state.ejections)
+        state.ejections += 1
+        state.ejected_until = now + duration
+        # À la fin de l'éjection : compteurs remis à zéro et slow-start
+        state.joined_at = state.ejected_until
+        state.consecutive_failures = 0
+        state.latency = None
+        state.samples = 0
+        print(f"[LB] ✗ Fog node {state.url} éjecté {duration:.0f}s ({reason})")
+
+    # -----------------------------
+    # Vue des stratégies
+    # -----------------------------
+    def available(self):
+        now = time.monotonic()
+        return [url for url, s in list(self.nodes.items()) if s.status(now) == "healthy"]
+
+    def weight(self, url):
+        # Part de trafic pendant le slow-start (rampe linéaire jusqu'à 1)
+        state = self.nodes.get(url)
+        if state is None or SLOW_START <= 0:
+            return 1.0
+        ramp = (time.monotonic() - state.joined_at) / SLOW_START
+        return max(SLOW_START_MIN_WEIGHT, min(1.0, ramp))
+
+    def status(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                url: {
+                    "status": s.status(now),
+                    "heartbeat_age": now - s.last_heartbeat,
+                    "consecutive_failures": s.consecutive_failures,
+                    "ejections": s.ejections,
+                    "ejected_for": max(0.0, s.ejected_until - now),
+                    "weight": self.weight(url),
+                }
+                for url, s in self.nodes.items()
+            }
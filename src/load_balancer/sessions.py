@@ -0,0 +1,285 @@
+# sessions.py — Sessions d'upload reprenables
+#
+#   POST /uploads                      → crée une session, renvoie son upload_id
+#   PUT  /uploads/<id>/chunks/<index>  → envoie un chunk (idempotent)
+#   GET  /uploads/<id>                 → chunks reçus / manquants
+#   POST /uploads/<id>/commit          → scelle le fichier (409 s'il manque des chunks)
+#
+# Chaque session est persistée sur disque (dossier LB_SESSION_FOLDER) :
+#   <id>.json : manifeste (nom, tailles, nonce de base, empreinte de la clé),
+#               réécrit atomiquement aux changements d'état
+#   <id>.acks : journal des chunks acquittés, un index par ligne, en ajout seul
+# Un chunk n'est acquitté qu'une fois écrit dans le fichier partiel : après une
+# coupure réseau ou un redémarrage du LB, le client ne renvoie que les chunks
+# manquants. La clé AES n'est jamais écrite sur disque (seulement son empreinte,
+# pour refuser une reprise avec une autre clé).
+
+import hashlib
+import json
+import math
+import os
+import time
+import uuid
+from threading import Lock
+
+from chunk_sizing import MAX_CHUNK_SIZE
+
+SESSION_FOLDER = os.environ.get("LB_SESSION_FOLDER", os.path.join("uploads_lb", "sessions"))
+# Session sans activité depuis plus longtemps : supprimée (fichier partiel compris)
+SESSION_TTL = float(os.environ.get("LB_SESSION_TTL", "86400"))
+
+
+class SessionError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def key_fingerprint(key_hex):
+    return hashlib.sha256(b"fog-upload-session" + bytes.fromhex(key_hex)).hexdigest()[:32]
+
+
+class UploadSession:
+    def __init__(self, upload_id, filename, file_size, chunk_size, total_chunks, base_nonce,
+                 key_check=None, created_at=None, updated_at=None, committed=False):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.file_size = file_size
+        self.chunk_size = chunk_size
+        self.total_chunks = total_chunks
+        self.base_nonce = base_nonce  # hex
+        self.key_check = key_check
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+        self.committed = committed
+
+    def to_dict(self):
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "file_size": self.file_size,
+            "chunk_size": self.chunk_size,
+            "total_chunks": self.total_chunks,
+            "base_nonce": self.base_nonce,
+            "key_check": self.key_check,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "committed": self.committed,
+        }
+
+
+class SessionStore:
+    def __init__(self, reassembler, folder=SESSION_FOLDER, ttl=SESSION_TTL):
+        self.reassembler = reassembler
+        self.folder = folder
+        self.ttl = ttl
+        self.lock = Lock()
+        self.sessions = {}
+        os.makedirs(folder, exist_ok=True)
+        self._load()
+
+    def _path(self, upload_id, ext):
+        return os.path.join(self.folder, upload_id + ext)
+
+    # -----------------------------
+    # Persistance
+    # -----------------------------
+    def _save(self, session):
+        path = self._path(session.upload_id, ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(session.to_dict(), f)
+        os.replace(path + ".tmp", path)
+
+    def _begin(self, session, received=None):
+        self.reassembler.begin(
+            session.filename,
+            session.upload_id,
+            session.chunk_size,
+            session.total_chunks,
+            session.file_size,
+            bytes.fromhex(session.base_nonce),
+            received=received,
+            auto_seal=False,
+        )
+
+    def _load(self):
+        # Redémarrage du LB : sessions en cours reprises avec leurs chunks acquittés
+        for name in sorted(os.listdir(self.folder)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, name)) as f:
+                    session = UploadSession(**json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                print(f"[LB] ✗ Manifeste de session illisible {name} : {e}")
+                continue
+
+            # Le manifeste n'est pas réécrit à chaque acquittement : la dernière
+            # activité est aussi la date de la dernière ligne du journal
+            try:
+                acked_at = os.path.getmtime(self._path(session.upload_id, ".acks"))
+                session.updated_at = max(session.updated_at, acked_at)
+            except OSError:
+                pass
+            if time.time() - session.updated_at > self.ttl:
+                self._remove(session)
+                continue
+            self.sessions[session.upload_id] = session
+            if session.committed:
+                continue
+
+            received = self._acks(session)
+            partial = self.reassembler.partial_path(session.filename, session.upload_id)
+            if (
+                not os.path.exists(partial)
+                and len(received) == session.total_chunks
+                and os.path.exists(self.reassembler.final_path(session.filename))
+            ):
+                # Arrêt entre le scellement et l'écriture du manifeste : déjà terminé
+                session.committed = True
+                self._save(session)
+                continue
+            self._begin(session, received)
+            print(f"[LB] ↻ Session {session.upload_id} ({session.filename}) : "
+                  f"{len(received)}/{session.total_chunks} chunks déjà reçus")
+
+    def _acks(self, session):
+        received = set()
+        try:
+            with open(self._path(session.upload_id, ".acks")) as f:
+                for line in f:
+                    # Dernière ligne tronquée (arrêt brutal) : ignorée, le chunk sera renvoyé
+                    if line.endswith("\n") and line.strip().isdigit():
+                        received.add(int(line))
+        except OSError:
+            pass
+        return {i for i in received if i < session.total_chunks}
+
+    def _remove(self, session):
+        self.reassembler.discard(session.upload_id)
+        for ext in (".json", ".acks"):
+            try:
+                os.remove(self._path(session.upload_id, ext))
+            except OSError:
+                pass
+
+    def expire(self):
+        limit = time.time() - self.ttl
+        with self.lock:
+            expired = [s for s in self.sessions.values() if s.updated_at < limit]
+            for session in expired:
+                del self.sessions[session.upload_id]
+        for session in expired:
+            self._remove(session)
+
+    # -----------------------------
+    # API
+    # -----------------------------
+    def create(self, filename, file_size, chunk_size, aes_nonce):
+        if not filename or os.path.basename(filename) != filename:
+            raise SessionError("Nom de fichier invalide")
+        if file_size <= 0 or chunk_size <= 0:
+            raise SessionError("file_size et chunk_size doivent être positifs")
+        if chunk_size > MAX_CHUNK_SIZE:
+            # Au-delà, l'en-tête du conteneur (taille sur 32 bits) ne pourrait pas être scellé
+            raise SessionError(f"chunk_size au plus {MAX_CHUNK_SIZE} octets")
+        try:
+            if len(bytes.fromhex(aes_nonce)) != 12:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise SessionError("aes_nonce attendu : 12 octets en hexadécimal")
+
+        self.expire()
+        session = UploadSession(
+            uuid.uuid4().hex,
+            filename,
+            file_size,
+            chunk_size,
+            math.ceil(file_size / chunk_size),
+            aes_nonce,
+        )
+        self._save(session)
+        self._begin(session)
+        with self.lock:
+            self.sessions[session.upload_id] = session
+        print(f"[LB] + Session {session.upload_id} : {filename} ({session.total_chunks} chunks)")
+        return session
+
+    def get(self, upload_id):
+        with self.lock:
+            session = self.sessions.get(upload_id)
+        if session is None:
+            raise SessionError("Session inconnue ou expirée", 404)
+        return session
+
+    def check_key(self, session, key_hex):
+        # La première clé reçue fixe la session : une reprise avec une autre clé
+        # mélangerait deux chiffrements dans le même conteneur
+        try:
+            fingerprint = key_fingerprint(key_hex)
+        except (TypeError, ValueError):
+            raise SessionError("X-AES-Key invalide (hexadécimal attendu)")
+        with self.lock:
+            if session.key_check is None:
+                session.key_check = fingerprint
+                self._save(session)
+            elif session.key_check != fingerprint:
+                raise SessionError("Clé différente de celle de la session", 409)
+
+    def pending(self, session, chunk_index):
+        # False si le chunk est déjà reçu (PUT idempotent : rien à renvoyer aux fog nodes)
+        if session.committed:
+            return False
+        if not 0 <= chunk_index < session.total_chunks:
+            raise SessionError(f"Index de chunk {chunk_index} hors limites (0..{session.total_chunks - 1})")
+        missing = self.reassembler.missing(session.upload_id)
+        if missing is None:
+            raise SessionError("Session inconnue ou expirée", 404)
+        return chunk_index in missing
+
+    def open_chunk(self, session, chunk_index):
+        # Handle d'écriture du chunk (un par tentative) ; None si la session est scellée
+        return self.reassembler.resume_chunk(session.upload_id, chunk_index)
+
+    def acknowledge(self, session, writer):
+        # Chunk écrit : marqué reçu, puis journalisé (jamais l'inverse)
+        self.reassembler.commit(writer)
+        with self.lock:
+            with open(self._path(session.upload_id, ".acks"), "a") as f:
+                f.write(f"{writer.chunk_index}\n")
+            session.updated_at = time.time()
+
+    def status(self, session):
+        missing = [] if session.committed else self.reassembler.missing(session.upload_id)
+        if missing is None:
+            missing = list(range(session.total_chunks))
+        return {
+            "upload_id": session.upload_id,
+            "filename": session.filename,
+            "file_size": session.file_size,
+            "chunk_size": session.chunk_size,
+            "total_chunks": session.total_chunks,
+            "received": session.total_chunks - len(missing),
+            "missing": missing,
+            "committed": session.committed,
+        }
+
+    def commit(self, session):
+        # Renvoie les chunks manquants ; liste vide : fichier scellé
+        if session.committed:
+            return []
+        try:
+            missing = self.reassembler.finish(session.upload_id)
+        except KeyError:
+            raise SessionError("Session inconnue ou expirée", 404)
+        if not missing:
+            with self.lock:
+                session.committed = True
+                session.updated_at = time.time()
+                self._save(session)
+            try:
+                os.remove(self._path(session.upload_id, ".acks"))
+            except OSError:
+                pass
+            print(f"[LB] ✓ Session {session.upload_id} : {session.filename}.encrypted complet")
+        return missing
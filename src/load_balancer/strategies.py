@@ -0,0 +1,235 @@
+# strategies.py — Algorithmes de choix du fog node
+#
+# Une stratégie reçoit la liste des nœuds candidats et la taille du chunk, et
+# renvoie le nœud choisi. Elle est notifiée du résultat de chaque envoi
+# (on_result) pour apprendre au fil du trafic. Toutes partagent le même
+# moteur (engine.py) : compteur d'envois en cours, télémétrie, retries.
+
+import math
+import random
+import time
+from threading import Lock
+
+
+class Strategy:
+    name = None
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def select(self, nodes, chunk_size):
+        raise NotImplementedError
+
+    def on_result(self, node, elapsed, chunk_size, ok):
+        pass
+
+
+class RandomStrategy(Strategy):
+    name = "random"
+
+    def select(self, nodes, chunk_size):
+        return random.choice(nodes)
+
+
+class RoundRobinStrategy(Strategy):
+    name = "round_robin"
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.lock = Lock()
+        self.rr_index = 0
+
+    def select(self, nodes, chunk_size):
+        with self.lock:
+            node = nodes[self.rr_index % len(nodes)]
+            self.rr_index = (self.rr_index + 1) % len(nodes)
+        return node
+
+
+class NodeModel:
+    # temps(octets) ≈ overhead + spb * octets, appris en ligne par moyennes
+    # exponentielles (moyenne, variance, covariance) sur les envois réels.
+    def __init__(self, spb, overhead):
+        self.spb = spb
+        self.overhead = overhead
+        self.mean_b = None
+        self.mean_t = None
+        self.var_b = 0.0
+        self.cov_bt = 0.0
+        self.updated_at = None
+
+    def observe(self, nbytes, elapsed, alpha):
+        if self.mean_b is None:
+            self.mean_b, self.mean_t = float(nbytes), elapsed
+        else:
+            db = nbytes - self.mean_b
+            dt = elapsed - self.mean_t
+            self.mean_b += alpha * db
+            self.mean_t += alpha * dt
+            self.var_b = (1 - alpha) * (self.var_b + alpha * db * db)
+            self.cov_bt = (1 - alpha) * (self.cov_bt + alpha * db * dt)
+
+        # Tailles assez variées : régression (pente = spb, ordonnée = overhead).
+        # Sinon (chunks tous de même taille) : overhead conservé, spb déduit du temps moyen.
+        if self.var_b > (0.1 * self.mean_b) ** 2 and self.cov_bt > 0:
+            self.spb = self.cov_bt / self.var_b
+            self.overhead = max(0.0, self.mean_t - self.spb * self.mean_b)
+        else:
+            self.overhead = min(self.overhead, self.mean_t)
+            self.spb = max(0.0, self.mean_t - self.overhead) / max(self.mean_b, 1.0)
+        self.updated_at = time.monotonic()
+
+
+class HybridStrategy(Strategy):
+    # Ordonnanceur « earliest finish time » : chaque nœud est modélisé par un
+    # coût fixe + un coût par octet, appris sur les envois réels. Pour le chunk
+    # courant, on prédit l'heure de fin sur chaque nœud compte tenu des octets
+    # déjà en cours chez lui, et on choisit la fin la plus proche.
+    # Les modèles sont ceux du moteur (engine.models, appris quelle que soit la
+    # stratégie active) : un seul modèle par nœud, partagé avec le dimensionnement.
+    name = "hybrid"
+    ALPHA = 0.3  # poids d'une nouvelle mesure
+    RECOVERY = 30.0  # secondes : sans mesure, un nœud retend vers la moyenne du parc
+    DEFAULT_SPB = 1 / (100 * 1024 * 1024)  # 100 Mo/s supposés avant toute mesure
+    DEFAULT_OVERHEAD = 0.01
+
+    def params(self, node, prior):
+        model = self.engine.models.get(node)
+        if model is None or model.updated_at is None:
+            return prior
+        # Décroissance vers la médiane du parc : un nœud lent qu'on n'utilise plus
+        # redevient peu à peu candidat, et sera re-mesuré s'il s'est rétabli.
+        w = math.exp(-(time.monotonic() - model.updated_at) / self.RECOVERY)
+        return (
+            w * model.spb + (1 - w) * prior[0],
+            w * model.overhead + (1 - w) * prior[1],
+        )
+
+    def predict(self, node, chunk_size, prior=None):
+        spb, overhead = self.params(node, prior or self.engine.model_prior())
+        queued = self.engine.inflight_bytes[node]
+        return overhead + spb * (queued + chunk_size)
+
+    def select(self, nodes, chunk_size):
+        prior = self.engine.model_prior()
+        return min(nodes, key=lambda n: (self.predict(n, chunk_size, prior), random.random()))
+
+    def describe(self):
+        prior = self.engine.model_prior()
+        return {
+            node: {
+                "seconds_per_mb": self.params(node, prior)[0] * 1024 * 1024,
+                "overhead": self.params(node, prior)[1],
+            }
+            for node in self.engine.nodes
+        }
+
+
+class LeastConnectionsStrategy(Strategy):
+    # Moins de tâches en cours côté fog node (télémétrie /health, tous clients confondus)
+    name = "least_connections"
+
+    def select(self, nodes, chunk_size):
+        return min(
+            nodes,
+            key=lambda n: (self.engine.node_tasks(n), self.engine.inflight[n], random.random()),
+        )
+
+
+# -----------------------------
+# Stratégies locales : aucune requête distante par décision, seulement le
+# compteur d'envois en cours tenu par le LB (engine.inflight).
+# -----------------------------
+class LeastOutstandingStrategy(Strategy):
+    # Nœud avec le moins de requêtes en cours depuis ce LB (ex æquo : au hasard)
+    name = "least_outstanding"
+
+    def select(self, nodes, chunk_size):
+        inflight = self.engine.inflight
+        return min(nodes, key=lambda n: (inflight[n], random.random()))
+
+
+class PowerOfTwoStrategy(Strategy):
+    # Deux nœuds tirés au hasard, on garde le moins chargé : O(1) par décision,
+    # et pas d'effet de troupeau quand plusieurs LB voient le même minimum.
+    name = "p2c"
+
+    def select(self, nodes, chunk_size):
+        if len(nodes) == 1:
+            return nodes[0]
+        a, b = random.sample(nodes, 2)
+        inflight = self.engine.inflight
+        return a if inflight[a] <= inflight[b] else b
+
+
+class PeakEwmaStrategy(Strategy):
+    # Peak-EWMA : latence lissée qui saute immédiatement au pic observé puis
+    # redescend avec une constante de temps DECAY ; coût = latence * (en cours + 1).
+    # Choix par deux tirages au hasard (p2c) sur ce coût.
+    name = "peak_ewma"
+    DECAY = 10.0  # secondes
+    DEFAULT_RTT = 0.1  # latence supposée d'un nœud encore jamais mesuré
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.lock = Lock()
+        self.rtt = {}  # node -> (latence lissée, instant de la dernière mesure)
+
+    def cost(self, node):
+        rtt, stamp = self.rtt.get(node, (self.DEFAULT_RTT, None))
+        if stamp is not None:
+            # Sans mesure récente, la latence retombe vers la valeur par défaut
+            w = math.exp(-(time.monotonic() - stamp) / self.DECAY)
+            rtt = rtt * w + self.DEFAULT_RTT * (1 - w)
+        return rtt * (self.engine.inflight[node] + 1)
+
+    def select(self, nodes, chunk_size):
+        if len(nodes) == 1:
+            return nodes[0]
+        a, b = random.sample(nodes, 2)
+        return a if self.cost(a) <= self.cost(b) else b
+
+    def on_result(self, node, elapsed, chunk_size, ok):
+        now = time.monotonic()
+        with self.lock:
+            rtt, stamp = self.rtt.get(node, (elapsed, now))
+            if not ok:
+                # Un échec compte comme une latence au moins double
+                elapsed = max(elapsed, 2 * rtt)
+            if elapsed > rtt:
+                rtt = elapsed
+            else:
+                w = math.exp(-(now - stamp) / self.DECAY)
+                rtt = rtt * w + elapsed * (1 - w)
+            self.rtt[node] = (rtt, now)
+
+
+STRATEGIES = {
+    cls.name: cls
+    for cls in (
+        RandomStrategy,
+        RoundRobinStrategy,
+        HybridStrategy,
+        LeastConnectionsStrategy,
+        LeastOutstandingStrategy,
+        PowerOfTwoStrategy,
+        PeakEwmaStrategy,
+    )
+}
+
+# Alias : anciens noms (scripts load_balancer_*.py, lb_type) et abréviations
+ALIASES = {
+    "robin": "round_robin",
+    "rr": "round_robin",
+    "algo": "hybrid",
+    "eft": "hybrid",
+    "lor": "least_outstanding",
+    "power_of_two": "p2c",
+}
+
+
+def resolve(name):
+    name = ALIASES.get(name, name)
+    if name not in STRATEGIES:
+        raise ValueError(f"Stratégie inconnue : {name} (disponibles : {', '.join(STRATEGIES)})")
+    return name
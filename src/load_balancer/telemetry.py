@@ -0,0 +1,83 @@
+# telemetry.py — Collecte en arrière-plan de l'état des fog nodes
+#
+# Un thread interroge /health sur chaque nœud à sa propre cadence et publie un
+# snapshot immuable (dict remplacé d'un bloc). Les lecteurs (select_node) ne
+# prennent aucun verrou et ne font aucun appel réseau : une simple lecture de
+# dictionnaire, avec l'âge de l'échantillon pour juger de sa fraîcheur.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+from http_pool import pools
+
+TELEMETRY_PERIOD = float(os.environ.get("TELEMETRY_PERIOD", "0.5"))
+TELEMETRY_TIMEOUT = float(os.environ.get("TELEMETRY_TIMEOUT", "1"))
+
+
+class TelemetryCollector:
+    def __init__(self, nodes, period=TELEMETRY_PERIOD, timeout=TELEMETRY_TIMEOUT, on_alive=None):
+        self.nodes = list(nodes)
+        # Appelé pour chaque sonde réussie (heartbeat du registre de nœuds)
+        self.on_alive = on_alive
+        self.period = period
+        self.timeout = timeout
+        # Au-delà de 3 périodes sans réponse, l'échantillon est considéré périmé
+        self.stale_after = 3 * period
+        self.snapshot = {}
+        self.executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="telemetry")
+
+    def start(self):
+        Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            start = time.monotonic()
+            self.poll()
+            time.sleep(max(0.0, self.period - (time.monotonic() - start)))
+
+    def poll(self):
+        # Sondes en parallèle : un nœud lent ne retarde pas les autres
+        nodes = self.nodes
+        samples = dict(zip(nodes, self.executor.map(self._probe, nodes)))
+
+        previous = self.snapshot
+        snapshot = {}
+        for node, sample in samples.items():
+            if sample is not None:
+                snapshot[node] = sample
+                if self.on_alive:
+                    self.on_alive(node)
+            elif node in previous:
+                # Échec de sonde : on garde la dernière valeur connue, marquée hors ligne
+                snapshot[node] = {**previous[node], "online": False}
+        self.snapshot = snapshot
+
+    def _probe(self, node):
+        try:
+            r = pools.get(f"{node}/health", timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
+        except Exception:
+            return None
+        return {
+            "online": True,
+            "cpu_percent": data.get("cpu_percent", 0),
+            "ram_percent": data.get("ram_percent", 0),
+            "tasks_running": data.get("tasks_running", 0),
+            "health": data,
+            "updated_at": time.monotonic(),
+        }
+
+    def get(self, node):
+        # Renvoie (échantillon, âge en secondes) ; (None, None) si jamais sondé
+        sample = self.snapshot.get(node)
+        if sample is None:
+            return None, None
+        return sample, time.monotonic() - sample["updated_at"]
+
+    def is_fresh(self, node):
+        sample, age = self.get(node)
+        return sample is not None and sample["online"] and age <= self.stale_after
@@ -0,0 +1,92 @@
+# restore.py — Restauration (déchiffrement) d'un fichier chiffré
+#
+#   python src/restore.py f.bin --key <clé hex>                 # via le LB (fog nodes)
+#   python src/restore.py processed_files/f.bin.encrypted --key <clé hex> --local
+#
+# Via le LB : GET /restore/<nom>, déchiffrement réparti sur les fog nodes,
+# clair reçu en flux et dans l'ordre. En local : lecture directe du conteneur,
+# chunks déchiffrés en parallèle (AES-GCM relâche le GIL), écrits dans l'ordre.
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import LOAD_BALANCER_URL
+from container import Container, decrypt_record
+from http_pool import pools
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def restore_remote(filename, key_hex, output, lb_url=LOAD_BALANCER_URL, strategy=None):
+    headers = {"X-AES-Key": key_hex}
+    if strategy:
+        headers["X-LB-Strategy"] = strategy
+
+    r = pools.get(f"{lb_url}/restore/{filename}", headers=headers, stream=True, timeout=60)
+    if not r.ok:
+        raise RuntimeError(f"{r.status_code} : {r.text.strip()}")
+
+    expected = int(r.headers.get("Content-Length", -1))
+    written = 0
+    with r, open(output, "wb") as f:
+        for block in r.iter_content(BLOCK_SIZE):
+            f.write(block)
+            written += len(block)
+    if expected >= 0 and written != expected:
+        raise RuntimeError(f"Restauration interrompue ({written}/{expected} octets)")
+    return written
+
+
+def restore_local(path, key_hex, output, workers=os.cpu_count() or 1):
+    key = bytes.fromhex(key_hex)
+    written = 0
+    with open(path, "rb") as src, open(output, "wb") as dst, ThreadPoolExecutor(workers) as pool:
+        container = Container(src)
+        window = deque()
+        for index in range(container.total_chunks):
+            # Lecture séquentielle du conteneur, déchiffrement en parallèle (fenêtre bornée)
+            record = container.read_record(index)
+            window.append(pool.submit(decrypt_record, key, record, container.total_chunks, index))
+            if len(window) >= 2 * workers:
+                written += dst.write(window.popleft().result()[1])
+        while window:
+            written += dst.write(window.popleft().result()[1])
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restaure (déchiffre) un fichier chiffré par les fog nodes")
+    parser.add_argument("file", help="nom du fichier envoyé (ou chemin du .encrypted avec --local)")
+    parser.add_argument("--key", required=True, help="clé AES (hex) affichée par le client à l'envoi")
+    parser.add_argument("-o", "--output", help="fichier de sortie (défaut : restored_<nom>)")
+    parser.add_argument("--lb", default=LOAD_BALANCER_URL)
+    parser.add_argument("--strategy", default=None, help="stratégie du LB pour cette restauration")
+    parser.add_argument("--local", action="store_true", help="déchiffrer localement, sans fog nodes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    name = os.path.basename(args.file)
+    if name.endswith(".encrypted"):
+        name = name[: -len(".encrypted")]
+    output = args.output or f"restored_{name}"
+
+    t0 = time.time()
+    try:
+        if args.local:
+            size = restore_local(args.file, args.key, output, args.workers)
+        else:
+            size = restore_remote(name, args.key, output, args.lb, args.strategy)
+    except Exception as e:
+        print(f"[RESTORE] ✗ {e}")
+        sys.exit(1)
+
+    elapsed = time.time() - t0
+    print(f"[RESTORE] ✓ {output} ({size} octets, {size / (1024 * 1024) / max(elapsed, 1e-9):.1f} Mo/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+# tracing.py — Traces de bout en bout d'un chunk (client → LB → fog node)
+#
+# Le contexte de trace suit le chunk dans des en-têtes X- :
+#   X-Trace-Id      identifiant de la trace (un upload côté client)
+#   X-Span-Id       span appelant (parent des spans du service appelé)
+#   X-Trace-Sampled 1 = tracé, 0 = non tracé (décision prise une fois, à la racine)
+#   X-Upload-Id / X-Chunk-Index : upload et chunk concernés (attributs des spans)
+# Chaque étape enregistre un span chronométré (lecture disque, PUT, attente et
+# envoi du LB, file d'attente et chiffrement du fog node, écriture à l'offset).
+#
+# Échantillonnage en tête : TRACE_SAMPLE_RATE (0 par défaut = désactivé, 1 = tout).
+# Une trace non échantillonnée ne coûte qu'un en-tête et un objet vide ; les
+# spans échantillonnés sont exportés par un thread de fond, par lots (file bornée,
+# spans abandonnés plutôt que de ralentir les chunks).
+#
+# Export (TRACE_EXPORTER) :
+#   jsonl  une ligne JSON par span, ajoutée à TRACE_FILE (traces.jsonl) ;
+#   otlp   lots OTLP/HTTP JSON postés sur TRACE_OTLP_URL (collecteur OpenTelemetry,
+#          ou le collecteur minimal ci-dessous).
+#
+#   TRACE_SAMPLE_RATE=1 python src/client.py              (idem LB et fog nodes)
+#   python src/tracing.py collect --port 4318 -o traces.jsonl
+#   python src/tracing.py show traces.jsonl [--trace <id>]
+
+import argparse
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_HEADER = "X-Trace-Id"
+SPAN_HEADER = "X-Span-Id"
+SAMPLED_HEADER = "X-Trace-Sampled"
+UPLOAD_HEADER = "X-Upload-Id"
+CHUNK_HEADER = "X-Chunk-Index"
+
+SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0"))
+EXPORTER = os.environ.get("TRACE_EXPORTER", "jsonl")
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+OTLP_URL = os.environ.get("TRACE_OTLP_URL", "http://127.0.0.1:4318/v1/traces")
+# Spans en attente d'export (au-delà : abandonnés) et taille des lots
+QUEUE_SIZE = int(os.environ.get("TRACE_QUEUE_SIZE", "10000"))
+BATCH_SIZE = 512
+FLUSH_PERIOD = 1.0
+
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def header(headers, name):
+    # Flask (insensible à la casse) ou plan asyncio (clés en minuscules)
+    return headers.get(name) or headers.get(name.lower())
+
+
+class NoopSpan:
+    # Trace non échantillonnée : même interface, rien n'est mesuré ni exporté.
+    # Devient quand même le span courant : les étapes suivantes ne retirent pas au sort.
+    sampled = False
+    token = None
+
+    def set(self, **attributes):
+        return self
+
+    def record(self, name, start, end, **attributes):
+        pass
+
+    def headers(self):
+        return {SAMPLED_HEADER: "0"}
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        self.token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        current_span.reset(self.token)
+        return False
+
+
+class Span:
+    sampled = True
+
+    def __init__(self, tracer, name, trace_id, parent_id, attributes, start=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = start if start is not None else time.time()
+        self.error = None
+        self.ended = False
+        self.tokens = []
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def record(self, name, start, end, **attributes):
+        # Étape déjà chronométrée (horodatages connus) : span fils terminé
+        span = Span(self.tracer, name, self.trace_id, self.span_id, attributes, start=start)
+        span.end(end=end)
+
+    def headers(self):
+        # Contexte propagé au service appelé (ce span devient le parent des siens)
+        return {TRACE_HEADER: self.trace_id, SPAN_HEADER: self.span_id, SAMPLED_HEADER: "1"}
+
+    def end(self, error=None, end=None):
+        if self.ended:
+            return
+        self.ended = True
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer.exporter.export(self.to_record(end if end is not None else time.time()))
+
+    def to_record(self, end):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "service": self.tracer.service,
+            "name": self.name,
+            "start": self.start,
+            "end": end,
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def __enter__(self):
+        self.tokens.append(current_span.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        current_span.reset(self.tokens.pop())
+        self.end(exc)
+        return False
+
+
+NOOP = NoopSpan()
+
+
+class Tracer:
+    def __init__(self, service, sample_rate=None):
+        self.service = service
+        self.sample_rate = SAMPLE_RATE if sample_rate is None else sample_rate
+        self.exporter = shared_exporter()
+
+    def start(self, name, headers=None, parent=None, start=None, **attributes):
+        # Parent : span explicite, sinon contexte reçu (en-têtes), sinon span
+        # courant ; à défaut, nouvelle trace (tirage d'échantillonnage).
+        # with tracer.start(...) : span courant pendant le bloc, terminé à la sortie
+        if parent is None and headers is not None:
+            sampled = header(headers, SAMPLED_HEADER)
+            trace_id = header(headers, TRACE_HEADER)
+            if sampled == "0":
+                return NoopSpan()
+            if sampled == "1" and trace_id:
+                return Span(self, name, trace_id, header(headers, SPAN_HEADER), attributes, start)
+        if parent is None:
+            parent = current_span.get()
+        if parent is not None:
+            if not parent.sampled:
+                return NoopSpan()
+            return Span(self, name, parent.trace_id, parent.span_id, attributes, start)
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return NoopSpan()
+        return Span(self, name, os.urandom(16).hex(), None, attributes, start)
+
+    @staticmethod
+    def current():
+        return current_span.get() or NOOP
+
+
+def bind(fn):
+    # Fonction exécutée dans un pool de threads : garde le span courant comme parent
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+# ============================================================
+# EXPORT (thread de fond, par lots)
+# ============================================================
+class Exporter:
+    def __init__(self, kind=EXPORTER, path=TRACE_FILE, url=OTLP_URL):
+        if kind not in ("jsonl", "otlp"):
+            raise ValueError(f"TRACE_EXPORTER inconnu : {kind} (jsonl, otlp)")
+        self.kind = kind
+        self.path = path
+        self.url = url
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.exported = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def export(self, record):
+        if self.thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="trace-export", daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+
+    def _loop(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + FLUSH_PERIOD
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self):
+        # Sortie du processus : spans encore en file écrits tout de suite
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            with self.lock:
+                if self.kind == "jsonl":
+                    # Une seule écriture en ajout par lot : plusieurs processus
+                    # (client, LB, fog nodes) peuvent partager le même fichier
+                    with open(self.path, "a") as f:
+                        f.write("".join(json.dumps(r) + "\n" for r in batch))
+                else:
+                    from http_pool import pools
+
+                    pools.post(self.url, json=otlp_payload(batch), timeout=5).raise_for_status()
+            self.exported += len(batch)
+        except Exception as e:
+            self.failures += 1
+            print(f"[TRACE] ✗ Export de {len(batch)} span(s) impossible : {e}")
+
+    def status(self):
+        return {
+            "exporter": self.kind,
+            "sample_rate": SAMPLE_RATE,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "queued": self.queue.qsize(),
+        }
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def shared_exporter():
+    # Un exporteur par processus, partagé par tous les Tracer
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = Exporter()
+        return _exporter
+
+
+# ============================================================
+# FORMAT OTLP/HTTP JSON
+# ============================================================
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def plain_value(value):
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def otlp_payload(records):
+    by_service = defaultdict(list)
+    for r in records:
+        span = {
+            "traceId": r["trace_id"],
+            "spanId": r["span_id"],
+            "name": r["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(int(r["start"] * 1e9)),
+            "endTimeUnixNano": str(int(r["end"] * 1e9)),
+            "attributes": [{"key": k, "value": otlp_value(v)} for k, v in r["attributes"].items() if v is not None],
+            "status": {"code": 2, "message": r["error"]} if r["error"] else {"code": 1},
+        }
+        if r["parent_id"]:
+            span["parentSpanId"] = r["parent_id"]
+        by_service[r["service"]].append(span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                "scopeSpans": [{"scope": {"name": "fog-tracing"}, "spans": spans}],
+            }
+            for service, spans in by_service.items()
+        ]
+    }
+
+
+def records_from_otlp(payload):
+    # Inverse de otlp_payload (collecteur minimal)
+    records = []
+    for resource_spans in payload.get("resourceSpans", []):
+        attributes = resource_spans.get("resource", {}).get("attributes", [])
+        service = next((plain_value(a["value"]) for a in attributes if a["key"] == "service.name"), "unknown")
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start = int(span["startTimeUnixNano"]) / 1e9
+                end = int(span["endTimeUnixNano"]) / 1e9
+                status = span.get("status", {})
+                records.append(
+                    {
+                        "trace_id": span["traceId"],
+                        "span_id": span["spanId"],
+                        "parent_id": span.get("parentSpanId") or None,
+                        "service": service,
+                        "name": span["name"],
+                        "start": start,
+                        "end": end,
+                        "duration_ms": round((end - start) * 1000, 3),
+                        "attributes": {a["key"]: plain_value(a["value"]) for a in span.get("attributes", [])},
+                        "error": status.get("message") if status.get("code") == 2 else None,
+                    }
+                )
+    return records
+
+
+# ============================================================
+# COLLECTEUR MINIMAL ET LECTURE DES TRACES
+# ============================================================
+def collect(port, output):
+    # Reçoit des lots OTLP/HTTP JSON (POST /v1/traces) et les ajoute en JSONL
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_error(404)
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+                records = records_from_otlp(payload)
+            except (ValueError, KeyError, TypeError) as e:
+                self.send_error(400, str(e))
+                return
+            with lock, open(output, "a") as f:
+                f.write("".join(json.dumps(r) + "\n" for r in records))
+            body = b"{}"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"[TRACE] Collecteur OTLP/HTTP sur le port {port} → {output}")
+    ThreadingHTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def show(records, trace_id=None, limit=5):
+    # Arbre des spans par trace : où est passé le temps de chaque chunk
+    traces = defaultdict(list)
+    for r in records:
+        traces[r["trace_id"]].append(r)
+    if trace_id:
+        selected = [t for t in traces if t.startswith(trace_id)]
+    else:
+        selected = sorted(traces, key=lambda t: min(r["start"] for r in traces[t]))[-limit:]
+
+    for t in selected:
+        spans = sorted(traces[t], key=lambda r: r["start"])
+        ids = {r["span_id"] for r in spans}
+        children = defaultdict(list)
+        for r in spans:
+            children[r["parent_id"] if r["parent_id"] in ids else None].append(r)
+        origin = spans[0]["start"]
+        print(f"trace {t} ({len(spans)} spans)")
+
+        def walk(parent, depth):
+            for r in children[parent]:
+                attributes = " ".join(f"{k}={v}" for k, v in r["attributes"].items() if v not in (None, ""))
+                error = f"  ✗ {r['error']}" if r["error"] else ""
+                print(
+                    f"  {(r['start'] - origin) * 1000:9.1f}ms {r['duration_ms']:9.1f}ms  "
+                    f"{'  ' * depth}{r['service']}:{r['name']}  {attributes}{error}"
+                )
+                walk(r["span_id"], depth + 1)
+
+        walk(None, 0)
+
+    # Durée totale par étape, toutes traces confondues
+    totals = defaultdict(list)
+    for r in records:
+        totals[(r["service"], r["name"])].append(r["duration_ms"])
+    print("\nétape                                   spans    moyenne        max")
+    for (service, name), durations in sorted(totals.items()):
+        print(f"{service + ':' + name:38s} {len(durations):6d} {sum(durations) / len(durations):9.1f}ms "
+              f"{max(durations):9.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Traces des chunks : collecteur OTLP minimal et lecture")
+    commands = parser.add_subparsers(dest="command", required=True)
+    c = commands.add_parser("collect", help="collecteur OTLP/HTTP JSON → JSONL")
+    c.add_argument("--port", type=int, default=4318)
+    c.add_argument("-o", "--output", default=TRACE_FILE)
+    s = commands.add_parser("show", help="arbre des spans et durée par étape")
+    s.add_argument("file", nargs="?", default=TRACE_FILE)
+    s.add_argument("--trace", default=None, help="identifiant (ou préfixe) de trace")
+    s.add_argument("--limit", type=int, default=5, help="dernières traces affichées")
+    args = parser.parse_args()
+
+    if args.command == "collect":
+        collect(args.port, args.output)
+    else:
+        show(load(args.file), args.trace, args.limit)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
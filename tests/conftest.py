@@ -0,0 +1,15 @@
+# conftest.py — Modules de src/ importables, LB sans fog nodes, dans un dossier temporaire
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "src", "load_balancer"))
+sys.path.insert(0, os.path.join(ROOT, "src", "fog_nodes"))
+
+# Le LB crée ses dossiers de travail à l'import : hors du dépôt
+os.environ.setdefault("FOG_NODES", "")
+os.environ.setdefault("LB_METRICS_PORT", "0")
+os.chdir(tempfile.mkdtemp(prefix="fog-tests-"))
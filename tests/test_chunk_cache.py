@@ -0,0 +1,38 @@
+import os
+import threading
+
+from chunk_cache import ChunkCache
+
+
+def test_evicted_entries_spill_to_disk_and_come_back(tmp_path):
+    cache = ChunkCache(memory=300, disk=500, folder=str(tmp_path))
+    for i in range(10):
+        cache.put(f"k{i}", bytes([i]) * 100)
+
+    stats = cache.stats()
+    assert stats["memory_bytes"] <= 300 and stats["disk_bytes"] <= 500
+    assert sorted(os.listdir(tmp_path)) == [f"k{i}.rec" for i in range(2, 7)]
+    assert cache.get("k4") == bytes([4]) * 100
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("k0") is None
+
+
+def test_concurrent_use_keeps_disk_accounting_consistent(tmp_path):
+    cache = ChunkCache(memory=300, disk=500, folder=str(tmp_path))
+
+    def worker(n):
+        for i in range(200):
+            cache.put(f"t{n}-{i}", b"x" * 90)
+            cache.get(f"t{n}-{i // 2}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = cache.stats()
+    files = [name for name in os.listdir(tmp_path) if name.endswith(".rec")]
+    assert stats["disk_bytes"] <= 500
+    assert stats["disk_entries"] == len(files)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
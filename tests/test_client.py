@@ -0,0 +1,12 @@
+# test_client.py — Interface d'upload du client
+
+import io
+
+import client
+
+
+def test_empty_file_needs_no_session():
+    # Aucun LB joignable ici : un fichier vide ne doit pas en avoir besoin
+    r = client.app.test_client().post("/send_file", data={"file": (io.BytesIO(b""), "empty.bin")})
+    assert r.status_code == 200
+    assert r.get_json()["chunks"] == 0
@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+from container import HEADER, TRAILER, Container, ContainerError, encrypt_record, pack_header, pack_index
+
+
+def container_bytes(data, chunk_size, key=b"k" * 16, base_nonce=b"n" * 12):
+    total = -(-len(data) // chunk_size)
+    records = [
+        encrypt_record(key, base_nonce, i, total, data[i * chunk_size:(i + 1) * chunk_size]) for i in range(total)
+    ]
+    return pack_header(chunk_size, total, len(data), base_nonce) + b"".join(records) + pack_index(
+        chunk_size, total, len(data)
+    )
+
+
+def test_round_trip():
+    raw = container_bytes(b"x" * 100, 40)
+    c = Container(io.BytesIO(raw))
+    assert b"".join(c.read_chunk(b"k" * 16, i) for i in range(c.total_chunks)) == b"x" * 100
+
+
+@pytest.mark.parametrize("size", [0, 3, HEADER.size, HEADER.size + TRAILER.size - 1])
+def test_too_short_raises_container_error(size):
+    raw = container_bytes(b"x" * 100, 40)
+    with pytest.raises(ContainerError):
+        Container(io.BytesIO(raw[:size]))
+
+
+def test_truncated_index_raises_container_error():
+    raw = container_bytes(b"x" * 100, 40)
+    # Fin conservée, index amputé : l'offset de l'index pointe au-delà du fichier
+    damaged = raw[:HEADER.size] + raw[-TRAILER.size:]
+    with pytest.raises(ContainerError):
+        Container(io.BytesIO(damaged))
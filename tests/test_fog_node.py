@@ -0,0 +1,92 @@
+# test_fog_node.py — En-têtes des routes de chiffrement / déchiffrement
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import fog_node
+
+KEY = "11" * 32
+NONCE = "22" * 12
+
+
+@pytest.fixture
+def client():
+    fog_node.executor = ThreadPoolExecutor(max_workers=1)
+    yield fog_node.app.test_client()
+    fog_node.executor.shutdown()
+
+
+def post(client, route, **overrides):
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "X-AES-Key": KEY,
+        "X-AES-Nonce": NONCE,
+        "X-Chunk-Index": "0",
+        "X-Total-Chunks": "2",
+    }
+    headers.update(overrides)
+    return client.post(route, data=b"payload", headers={k: v for k, v in headers.items() if v is not None})
+
+
+def test_encrypt_then_decrypt(client):
+    r = post(client, "/task_chunk")
+    assert r.status_code == 200
+
+    r = client.post("/decrypt_chunk", data=r.data, headers={
+        "Content-Type": "application/octet-stream", "X-AES-Key": KEY, "X-Chunk-Index": "0", "X-Total-Chunks": "2",
+    })
+    assert r.status_code == 200 and r.data == b"payload"
+
+
+@pytest.mark.parametrize("route", ["/task_chunk", "/decrypt_chunk"])
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"X-Chunk-Index": "x"},
+        {"X-Chunk-Index": "2"},
+        {"X-Chunk-Index": "-1"},
+        {"X-Total-Chunks": "0"},
+        {"X-Total-Chunks": None},
+        {"X-AES-Key": "zz" * 32},
+        {"X-AES-Key": "11" * 10},
+        {"X-AES-Key": None},
+    ],
+)
+def test_rejects_bad_headers(client, route, overrides):
+    r = post(client, route, **overrides)
+    assert r.status_code == 400
+    assert "error" in r.get_json()
+
+
+@pytest.mark.parametrize("nonce", ["zz" * 12, "22" * 8, None])
+def test_task_chunk_rejects_bad_nonce(client, nonce):
+    assert post(client, "/task_chunk", **{"X-AES-Nonce": nonce}).status_code == 400
+
+
+# -----------------------------
+# /admin/faults : sur demande, protégé
+# -----------------------------
+def test_admin_faults_not_served_by_default(client):
+    assert client.post("/admin/faults", json={"error_rate": 1}).status_code == 404
+
+
+def admin_call(headers=None, remote="127.0.0.1"):
+    with fog_node.app.test_request_context(
+        "/admin/faults", method="POST", json={}, headers=headers or {}, environ_base={"REMOTE_ADDR": remote}
+    ):
+        response = fog_node.app.make_response(fog_node.admin_faults())
+    return response.status_code
+
+
+def test_admin_faults_requires_node_token(monkeypatch):
+    monkeypatch.setattr(fog_node, "NODE_TOKEN", "s3cret")
+    assert admin_call() == 401
+    assert admin_call({"X-Node-Token": "wrong"}) == 403
+    assert admin_call({"X-Node-Token": "s3cret"}, remote="10.0.0.5") == 200
+
+
+def test_admin_faults_local_only_without_token(monkeypatch):
+    monkeypatch.setattr(fog_node, "NODE_TOKEN", "")
+    assert admin_call(remote="10.0.0.5") == 403
+    assert admin_call() == 200
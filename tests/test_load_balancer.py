@@ -0,0 +1,184 @@
+import pytest
+
+import load_balancer
+
+
+@pytest.fixture
+def client():
+    load_balancer.app.config["TESTING"] = True
+    return load_balancer.app.test_client()
+
+
+# -----------------------------
+# Registre des nœuds
+# -----------------------------
+def test_register_without_token_rejected(client, monkeypatch):
+    monkeypatch.setattr(load_balancer, "NODE_TOKEN", "secret")
+    r = client.post("/nodes/register", json={"url": "http://10.0.0.9:5001"})
+    assert r.status_code == 401
+    assert "http://10.0.0.9:5001" not in load_balancer.engine.nodes
+
+
+def test_register_with_wrong_token_rejected(client, monkeypatch):
+    monkeypatch.setattr(load_balancer, "NODE_TOKEN", "secret")
+    for route in ("/nodes/register", "/nodes/heartbeat", "/nodes/deregister"):
+        r = client.post(route, json={"url": "http://10.0.0.9:5001"}, headers={"X-Node-Token": "guess"})
+        assert r.status_code == 403
+    assert "http://10.0.0.9:5001" not in load_balancer.engine.nodes
+
+
+def test_register_with_token_accepted(client, monkeypatch):
+    monkeypatch.setattr(load_balancer, "NODE_TOKEN", "secret")
+    headers = {"X-Node-Token": "secret"}
+    r = client.post("/nodes/register", json={"url": "http://10.0.0.8:5001"}, headers=headers)
+    assert r.status_code == 200
+    assert "http://10.0.0.8:5001" in load_balancer.engine.nodes
+    client.post("/nodes/deregister", json={"url": "http://10.0.0.8:5001"}, headers=headers)
+
+
+def test_remote_register_without_configured_token_rejected(client, monkeypatch):
+    monkeypatch.setattr(load_balancer, "NODE_TOKEN", "")
+    r = client.post(
+        "/nodes/register", json={"url": "http://10.0.0.9:5001"}, environ_base={"REMOTE_ADDR": "10.0.0.9"}
+    )
+    assert r.status_code == 403
+    assert "http://10.0.0.9:5001" not in load_balancer.engine.nodes
+
+
+# -----------------------------
+# Restauration
+# -----------------------------
+def test_restore_of_truncated_file_rejected(client):
+    with open(load_balancer.reassembler.final_path("tiny.bin"), "wb") as f:
+        f.write(b"abc")
+    r = client.get("/restore/tiny.bin", headers={"X-AES-Key": "00" * 16})
+    assert r.status_code in (400, 422)
+    assert "tronqué" in r.get_json()["error"]
+
+
+# -----------------------------
+# Téléchargement (Range)
+# -----------------------------
+@pytest.fixture
+def result_file():
+    with open(load_balancer.reassembler.final_path("range.bin"), "wb") as f:
+        f.write(b"0123456789")
+    return "/download_result/range.bin"
+
+
+@pytest.mark.parametrize("value", ["bytes=5-3", "bytes=a-5", "bytes=3-x", "bytes=0-0,2-3", "items=0-1"])
+def test_invalid_range_serves_whole_file(client, result_file, value):
+    r = client.get(result_file, headers={"Range": value})
+    assert r.status_code == 200
+    assert r.data == b"0123456789"
+
+
+@pytest.mark.parametrize("value", ["bytes=10-", "bytes=20-30", "bytes=-0"])
+def test_unsatisfiable_range_is_416(client, result_file, value):
+    r = client.get(result_file, headers={"Range": value})
+    assert r.status_code == 416
+    assert r.headers["Content-Range"] == "bytes */10"
+
+
+@pytest.mark.parametrize("value, body", [("bytes=2-4", b"234"), ("bytes=7-", b"789"), ("bytes=-3", b"789")])
+def test_satisfiable_range_is_206(client, result_file, value, body):
+    r = client.get(result_file, headers={"Range": value})
+    assert r.status_code == 206
+    assert r.data == body
+
+
+# -----------------------------
+# /receive_chunk : en-têtes numériques
+# -----------------------------
+def chunk_headers(**overrides):
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "X-File-Name": "f.bin",
+        "X-Chunk-Index": "0",
+        "X-Total-Chunks": "1",
+        "X-AES-Key": "00" * 16,
+        "X-AES-Nonce": "00" * 12,
+    }
+    headers.update(overrides)
+    return headers
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"X-Chunk-Size": "abc"},
+        {"X-Chunk-Size": "0"},
+        {"X-Chunk-Size": "-5"},
+        {"X-Chunk-Size": str(1 << 40)},
+        {"X-Chunk-Index": "x"},
+        {"X-Chunk-Index": "5"},
+        {"X-Total-Chunks": "0"},
+        {"X-File-Size": "big"},
+    ],
+)
+def test_receive_chunk_rejects_bad_numeric_headers(client, overrides):
+    r = client.post("/receive_chunk", data=b"abc", headers=chunk_headers(**overrides))
+    assert r.status_code == 400
+    assert "Header X-" in r.get_json()["error"]
+
+
+@pytest.mark.parametrize(
+    "body, overrides",
+    [
+        (b"x" * 6, {"X-Total-Chunks": "2", "X-Chunk-Size": "4"}),  # trop long : déborderait sur le chunk 1
+        (b"x" * 2, {"X-Total-Chunks": "2", "X-Chunk-Size": "4"}),  # trop court, pas le dernier
+        (b"x" * 5, {"X-Chunk-Index": "1", "X-Total-Chunks": "2", "X-Chunk-Size": "4"}),
+        (b"x" * 2, {"X-Chunk-Index": "1", "X-Total-Chunks": "2", "X-Chunk-Size": "4", "X-File-Size": "7"}),
+        (b"x" * 4, {"X-Total-Chunks": "2", "X-Chunk-Size": "4", "X-File-Size": "20"}),
+    ],
+)
+def test_receive_chunk_rejects_bad_length(client, body, overrides):
+    r = client.post("/receive_chunk", data=body, headers=chunk_headers(**overrides))
+    assert r.status_code == 400
+
+
+# -----------------------------
+# Clé, nonce et stratégie vérifiés avant dispatch ; refus des nœuds relayés
+# -----------------------------
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"X-LB-Strategy": "nope"},
+        {"X-AES-Key": "zz" * 16},
+        {"X-AES-Key": "00" * 10},
+        {"X-AES-Nonce": "00" * 8},
+    ],
+)
+def test_receive_chunk_rejects_bad_dispatch_headers(client, overrides):
+    r = client.post("/receive_chunk", data=b"abc", headers=chunk_headers(**overrides))
+    assert r.status_code == 400
+
+
+def test_put_chunk_rejects_unknown_strategy(client):
+    r = client.post("/uploads", json={"filename": "s.bin", "file_size": 3, "chunk_size": 4, "aes_nonce": "00" * 12})
+    upload_id = r.get_json()["upload_id"]
+    r = client.put(
+        f"/uploads/{upload_id}/chunks/0", data=b"abc", headers={"X-AES-Key": "00" * 16, "X-LB-Strategy": "nope"}
+    )
+    assert r.status_code == 400
+
+
+def test_restore_rejects_unknown_strategy(client):
+    r = client.get("/restore/any.bin", headers={"X-AES-Key": "00" * 16, "X-LB-Strategy": "nope"})
+    assert r.status_code == 400
+
+
+def test_node_rejection_is_relayed(client, monkeypatch):
+    def rejected(*args, **kwargs):
+        raise load_balancer.ChunkRejected("http://127.0.0.1:5001", 422)
+
+    monkeypatch.setattr(load_balancer.engine, "dispatch", rejected)
+    r = client.post("/receive_chunk", data=b"abc", headers=chunk_headers())
+    assert r.status_code == 422
+
+
+def test_session_rejects_oversized_chunk_size(client):
+    r = client.post(
+        "/uploads", json={"filename": "big.bin", "file_size": 1 << 34, "chunk_size": 1 << 33, "aes_nonce": "00" * 12}
+    )
+    assert r.status_code == 400
@@ -0,0 +1,21 @@
+# test_reassembly.py — Écriture des chunks à leur offset
+
+import pytest
+
+from container import record_size
+from reassembly import Reassembler
+
+
+def test_writer_stays_in_its_region(tmp_path):
+    reassembler = Reassembler(str(tmp_path))
+    writer = reassembler.open_chunk("f.bin", "u1", 0, 4, 2, file_size=7, base_nonce=b"\0" * 12)
+    with writer:
+        writer.write(b"a" * record_size(4))
+        with pytest.raises(ValueError):
+            writer.write(b"b")
+
+    last = reassembler.open_chunk("f.bin", "u1", 1, 4, 2, file_size=7, base_nonce=b"\0" * 12)
+    with last:
+        with pytest.raises(ValueError):
+            last.write(b"c" * (record_size(3) + 1))
+        last.write(b"c" * record_size(3))
@@ -0,0 +1,38 @@
+# test_sessions.py — Sessions d'upload persistées
+
+import os
+import time
+
+from reassembly import Reassembler
+from sessions import SessionStore
+
+
+def test_restart_keeps_session_with_recent_acks(tmp_path):
+    reassembler = Reassembler(str(tmp_path / "files"))
+    store = SessionStore(reassembler, folder=str(tmp_path / "sessions"), ttl=60)
+    session = store.create("f.bin", 10, 4, "00" * 12)
+    writer = store.open_chunk(session, 0)
+    with writer:
+        writer.write(b"x" * 10)
+    store.acknowledge(session, writer)
+
+    # Manifeste écrit il y a plus d'un TTL, mais chunk acquitté à l'instant
+    manifest = os.path.join(store.folder, session.upload_id + ".json")
+    old = time.time() - 3600
+    os.utime(manifest, (old, old))
+    with open(manifest) as f:
+        content = f.read().replace(str(session.created_at), str(old))
+    with open(manifest, "w") as f:
+        f.write(content)
+
+    restarted = SessionStore(Reassembler(str(tmp_path / "files")), folder=store.folder, ttl=60)
+    assert session.upload_id in restarted.sessions
+    assert restarted.status(restarted.get(session.upload_id))["received"] == 1
+
+
+def test_restart_expires_idle_session(tmp_path):
+    store = SessionStore(Reassembler(str(tmp_path / "files")), folder=str(tmp_path / "sessions"), ttl=0.1)
+    session = store.create("f.bin", 10, 4, "00" * 12)
+    time.sleep(0.2)
+    restarted = SessionStore(Reassembler(str(tmp_path / "files")), folder=store.folder, ttl=0.1)
+    assert session.upload_id not in restarted.sessions